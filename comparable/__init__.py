@@ -1,6 +1,7 @@
 """Package for Comparable."""
 
 import sys
+import importlib
 
 __project__ = 'Comparable'
 __version__ = '1.0'
@@ -12,10 +13,40 @@ PYTHON_VERSION = 3, 3
 if not sys.version_info >= PYTHON_VERSION:  # pragma: no cover (manual test)
     exit("Python {}.{}+ is required.".format(*PYTHON_VERSION))
 
-try:
-    from comparable.base import SimpleComparable, CompoundComparable
-    from comparable import simple
-    from comparable import compound
-    from comparable import tools
-except ImportError:  # pragma: no cover (manual test)
-    pass
+# Public names are imported on first use (the modules are slow to import)
+_LAZY = {  # name: (module, attribute or None for the module itself)
+    'SimpleComparable': ('comparable.base', 'SimpleComparable'),
+    'CompoundComparable': ('comparable.base', 'CompoundComparable'),
+    'Deadline': ('comparable.base', 'Deadline'),
+    'simple': ('comparable.simple', None),
+    'compound': ('comparable.compound', None),
+    'tools': ('comparable.tools', None),
+    'registry': ('comparable.registry', None),
+    'stats': ('comparable.metrics', 'stats'),
+}
+
+
+def __getattr__(name):
+    """Import a public name on first use (Python 3.7+)."""
+    try:
+        module, attribute = _LAZY[name]
+    except KeyError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+    value = importlib.import_module(module)
+    if attribute is not None:
+        value = getattr(value, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+if sys.version_info < (3, 7):  # pragma: no cover (manual test)
+    try:
+        for _name in _LAZY:
+            __getattr__(_name)
+    except ImportError:
+        pass
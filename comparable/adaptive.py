@@ -0,0 +1,147 @@
+"""Adaptive ordering of the attributes compared for equality.
+
+Equality of a compound comparable stops at the first unequal attribute,
+so it is fastest when the cheapest attributes that most often differ are
+compared first. Which attributes those are depends on the data, so
+classes that set 'adaptive' record the cost and rejection rate of each
+attribute while comparing and periodically reorder the attributes by
+expected cost per rejection (cost / rejection rate), which is the
+optimal order for independent attributes:
+
+    >>> ordering = Order()
+    >>> ordering.record('name', True, 0.001)
+    >>> ordering.record('age', False, 0.001)
+    >>> ordering.order(['name', 'age'])
+    ['age', 'name']
+
+"""
+
+import time
+from collections import OrderedDict
+
+REORDER = 100  # equality comparisons between reorderings
+PRIOR = 1.0  # pseudo-comparisons of each attribute (half of them rejecting)
+
+clock = time.perf_counter  # pylint: disable=C0103
+_orders = {}  # class: Order
+
+
+class _Attribute(object):  # pylint: disable=R0903
+
+    """Count, rejections, and cumulative time of one attribute."""
+
+    __slots__ = ('checks', 'rejections', 'seconds')
+
+    def __init__(self):
+        self.checks = 0
+        self.rejections = 0
+        self.seconds = 0.0
+
+    @property
+    def cost(self):
+        """Get the average seconds per comparison."""
+        return self.seconds / self.checks if self.checks else 0.0
+
+    @property
+    def rate(self):
+        """Get the estimated fraction of comparisons that are unequal."""
+        return (self.rejections + PRIOR) / (self.checks + 2 * PRIOR)
+
+    def snapshot(self, name):
+        """Get a dictionary of the attribute's values."""
+        return OrderedDict([('name', name),
+                            ('checks', self.checks),
+                            ('rejections', self.rejections),
+                            ('seconds', self.seconds)])
+
+
+class Order(object):
+
+    """Run-time statistics and order of one class's attributes."""
+
+    def __init__(self):
+        self.attributes = {}  # attribute name: _Attribute
+        self.comparisons = 0
+        self._orders = {}  # tuple of attribute names: names in order
+
+    def __repr__(self):
+        return "<{} of {} attributes after {} comparisons>".format(
+            self.__class__.__name__, len(self.attributes), self.comparisons)
+
+    def order(self, names):
+        """Get attribute names in the order they should be compared.
+
+        Attributes without statistics are compared first (to measure
+        them) and ties keep the order of the names.
+
+        @param names: iterable of attribute names
+        @return: list of attribute names
+
+        """
+        key = tuple(names)
+        order = self._orders.get(key)
+        if order is None:
+            order = self._orders[key] = sorted(key, key=self._rank)
+        return order
+
+    def _rank(self, name):
+        """Get the expected cost per rejection of an attribute."""
+        attribute = self.attributes.get(name)
+        if attribute is None:
+            return 0.0
+        return attribute.cost / attribute.rate
+
+    def compared(self):
+        """Count an equality comparison (reordering periodically)."""
+        self.comparisons += 1
+        if self.comparisons % REORDER == 0:
+            self._orders.clear()
+
+    def record(self, name, equal, seconds):
+        """Record the comparison of one attribute.
+
+        @param name: attribute name
+        @param equal: result of the comparison
+        @param seconds: duration of the comparison
+
+        """
+        attribute = self.attributes.get(name)
+        if attribute is None:
+            attribute = self.attributes[name] = _Attribute()
+        attribute.checks += 1
+        attribute.rejections += not equal
+        attribute.seconds += seconds
+
+
+def order(cls):
+    """Get (and create once) the attribute order of a class.
+
+    @param cls: compound comparable class
+    @return: L{Order}
+
+    """
+    result = _orders.get(cls)
+    if result is None:
+        result = _orders[cls] = Order()
+    return result
+
+
+def reset():
+    """Discard all recorded statistics (restoring the declared orders)."""
+    _orders.clear()
+
+
+def stats():
+    """Get a snapshot of the recorded statistics.
+
+    @return: dictionary of {class name: [attribute dictionary, ...]} with
+             attributes in their current order
+
+    """
+    result = OrderedDict()
+    for cls, ordering in sorted(_orders.items(),
+                                key=lambda entry: entry[0].__name__):
+        names = ordering.order(ordering.attributes)
+        result[cls.__name__] = [ordering.attributes[name].snapshot(name)
+                                for name in names]
+    return result
@@ -0,0 +1,132 @@
+"""Asynchronous functions to utilize streams of Comparable objects.
+
+Items are pulled from an asynchronous iterator in batches and each batch
+is scored in an executor, so the event loop is never blocked by the
+comparisons. Only one batch is pulled at a time, so a slow consumer
+naturally applies backpressure to the source.
+
+This module requires Python 3.7+ and is not imported by the package.
+
+"""
+
+import asyncio
+import heapq
+
+from comparable import tools
+
+BATCH = 100  # number of items compared in each executor call
+
+
+async def _batches(aitems, size):
+    """Group items from an asynchronous iterator into lists."""
+    batch = []
+    async for item in aitems:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _collect(function, base, items):
+    """Run a generator function from L{tools} and collect the results."""
+    return list(function(base, items))
+
+
+def _match(base, items):
+    """Get the most similar matching item and its float similarity.
+
+    @return: (item, float similarity) or (None, None)
+
+    """
+    best, best_sim = tools._match(base, items)  # pylint: disable=W0212
+    return best, None if best is None else float(best_sim)
+
+
+def _similarities(base, items):
+    """Calculate the similarity of each item to the base."""
+    return [float(base.similarity(item)) for item in items]
+
+
+async def _generate(function, base, aitems, batch, executor):
+    """Yield the results of a generator function applied to each batch."""
+    loop = asyncio.get_running_loop()
+    async for items in _batches(aitems, batch):
+        results = await loop.run_in_executor(executor, _collect,
+                                             function, base, items)
+        for item in results:
+            yield item
+
+
+def afind_similar(base, aitems, batch=BATCH, executor=None):
+    """Get an asynchronous iterator of items similar to the base.
+
+    @param base: base item to locate best match
+    @param aitems: asynchronous iterator of items for comparison
+    @param batch: number of items to compare in each executor call
+    @param executor: L{concurrent.futures.Executor} or None for the default
+    @return: asynchronous generator of similar items
+
+    """
+    return _generate(tools.find_similar, base, aitems, batch, executor)
+
+
+def aduplicates(base, aitems, batch=BATCH, executor=None):
+    """Get an asynchronous iterator of items similar but not equal to the base.
+
+    @param base: base item to perform comparison against
+    @param aitems: asynchronous iterator of items to compare to the base
+    @param batch: number of items to compare in each executor call
+    @param executor: L{concurrent.futures.Executor} or None for the default
+    @return: asynchronous generator of duplicate items
+
+    """
+    return _generate(tools.duplicates, base, aitems, batch, executor)
+
+
+async def amatch_similar(base, aitems, batch=BATCH, executor=None):
+    """Get the most similar matching item from an asynchronous iterator.
+
+    @param base: base item to locate best match
+    @param aitems: asynchronous iterator of items for comparison
+    @param batch: number of items to compare in each executor call
+    @param executor: L{concurrent.futures.Executor} or None for the default
+    @return: most similar matching item or None
+
+    """
+    loop = asyncio.get_running_loop()
+    best, best_score = None, None
+    async for items in _batches(aitems, batch):
+        item, score = await loop.run_in_executor(executor, _match,
+                                                 base, items)
+        if item is not None:
+            if best is None or score > best_score:
+                best, best_score = item, score
+
+    return best
+
+
+async def atop_k(base, aitems, k, batch=BATCH, executor=None):
+    """Get a list of the items most similar to the base.
+
+    @param base: base item to perform comparison against
+    @param aitems: asynchronous iterator of items to compare to the base
+    @param k: maximum number of items to return
+    @param batch: number of items to compare in each executor call
+    @param executor: L{concurrent.futures.Executor} or None for the default
+    @return: list of up to k items sorted by similarity to the base
+
+    """
+    loop = asyncio.get_running_loop()
+    best = []  # list of (similarity, -position, item)
+    position = 0
+    async for items in _batches(aitems, batch):
+        scores = await loop.run_in_executor(executor, _similarities,
+                                            base, items)
+        for score, item in zip(scores, items):
+            best.append((score, -position, item))
+            position += 1
+        best = heapq.nlargest(k, best, key=lambda entry: entry[:2])
+
+    return [item for _, _, item in best]
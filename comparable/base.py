@@ -1,9 +1,31 @@
 """Abstract base class and similarity functions."""
 
-import logging
-from collections import OrderedDict
+import sys
+import time
+from collections import OrderedDict, namedtuple
 from abc import ABCMeta, abstractmethod, abstractproperty  # pylint: disable=W0611
 
+from comparable import metrics
+from comparable import recorder
+from comparable import adaptive
+
+
+def _logging():
+    """Get the logging module if it is in use (it is slow to import).
+
+    Until a program imports logging, nothing can be listening for the
+    debug and info messages of comparisons, so they are skipped.
+
+    """
+    return sys.modules.get('logging')
+
+
+def _debug(msg, *args):
+    """Log a debug message if logging is in use."""
+    logging = _logging()
+    if logging is not None:
+        logging.debug(msg, *args)
+
 
 class _Base(object):  # pylint: disable=R0903
 
@@ -35,12 +57,14 @@ class Similarity(_Base):  # pylint: disable=R0903
 
     """Represents the similarity between two objects."""
 
-    def __init__(self, value, threshold=1.0):
+    def __init__(self, value, threshold=1.0, exact=True):
         self.value = float(value)
         self.threshold = float(threshold)
+        self.exact = exact  # False if approximated (e.g. before a L{Deadline})
 
     def __repr__(self):
-        return self._repr(self.value, threshold=self.threshold)
+        return self._repr(self.value, threshold=self.threshold,
+                          exact=None if self.exact else False)
 
     def __str__(self):
         return "{:.1%} similar".format(self.value)
@@ -102,6 +126,54 @@ class Similarity(_Base):  # pylint: disable=R0903
         return Similarity(round(self.value, digits), threshold=self.threshold)
 
 
+class Comparison(namedtuple('Comparison', ['equality', 'similarity'])):
+
+    """Represents both the equality and similarity between two objects."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return "{}, {}".format("equal" if self.equality else "not equal",
+                               self.similarity)
+
+    def __float__(self):
+        """In non-boolean scenarios, a comparison is treated like a float."""
+        return float(self.similarity)
+
+
+class Deadline(_Base):
+
+    """Time limit for comparisons that can return approximate results.
+
+    Comparisons given a deadline return the best result found before it
+    expires and clear the 'exact' flag if any work was skipped.
+
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.end = time.monotonic() + seconds
+        self.exact = True  # False once a result has been approximated
+
+    def __repr__(self):
+        return self._repr(self.seconds)
+
+    @classmethod
+    def create(cls, deadline):
+        """Get a deadline from a number of seconds, deadline, or None."""
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+        return cls(deadline)
+
+    def expired(self):
+        """Determine if the time limit has been reached."""
+        return time.monotonic() >= self.end
+
+    def remaining(self):
+        """Get the number of seconds before the time limit (or 0)."""
+        return max(self.end - time.monotonic(), 0.0)
+
+
 class _Indent(object):
 
     """Indent formatter for logging calls."""
@@ -118,16 +190,19 @@ class _Indent(object):
         """Decrease the indent level."""
         cls.level = max(cls.level - 1, 0)
 
-    @classmethod
-    def indent(cls, fmt):
+    @staticmethod
+    def indent(fmt, level):
         """Get a new format string with indentation."""
-        return '| ' * cls.level + fmt
+        return '| ' * level + fmt
 
 
 def equal(obj1, obj2):
     """Calculate equality between two (Comparable) objects."""
     Comparable.log(obj1, obj2, '==')
+    start = metrics.clock() if metrics.enabled else None
     equality = obj1.equality(obj2)
+    if start is not None:
+        metrics.record(obj1.__class__.__name__, None, '==', start)
     Comparable.log(obj1, obj2, '==', result=equality)
     return equality
 
@@ -135,11 +210,25 @@ def equal(obj1, obj2):
 def similar(obj1, obj2):
     """Calculate similarity between two (Comparable) objects."""
     Comparable.log(obj1, obj2, '%')
+    start = metrics.clock() if metrics.enabled else None
     similarity = obj1.similarity(obj2)
+    if start is not None:
+        metrics.record(obj1.__class__.__name__, None, '%', start)
     Comparable.log(obj1, obj2, '%', result=similarity)
     return similarity
 
 
+def compare(obj1, obj2):
+    """Calculate equality and similarity between two (Comparable) objects."""
+    Comparable.log(obj1, obj2, '<=>')
+    start = metrics.clock() if metrics.enabled else None
+    comparison = obj1.compare(obj2)
+    if start is not None:
+        metrics.record(obj1.__class__.__name__, None, '<=>', start)
+    Comparable.log(obj1, obj2, '<=>', result=comparison)
+    return comparison
+
+
 class Comparable(_Base, metaclass=ABCMeta):
 
     """Abstract Base Class for objects that are comparable.
@@ -192,10 +281,13 @@ class Comparable(_Base, metaclass=ABCMeta):
                 attr1 = getattr(self, aname)
                 attr2 = getattr(other, aname)
             except AttributeError as error:
-                logging.debug("%s.%s: %s", cname, aname, error)
+                _debug("%s.%s: %s", cname, aname, error)
                 return False
             self.log(attr1, attr2, '==', cname=cname, aname=aname)
+            start = metrics.clock() if metrics.enabled else None
             eql = (attr1 == attr2)
+            if start is not None:
+                metrics.record(cname, aname, '==', start)
             self.log(attr1, attr2, '==', cname=cname, aname=aname, result=eql)
             if not eql:
                 return False
@@ -238,7 +330,10 @@ class Comparable(_Base, metaclass=ABCMeta):
                 continue
 
             # Calculate similarity between the attributes
+            start = metrics.clock() if metrics.enabled else None
             attr_sim = (attr1 % attr2)
+            if start is not None:
+                metrics.record(cname, aname, '%', start)
             self.log(attr1, attr2, '%', cname=cname, aname=aname,
                      result=attr_sim)
 
@@ -252,6 +347,45 @@ class Comparable(_Base, metaclass=ABCMeta):
 
         return sim
 
+    def compare(self, other):
+        """Compare two objects for both equality and similarity.
+
+        Subclasses may override this method to calculate both results
+        with a single pass over the objects.
+
+        @param self: first object to compare
+        @param other: second object to compare
+
+        @return: L{Comparison} result of comparison
+
+        """
+        return Comparison(self.equality(other), self.similarity(other))
+
+    def key(self):  # pylint: disable=R0201
+        """Get a hashable value that is the same for equal objects.
+
+        Subclasses should override this method so that equal objects of
+        the same type can be found using hash-based indexes.
+
+        @return: hashable value or None if unavailable
+
+        """
+        return None
+
+    def bound(self, other):  # pylint: disable=W0613
+        """Get a cheap upper bound on the similarity of two objects.
+
+        Subclasses may override this method to reject candidates before
+        the full (expensive) similarity is calculated.
+
+        @param self: first object to compare
+        @param other: second object to compare
+
+        @return: L{Similarity} no less than the actual similarity
+
+        """
+        return self.Similarity(1.0)
+
     def Similarity(self, value=None):  # pylint: disable=C0103
         """Constructor for new default Similarities."""
         if value is None:
@@ -274,21 +408,32 @@ class Comparable(_Base, metaclass=ABCMeta):
         @param result: outcome of comparison
 
         """
-        fmt = "{o1} {sym} {o2} : {r}"
         if cname or aname:
             assert cname and aname  # both must be specified
-            fmt = "{c}.{a}: " + fmt
 
         if result is None:
-            result = '...'
-            fmt = _Indent.indent(fmt)
+            level = _Indent.level
             _Indent.more()
         else:
             _Indent.less()
-            fmt = _Indent.indent(fmt)
+            level = _Indent.level
+
+        if recorder.enabled:
+            recorder.record(obj1, obj2, sym, cname, aname, result, level)
+
+        # Only format messages that will be logged
+        logging = _logging()
+        if logging is None or not logging.root.isEnabledFor(logging.INFO):
+            return
+
+        fmt = "{o1} {sym} {o2} : {r}"
+        if cname or aname:
+            fmt = "{c}.{a}: " + fmt
+        fmt = _Indent.indent(fmt, level)
 
         msg = fmt.format(o1=repr(obj1), o2=repr(obj2),
-                         c=cname, a=aname, sym=sym, r=result)
+                         c=cname, a=aname, sym=sym,
+                         r='...' if result is None else result)
         logging.info(msg)
 
 
@@ -309,6 +454,9 @@ class SimpleComparable(Comparable):  # pylint: disable=W0223
         raise AttributeError()
 
 
+_MISSING = object()  # placeholder for attributes that do not exist
+
+
 class CompoundComparable(Comparable):  # pylint: disable=W0223
 
     """Abstract Base Class for objects that are comparable by attributes.
@@ -320,10 +468,171 @@ class CompoundComparable(Comparable):  # pylint: disable=W0223
 
     """
 
+    _trackers = None  # tracked pairs to notify of changes (see 'track')
+
+    adaptive = False  # True to reorder equality checks (see 'adaptive')
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if self._trackers:
+            for pair in list(self._trackers):
+                pair.invalidate(name)
+
+    def __getstate__(self):
+        """Get the state to copy or pickle, without tracked pairs.
+
+        Values of slots are included like the default state of objects.
+
+        """
+        state = vars(self).copy() if hasattr(self, '__dict__') else None
+        slots = {}
+        for cls in type(self).__mro__:
+            names = getattr(cls, '__slots__', ())
+            for name in (names,) if isinstance(names, str) else names:
+                if name not in ('__dict__', '__weakref__') and \
+                        hasattr(self, name):
+                    slots[name] = getattr(self, name)
+        for values in (state, slots):
+            if values:
+                values.pop('_trackers', None)  # copies are not tracked
+        return (state, slots) if slots else state
+
     def equality(self, other):
-        """A compound comparable's equality is based on attributes."""
-        return super().equality(other)
+        """A compound comparable's equality is based on attributes.
+
+        Adaptive classes compare the attributes in the order that has
+        rejected unequal objects fastest so far.
+
+        """
+        if not self.adaptive:
+            return super().equality(other)
+
+        cname = self.__class__.__name__
+        ordering = adaptive.order(self.__class__)
+        ordering.compared()
+        for aname in ordering.order(self.attributes):
+            try:
+                attr1 = getattr(self, aname)
+                attr2 = getattr(other, aname)
+            except AttributeError as error:
+                _debug("%s.%s: %s", cname, aname, error)
+                return False
+            self.log(attr1, attr2, '==', cname=cname, aname=aname)
+            start = metrics.clock() if metrics.enabled else None
+            begin = adaptive.clock()
+            eql = (attr1 == attr2)
+            ordering.record(aname, eql, adaptive.clock() - begin)
+            if start is not None:
+                metrics.record(cname, aname, '==', start)
+            self.log(attr1, attr2, '==', cname=cname, aname=aname, result=eql)
+            if not eql:
+                return False
+
+        return True
 
     def similarity(self, other):
         """A compound comparable's similarity is based on attributes."""
         return super().similarity(other)
+
+    def compare(self, other):
+        """A compound comparable's attributes are compared in one pass."""
+        cls = self.__class__
+        if cls.equality is not CompoundComparable.equality or \
+                cls.similarity is not CompoundComparable.similarity:
+            return super().compare(other)  # results may not use attributes
+
+        equality = True
+        sim = self.Similarity()
+        total = 0.0
+
+        cname = self.__class__.__name__
+        for aname, weight in self.attributes.items():
+
+            attr1 = getattr(self, aname, _MISSING)
+            attr2 = getattr(other, aname, _MISSING)
+            if attr1 is _MISSING or attr2 is _MISSING:
+                _debug("%s.%s: attribute is missing", cname, aname)
+                equality = False  # a missing attribute is never equal
+                attr1 = None if attr1 is _MISSING else attr1
+                attr2 = None if attr2 is _MISSING else attr2
+            self.log(attr1, attr2, '<=>', cname=cname, aname=aname)
+
+            # Similarity is ignored if None on both objects
+            if attr1 is None and attr2 is None:
+                self.log(attr1, attr2, '<=>', cname=cname, aname=aname,
+                         result="attributes are both None")
+                continue
+
+            # Similarity is 0 if either attribute is non-Comparable
+            if not all((isinstance(attr1, Comparable),
+                        isinstance(attr2, Comparable))):
+                equality = equality and (attr1 == attr2)
+                self.log(attr1, attr2, '<=>', cname=cname, aname=aname,
+                         result="attributes not Comparable")
+                total += weight
+                continue
+
+            # Only calculate equality until the first unequal attribute
+            start = metrics.clock() if metrics.enabled else None
+            if equality:
+                attr_eql, attr_sim = compare(attr1, attr2)
+                equality = attr_eql
+            else:
+                attr_sim = (attr1 % attr2)
+            if start is not None:
+                metrics.record(cname, aname, '<=>', start)
+            self.log(attr1, attr2, '<=>', cname=cname, aname=aname,
+                     result=attr_sim)
+
+            sim += attr_sim * weight
+            total += weight
+
+        # Scale the similarity so the total is 1.0
+        if total:
+            sim *= (1.0 / total)
+
+        return Comparison(bool(equality), sim)
+
+    def key(self):
+        """A compound comparable's key is based on attribute keys."""
+        keys = []
+        for aname in self.attributes:
+            try:
+                attr = getattr(self, aname)
+            except AttributeError:
+                return None  # a missing attribute is never equal
+            if isinstance(attr, Comparable):
+                attr = attr.key()
+                if attr is None:
+                    return None
+            keys.append(attr)
+
+        key = tuple(keys)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def bound(self, other):
+        """A compound comparable's bound is based on attribute bounds."""
+        sim = self.Similarity()
+        total = 0.0
+
+        for aname, weight in self.attributes.items():
+
+            attr1 = getattr(self, aname, None)
+            attr2 = getattr(other, aname, None)
+
+            # Follow the same rules used to calculate similarity
+            if attr1 is None and attr2 is None:
+                continue
+            if all((isinstance(attr1, Comparable),
+                    isinstance(attr2, Comparable))):
+                sim += attr1.bound(attr2) * weight
+            total += weight
+
+        if total:
+            sim *= (1.0 / total)
+
+        return sim
@@ -0,0 +1,299 @@
+"""Persistent cache of comparison results between Comparable objects.
+
+Results are stored in a local SQLite database keyed by a stable content
+fingerprint of each object. The key also includes a version of each
+object's comparison logic (its class hierarchy, threshold, and the code and
+settings of its classes, recursively for the values of its attributes), so
+changing any of these invalidates old results.
+
+"""
+
+import sqlite3
+import hashlib
+import logging
+
+from comparable.base import Comparable, CompoundComparable
+
+EQUALITY = '=='
+SIMILARITY = '%'
+SCALARS = (str, bytes, int, float, complex, bool, type(None))  # stable reprs
+IGNORED = ('__module__', '__qualname__', '__doc__', '__dict__',
+           '__weakref__', '__slots__', '__abstractmethods__', '_abc_impl')
+
+
+def fingerprint(obj):
+    """Get a stable content fingerprint of a Comparable object.
+
+    @param obj: Comparable object
+    @return: hexadecimal digest or None if the object has no (stable) key
+
+    """
+    key = obj.key()
+    if key is None:
+        return None
+    try:
+        key = _canonical(key)
+    except TypeError:
+        return None
+    cls = obj.__class__
+    text = repr((cls.__module__, cls.__qualname__, key))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _canonical(value):
+    """Get a text representing a value the same way in every process.
+
+    Members of sets and dictionaries are sorted by their own canonical
+    text, as their iteration order depends on hash randomization.
+
+    @param value: key or class attribute value
+    @return: text
+    @raise TypeError: if the value has no stable representation
+
+    """
+    if isinstance(value, SCALARS):
+        return repr(value)
+    if isinstance(value, (tuple, list)):
+        parts = [_canonical(item) for item in value]
+    elif isinstance(value, (set, frozenset)):
+        parts = sorted(_canonical(item) for item in value)
+    elif isinstance(value, dict):
+        parts = sorted(_canonical(name) + ': ' + _canonical(item)
+                       for name, item in value.items())
+    else:
+        raise TypeError("no stable representation: {!r}".format(value))
+    return "{}({})".format(type(value).__name__, ', '.join(parts))
+
+
+def version(obj):
+    """Get a digest of the logic used to compare an object.
+
+    The digest includes the code of every function and the (stable) value
+    of every other attribute of the object's Comparable classes. The digest
+    of a compound object also includes the versions of the (Comparable)
+    values of its attributes.
+
+    @param obj: Comparable object
+    @return: hexadecimal digest
+
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(repr(obj.threshold).encode('utf-8'))
+    for cls in obj.__class__.__mro__:
+        if not issubclass(cls, Comparable):
+            continue
+        digest.update(cls.__qualname__.encode('utf-8'))
+        for name, attr in sorted(vars(cls).items()):
+            if name in IGNORED:
+                continue
+            digest.update(name.encode('utf-8'))
+            codes = _codes(attr)
+            if codes:
+                for code in codes:
+                    _digest_code(digest, code)
+            else:
+                try:
+                    text = _canonical(attr)
+                except TypeError:
+                    continue  # e.g. nested classes
+                digest.update(text.encode('utf-8'))
+    for name, value in _values(obj):
+        digest.update(name.encode('utf-8'))
+        digest.update(version(value).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _codes(attr):
+    """Get the code objects of a function, method, or property."""
+    functions = (getattr(attr, name, None)
+                 for name in ('fget', 'fset', 'fdel', '__func__'))
+    functions = [function for function in functions if function is not None]
+    return [function.__code__ for function in functions or [attr]
+            if hasattr(function, '__code__')]
+
+
+def _digest_code(digest, code):
+    """Add the instructions, names, and constants of code to a digest."""
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode('utf-8'))
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            _digest_code(digest, const)  # nested functions and comprehensions
+        else:
+            digest.update(repr(const).encode('utf-8'))
+
+
+def _values(obj):
+    """Get the (name, Comparable value) pairs of a compound object."""
+    if not isinstance(obj, CompoundComparable):
+        return []
+    values = ((name, getattr(obj, name, None)) for name in obj.attributes)
+    return [(name, value) for name, value in values
+            if isinstance(value, Comparable)]
+
+
+def _shape(obj):
+    """Get a hashable summary of everything a version depends on."""
+    return (obj.__class__, obj.threshold,
+            tuple((name, _shape(value)) for name, value in _values(obj)))
+
+
+class ScoreCache(object):
+
+    """Persistent cache of equality and similarity results.
+
+    The least recently used results are evicted once the cache holds more
+    than 'limit' results. Changes are written to the database in batches.
+
+    """
+
+    BATCH = 1000  # number of changes to buffer before writing
+
+    def __init__(self, path, limit=1000000):
+        self.path = path
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+        self._versions = {}  # shape: version digest
+        self._pending = {}  # key: (value, used)
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS scores ("
+                         "key TEXT PRIMARY KEY, value REAL, used INTEGER)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS scores_used "
+                         "ON scores (used)")
+        row = self._db.execute("SELECT MAX(used) FROM scores").fetchone()
+        self._used = row[0] or 0
+
+    def __repr__(self):
+        return "<{} {!r}>".format(self.__class__.__name__, self.path)
+
+    def __len__(self):
+        self.flush()
+        return self._db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def equality(self, obj1, obj2):
+        """Get the (possibly cached) equality between two objects."""
+        value = self._get(obj1, obj2, EQUALITY, obj1.equality)
+        return bool(value)
+
+    def similarity(self, obj1, obj2):
+        """Get the (possibly cached) similarity between two objects."""
+        value = self._get(obj1, obj2, SIMILARITY, obj1.similarity)
+        return obj1.Similarity(value)
+
+    def bind(self, base):
+        """Get a wrapper around a base object that uses the cache.
+
+        The wrapper can be used as the base of the L{tools} functions.
+
+        @param base: base item to wrap
+        @return: L{Cached} object
+
+        """
+        return Cached(base, self)
+
+    def flush(self):
+        """Write pending changes and evict the least recently used results."""
+        if self._pending:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO scores (key, value, used) "
+                "VALUES (?, ?, ?)",
+                ((key, value, used)
+                 for key, (value, used) in self._pending.items()))
+            self._pending.clear()
+            count = self._db.execute("SELECT COUNT(*) FROM scores")
+            excess = count.fetchone()[0] - self.limit
+            if excess > 0:
+                logging.debug("evicting %s cached results...", excess)
+                self._db.execute(
+                    "DELETE FROM scores WHERE key IN ("
+                    "SELECT key FROM scores ORDER BY used LIMIT ?)",
+                    (excess,))
+        self._db.commit()
+
+    def clear(self):
+        """Remove all cached results."""
+        self._pending.clear()
+        self._db.execute("DELETE FROM scores")
+        self._db.commit()
+
+    def close(self):
+        """Write pending changes and close the database."""
+        self.flush()
+        self._db.close()
+
+    def _key(self, obj1, obj2, operation):
+        """Get the cache key for a comparison (or None if not cacheable)."""
+        fingerprint1 = fingerprint(obj1)
+        fingerprint2 = fingerprint(obj2)
+        if fingerprint1 is None or fingerprint2 is None:
+            return None
+        return ':'.join((operation, self._version(obj1), fingerprint1,
+                         self._version(obj2), fingerprint2))
+
+    def _version(self, obj):
+        """Get the version digest for an object's classes and thresholds."""
+        index = _shape(obj)
+        try:
+            return self._versions[index]
+        except KeyError:
+            self._versions[index] = digest = version(obj)
+            return digest
+
+    def _get(self, obj1, obj2, operation, function):
+        """Get a cached result or calculate and store it."""
+        if not isinstance(obj2, Comparable):
+            return function(obj2)
+        key = self._key(obj1, obj2, operation)
+        if key is None:
+            return function(obj2)
+
+        self._used += 1
+        if key in self._pending:
+            value = self._pending[key][0]
+            self.hits += 1
+        else:
+            row = self._db.execute("SELECT value FROM scores WHERE key = ?",
+                                   (key,)).fetchone()
+            if row:
+                value = row[0]
+                self.hits += 1
+            else:
+                value = float(function(obj2))
+                self.misses += 1
+        self._pending[key] = value, self._used
+
+        if len(self._pending) >= self.BATCH:
+            self.flush()
+
+        return value
+
+
+class Cached(object):
+
+    """Wrapper around a Comparable object that caches its comparisons."""
+
+    def __init__(self, obj, cache):
+        self.obj = obj
+        self.cache = cache
+
+    def __repr__(self):
+        return "{}({!r}, {!r})".format(self.__class__.__name__,
+                                       self.obj, self.cache)
+
+    def __getattr__(self, name):
+        return getattr(self.obj, name)
+
+    def equality(self, other):
+        """Get the (possibly cached) equality with another object."""
+        return self.cache.equality(self.obj, other)
+
+    def similarity(self, other):
+        """Get the (possibly cached) similarity with another object."""
+        return self.cache.similarity(self.obj, other)
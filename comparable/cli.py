@@ -0,0 +1,548 @@
+#!/usr/bin/env python
+
+r"""Command-line batch matcher and deduplicator for CSV/JSONL files.
+
+Each row of a file becomes a record compared by the columns mapped to
+comparable types, given as 'name[:Type[:weight]]' (Text and weight 1 by
+default):
+
+    comparable match people.csv --reference known.csv -c name:TextTitle:2 \
+        -c age:Number
+
+Jobs write one result per row, where rows are referred to by their
+position in the file (starting from 0):
+
+ - match: the most similar row of the reference file
+ - dedupe: the first equal (or most similar) earlier row
+ - cluster: the first row of the group linked by similarity
+
+Input is read in chunks that are compared in parallel worker processes,
+with progress (unless '--quiet'), throughput, and peak memory reported on
+standard error. Only 'match' streams its input: results are written as
+they are available and only the reference rows are held in memory (by
+each worker). The 'dedupe' and 'cluster' jobs compare each row to every
+earlier row, so they read all rows into memory (and every worker holds a
+copy of them) before comparing, and 'cluster' writes its results once
+every row is compared. For files larger than memory, see
+L{comparable.external}.
+
+Rows with values that cannot be converted (e.g. a Number that is not a
+number) stop the job with an error naming the row and column.
+
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from collections import OrderedDict, deque
+
+from comparable.base import SimpleComparable, CompoundComparable
+from comparable.simple import Number
+from comparable import registry
+from comparable import tools
+
+try:
+    import resource
+except ImportError:  # pragma: no cover (manual test)
+    resource = None  # pylint: disable=C0103
+
+JOBS = ('match', 'dedupe', 'cluster')
+FORMATS = ('csv', 'jsonl')
+CHUNK = 1000  # default number of rows compared by a worker at once
+FIELDS = {'match': ('position', 'match', 'similarity'),
+          'dedupe': ('position', 'status', 'prior', 'similarity'),
+          'cluster': ('position', 'cluster')}
+
+
+class RowError(ValueError):
+
+    """A row of a file cannot be converted to a record."""
+
+
+class Schema(object):
+
+    """Mapping of columns to the attributes of records."""
+
+    def __init__(self, columns, threshold=None):
+        """Define the attributes of records.
+
+        @param columns: list of (name, comparable type, weight)
+        @param threshold: similarity ratio required of records
+
+        """
+        self.columns = list(columns)
+        self.weights = OrderedDict((name, weight)
+                                   for name, _, weight in self.columns)
+        self.threshold = threshold
+
+    def __repr__(self):
+        return "<{} of {}>".format(self.__class__.__name__,
+                                   ', '.join(self.weights))
+
+    @classmethod
+    def parse(cls, specs, threshold=None):
+        """Create a schema from 'name[:Type[:weight]]' specifications.
+
+        @raise ValueError: if a specification is invalid
+
+        """
+        columns = []
+        for spec in specs:
+            parts = spec.split(':')
+            if len(parts) > 3 or not parts[0]:
+                raise ValueError("invalid column: {!r}".format(spec))
+            name = parts[0]
+            kind = registry.resolve(parts[1] if len(parts) > 1 else 'Text')
+            if not issubclass(kind, SimpleComparable):
+                raise ValueError("type {!r} cannot be a column".format(
+                    kind.__name__))
+            try:
+                weight = float(parts[2]) if len(parts) > 2 else 1.0
+            except ValueError:
+                raise ValueError("invalid weight: {!r}".format(spec))
+            if hasattr(Record, name) or name in Record.RESERVED:
+                raise ValueError("reserved column name: {!r}".format(name))
+            columns.append((name, kind, weight))
+        if not columns:
+            raise ValueError("at least one column is required")
+        return cls(columns, threshold=threshold)
+
+    def record(self, row):
+        """Create a record from a row (dictionary of column values).
+
+        @raise ValueError: if a value cannot be converted
+
+        """
+        values = {}
+        for name, kind, _ in self.columns:
+            value = self._value(name, kind, row.get(name))
+            values[name] = None if value is None else kind(value)
+        return Record(self, values)
+
+    def check(self, row):
+        """Verify the values of a row can be converted to a record.
+
+        @raise ValueError: naming the first column that cannot be converted
+
+        """
+        for name, kind, _ in self.columns:
+            self._value(name, kind, row.get(name))
+
+    @staticmethod
+    def _value(name, kind, value):
+        """Get a column value converted for its type (None if missing)."""
+        if value is None or value == '':
+            return None  # missing values are skipped
+        if not issubclass(kind, Number):
+            return str(value)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise ValueError("invalid {} in column {!r}: {!r}".format(
+                kind.__name__, name, value))
+
+
+class Record(CompoundComparable):  # pylint: disable=W0223
+
+    """Row of a file comparable by its mapped columns."""
+
+    RESERVED = ('schema',)  # names of attributes that are not columns
+
+    def __init__(self, schema, values):
+        self.schema = schema
+        if schema.threshold is not None:
+            self.threshold = schema.threshold
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, ', '.join(
+            "{}={!r}".format(name, getattr(self, name))
+            for name in self.schema.weights))
+
+    @property
+    def attributes(self):
+        return self.schema.weights
+
+
+# Input and output ###########################################################
+
+
+def _format(path, default='jsonl'):
+    """Determine the format of a file from its extension."""
+    extension = os.path.splitext(path or '')[1].lower().lstrip('.')
+    if extension in ('json', 'jsonl', 'ndjson'):
+        return 'jsonl'
+    return extension if extension in FORMATS else default
+
+
+def read_rows(path, fmt=None):
+    """Get an iterator of rows in a CSV or JSONL file ('-' for stdin).
+
+    @param path: path of the file
+    @param fmt: 'csv' or 'jsonl' (default: from the extension)
+    @return: generator of dictionaries of column values
+
+    """
+    fmt = fmt or _format(path, default='csv')
+    if path == '-':
+        stream = sys.stdin
+    else:
+        stream = open(path, newline='', encoding='utf-8')
+    try:
+        if fmt == 'csv':
+            yield from csv.DictReader(stream)
+        else:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def checked(rows, schema, path):
+    """Get an iterator of rows verified to convert to records.
+
+    @param rows: iterable of rows
+    @param schema: L{Schema} of the records
+    @param path: path of the file (for errors)
+    @raise RowError: naming the file, row, and column of an invalid value
+
+    """
+    for position, row in enumerate(rows):
+        try:
+            schema.check(row)
+        except ValueError as error:
+            raise RowError("{} row {}: {}".format(path, position, error))
+        yield row
+
+
+def chunks(iterable, size):
+    """Get an iterator of lists of up to 'size' items."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Writer(object):
+
+    """Stream of results written as CSV or JSON lines."""
+
+    def __init__(self, stream, fmt, fields):
+        self.stream = stream
+        self.fields = fields
+        self._csv = None
+        if fmt == 'csv':
+            self._csv = csv.writer(stream)
+            self._csv.writerow(fields)
+
+    def write(self, values):
+        """Write one result (a tuple of field values)."""
+        if self._csv:
+            self._csv.writerow(['' if value is None else value
+                                for value in values])
+        else:
+            self.stream.write(json.dumps(dict(zip(self.fields, values))) +
+                              '\n')
+
+
+class _Progress(object):
+
+    """Report of processed rows, throughput, and peak memory."""
+
+    INTERVAL = 0.5  # seconds between progress updates
+
+    def __init__(self, stream=None, quiet=False):
+        self.stream = stream or sys.stderr
+        self.quiet = quiet
+        self.count = 0
+        self.start = self._shown = time.perf_counter()
+
+    def update(self, count, stage="compared"):
+        """Add to the number of rows processed."""
+        self.count += count
+        now = time.perf_counter()
+        if not self.quiet and now - self._shown >= self.INTERVAL:
+            self._shown = now
+            self.stream.write("\r{:,} rows {} ({:,.0f} rows/s)".format(
+                self.count, stage, self.rate(now)))
+            self.stream.flush()
+
+    def rate(self, now=None):
+        """Get the number of rows processed per second."""
+        elapsed = (now or time.perf_counter()) - self.start
+        return self.count / elapsed if elapsed else 0.0
+
+    def finish(self):
+        """Report the throughput and peak memory."""
+        elapsed = time.perf_counter() - self.start
+        text = "{:,} rows in {:.2f} s ({:,.0f} rows/s)".format(
+            self.count, elapsed, self.rate())
+        memory = peak_memory()
+        if memory is not None:
+            text += ", peak memory {:,.1f} MB".format(memory / 1e6)
+        self.stream.write(("\r" if not self.quiet else "") + text + "\n")
+        self.stream.flush()
+
+
+def peak_memory():
+    """Get the peak resident memory (bytes) of this or any child process.
+
+    @return: number of bytes or None if unknown
+
+    """
+    if resource is None:  # pragma: no cover (manual test)
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Worker processes ###########################################################
+
+_SCHEMA = None  # schema of records in each worker process
+_PLANNER = None  # planner of the records searched in each worker process
+
+
+def _initialize(schema, rows):
+    """Create the records searched in a worker process."""
+    global _SCHEMA, _PLANNER  # pylint: disable=W0603
+    from comparable.planner import Planner  # only needed to compare
+    _SCHEMA = schema
+    _PLANNER = Planner([schema.record(row) for row in rows])
+
+
+def _search(base, end=None):
+    """Yield (position, equality, similarity) of records similar to a base.
+
+    @param base: base record
+    @param end: position of the first record not searched (default: all)
+
+    """
+    items = _PLANNER.items
+    for position in _PLANNER.candidates(base, _PLANNER.plan(base)):
+        if end is not None and position >= end:
+            break  # candidates are sorted
+        item = items[position]
+        if base.bound(item):
+            equality, similarity = base.compare(item)
+            if similarity:
+                yield position, equality, similarity
+
+
+def _best(results):
+    """Get the most similar result (preferring equality, then the first).
+
+    @return: (position, equality, similarity) or None
+
+    """
+    return max(results, default=None,
+               key=lambda result: (bool(result[1]), float(result[2]),
+                                   -result[0]))
+
+
+def _match(rows):
+    """Find the most similar reference record for each row."""
+    results = []
+    for row in rows:
+        best = _best(_search(_SCHEMA.record(row)))
+        results.append((None, None) if best is None else
+                       (best[0], float(best[2])))
+    return results
+
+
+def _dedupe(span):
+    """Find the best earlier record for each record in a span."""
+    results = []
+    for position in range(*span):
+        best = _best(_search(_PLANNER.items[position], end=position))
+        if best is None:
+            results.append((tools.NEW, None, None))
+        else:
+            status = tools.DUPLICATE if best[1] else tools.NEAR_DUPLICATE
+            results.append((status, best[0], float(best[2])))
+    return results
+
+
+def _link(span):
+    """Find the earlier records similar to each record in a span."""
+    return [[other for other, _, _ in
+             _search(_PLANNER.items[position], end=position)]
+            for position in range(*span)]
+
+
+def _imap(function, tasks, processes, initargs):
+    """Yield the results of tasks in order, run in worker processes.
+
+    At most a few tasks per process are submitted ahead of the results
+    consumed, so input is read (and memory used) as results are written.
+
+    """
+    if processes <= 1:
+        _initialize(*initargs)
+        for task in tasks:
+            yield function(task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor  # slow to import
+    with ProcessPoolExecutor(processes, initializer=_initialize,
+                             initargs=initargs) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(function, task))
+            if len(pending) >= processes * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# Jobs #######################################################################
+
+
+def match(rows, reference, schema, writer, progress, processes, size):  # pylint: disable=R0913
+    """Write the most similar reference row for each row."""
+    position = 0
+    for results in _imap(_match, chunks(rows, size), processes,
+                         (schema, list(reference))):
+        for result in results:
+            writer.write((position,) + result)
+            position += 1
+        progress.update(len(results))
+
+
+def dedupe(rows, schema, writer, progress, processes, size):  # pylint: disable=R0913
+    """Write the first equal (or most similar) earlier row for each row.
+
+    All rows are held in memory (in every worker process).
+
+    """
+    rows = _load(rows, progress)
+    position = 0
+    for results in _imap(_dedupe, _spans(len(rows), size), processes,
+                         (schema, rows)):
+        for result in results:
+            writer.write((position,) + result)
+            position += 1
+        progress.update(len(results))
+
+
+def cluster(rows, schema, writer, progress, processes, size):  # pylint: disable=R0913
+    """Write the first row of the group linked to each row.
+
+    All rows are held in memory (in every worker process) and results are
+    written once every row is compared, as later rows may merge groups.
+
+    """
+    rows = _load(rows, progress)
+    pairs = []
+    position = 0
+    for results in _imap(_link, _spans(len(rows), size), processes,
+                         (schema, rows)):
+        for others in results:
+            pairs.extend((position, other) for other in others)
+            position += 1
+        progress.update(len(results))
+    for position, label in enumerate(tools._labels(len(rows), pairs)):  # pylint: disable=W0212
+        writer.write((position, label))
+
+
+def _load(rows, progress):
+    """Read all rows in chunks (each row is compared to earlier rows)."""
+    loaded = []
+    for chunk in chunks(rows, CHUNK):
+        loaded.extend(chunk)
+        progress.update(len(chunk), stage="read")
+    progress.count = 0
+    progress.start = time.perf_counter()
+    return loaded
+
+
+def _spans(count, size):
+    """Get (start, stop) positions of chunks."""
+    return ((start, min(start + size, count))
+            for start in range(0, count, size))
+
+
+def column_types():
+    """Get the names of the registered types that columns can use."""
+    return [name for name in registry.types()
+            if issubclass(registry.resolve(name), SimpleComparable)]
+
+
+def main(args=None):
+    """Process command-line arguments and run a job."""
+    parser = argparse.ArgumentParser(
+        prog='comparable', description=__doc__.split('\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="types: " + ', '.join(sorted(column_types())))
+    parser.add_argument('job', choices=JOBS, help="job to run")
+    parser.add_argument('input', metavar='INPUT',
+                        help="CSV or JSONL file ('-' for stdin)")
+    parser.add_argument('-c', '--column', dest='columns', action='append',
+                        default=[], metavar='NAME[:TYPE[:WEIGHT]]',
+                        help="column to compare (repeatable)")
+    parser.add_argument('-r', '--reference', metavar='PATH',
+                        help="CSV or JSONL file of rows to match")
+    parser.add_argument('-t', '--threshold', type=float,
+                        help="similarity ratio required of rows")
+    parser.add_argument('-o', '--output', metavar='PATH',
+                        help="file for results (default: stdout)")
+    parser.add_argument('-f', '--format', choices=FORMATS,
+                        help="format of input files (default: extension)")
+    parser.add_argument('--chunk', type=int, default=CHUNK,
+                        help="rows compared by a worker at once")
+    parser.add_argument('-p', '--processes', type=int,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="only report the totals")
+    args = parser.parse_args(args)
+
+    try:
+        schema = Schema.parse(args.columns, threshold=args.threshold)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.job == 'match' and not args.reference:
+        parser.error("--reference is required to match")
+    for path in (args.input, args.reference):
+        if path and path != '-' and not os.path.isfile(path):
+            parser.error("file not found: {}".format(path))
+    processes = args.processes or os.cpu_count() or 1
+    rows = checked(read_rows(args.input, args.format), schema, args.input)
+
+    stream = sys.stdout
+    if args.output:
+        stream = open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        writer = _Writer(stream, _format(args.output), FIELDS[args.job])
+        progress = _Progress(quiet=args.quiet)
+        if args.job == 'match':
+            reference = checked(read_rows(args.reference, args.format),
+                                schema, args.reference)
+            match(rows, reference, schema, writer, progress, processes,
+                  args.chunk)
+        elif args.job == 'dedupe':
+            dedupe(rows, schema, writer, progress, processes, args.chunk)
+        else:
+            cluster(rows, schema, writer, progress, processes, args.chunk)
+        stream.flush()
+        progress.finish()
+    except RowError as error:
+        stream.flush()
+        parser.error(str(error))
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover (manual test)
+    sys.exit(main())
@@ -1,37 +1,156 @@
 """Class definitions for compound comparable types."""
 
-import logging
-from itertools import permutations
+from itertools import combinations, permutations
 
-from comparable.base import CompoundComparable
+from comparable.base import Comparable, CompoundComparable, Deadline
+from comparable import metrics
+
+
+_NAMES = []  # attribute names shared by all groups: "item1", "item2", ...
+
+
+def _name(index):
+    """Get the attribute name of the item at an index."""
+    while len(_NAMES) <= index:
+        _NAMES.append("item{0}".format(len(_NAMES) + 1))
+    return _NAMES[index]
+
+
+def _key(item):
+    """Get the hashable key of an item (or None if unavailable)."""
+    if isinstance(item, Comparable):
+        return item.key()
+    try:
+        hash(item)
+    except TypeError:
+        return None
+    return item
+
+
+def _fraction(sim, total):
+    """Scale a total similarity by the total weight."""
+    return sim / total if total else 0.0
+
+
+def _assign(cells, deadline=None):
+    """Find the pairing of rows and columns with the highest total score.
+
+    Uses the Hungarian algorithm (O(n^3)) with potentials.
+
+    @param cells: square matrix of (score, weight) pairs
+    @param deadline: L{Deadline} to stop searching (or None)
+    @return: list of the column paired with each row or None if expired
+
+    """
+    length = len(cells)
+    infinity = float('inf')
+    potential_rows = [0.0] * (length + 1)
+    potential_columns = [0.0] * (length + 1)
+    matches = [0] * (length + 1)  # row (1-based) matched to each column
+    ways = [0] * (length + 1)
+
+    for row in range(1, length + 1):
+        if deadline is not None and deadline.expired():
+            return None
+        matches[0] = row
+        column0 = 0
+        minimums = [infinity] * (length + 1)
+        used = [False] * (length + 1)
+        while True:
+            used[column0] = True
+            row0 = matches[column0]
+            delta, column1 = infinity, 0
+            for column in range(1, length + 1):
+                if not used[column]:
+                    cost = (-cells[row0 - 1][column - 1][0] -
+                            potential_rows[row0] - potential_columns[column])
+                    if cost < minimums[column]:
+                        minimums[column], ways[column] = cost, column0
+                    if minimums[column] < delta:
+                        delta, column1 = minimums[column], column
+            for column in range(length + 1):
+                if used[column]:
+                    potential_rows[matches[column]] += delta
+                    potential_columns[column] -= delta
+                else:
+                    minimums[column] -= delta
+            column0 = column1
+            if matches[column0] == 0:
+                break
+        while column0:
+            column1 = ways[column0]
+            matches[column0] = matches[column1]
+            column0 = column1
+
+    columns = [None] * length
+    for column in range(1, length + 1):
+        columns[matches[column] - 1] = column - 1
+    return columns
+
+
+def _matched(items1, items2, equal):
+    """Determine if the items can be paired so each pair is equal.
+
+    @param items1: list of items in one group
+    @param items2: list of items in the other group (of the same length)
+    @param equal: function to compare an item of each group for equality
+
+    """
+    # Pair each item with the first remaining equal item
+    matches = {}  # position2: position1
+    remaining = list(range(len(items2)))
+    unmatched = []
+    for position1, item1 in enumerate(items1):
+        for rank, position2 in enumerate(remaining):
+            if equal(item1, items2[position2]):
+                matches[position2] = position1
+                del remaining[rank]
+                break
+        else:
+            unmatched.append(position1)
+
+    # Reassign earlier pairs when the first choices conflict
+    def augment(position1, seen):  # pylint: disable=C0111
+        for position2, item2 in enumerate(items2):
+            if position2 not in seen and equal(items1[position1], item2):
+                seen.add(position2)
+                if position2 not in matches or \
+                        augment(matches[position2], seen):
+                    matches[position2] = position1
+                    return True
+        return False
+
+    return all(augment(position1, set()) for position1 in unmatched)
 
 
 class Group(CompoundComparable):  # pylint: disable=W0223
 
-    """Comparable list of Comparable items."""
+    """Comparable list of Comparable items.
+
+    Items are similar in any order. Items are only equal in order unless
+    both groups are created with 'ordered=False', which compares groups as
+    multisets by matching items with the same keys (see L{Comparable.key}).
+
+    """
 
-    attributes = None  # created dynamically
+    # Groups are not compared by attributes, so they are never tracked
+    __setattr__ = object.__setattr__
 
-    def __init__(self, items):
+    def __init__(self, items, ordered=True):
         self.items = items
-        names = ("item{0}".format(n + 1) for n in range(len(items)))
-        self.attributes = {name: 1 for name in names}
+        self.ordered = ordered
 
     def __repr__(self):
-        return self._repr(self.items)
+        return self._repr(self.items, ordered=None if self.ordered else False)
 
     def __getattr__(self, name):
         """Allow self.items[<i>] to be accessed as self.item<i+1>."""
-        if name.startswith('item'):
-            try:
-                index = int(name[4:]) - 1  # "item<n>" -> <n>-1
+        if name.startswith('item') and name[4:].isdigit():
+            index = int(name[4:]) - 1  # "item<n>" -> <n>-1
+            if 0 <= index < len(self):
                 return self[index]
-            except ValueError:
-                logging.debug("%s is not in the form 'item<n>'", name)
-            except IndexError:
-                logging.debug("item index %s is out of range", index)
 
-        raise AttributeError
+        raise AttributeError(name)
 
     def __len__(self):
         return len(self.items)
@@ -39,37 +158,332 @@ class Group(CompoundComparable):  # pylint: disable=W0223
     def __getitem__(self, index):
         return self.items[index]
 
+    _attributes = None  # attributes assigned in place of the items
+
+    @property
+    def attributes(self):
+        """Get an attribute {"item<n>": 1} dictionary (created on access)."""
+        if self._attributes is not None:
+            return self._attributes
+        return {_name(index): 1 for index in range(len(self))}
+
+    @attributes.setter
+    def attributes(self, attributes):
+        """Compare the group by the assigned attributes instead."""
+        self._attributes = attributes
+
     def equality(self, other):
-        """Calculate equality based on equality of all group items."""
+        """Calculate equality based on equality of all group items.
+
+        Groups that override 'attributes' are compared by attributes.
+
+        """
+        if self._overridden():
+            return super().equality(other)
+
         if not len(self) == len(other):
             return False
-        return super().equality(other)
 
-    def similarity(self, other):
-        """Calculate similarity based on best matching permutation of items."""
+        if not self.ordered and not getattr(other, 'ordered', True):
+            return self._equality_unordered(other)
+
+        for index, (item1, item2) in enumerate(zip(self.items, other.items)):
+            if not self._equal(index, item1, item2):
+                return False
+
+        return True
+
+    def _overridden(self):
+        """Determine if the attributes of items are overridden."""
+        return self._attributes is not None or \
+            type(self).attributes is not Group.attributes
+
+    def _equal(self, index, item1, item2):
+        """Compare two items for equality."""
+        cname = self.__class__.__name__
+        aname = _name(index)
+        self.log(item1, item2, '==', cname=cname, aname=aname)
+        start = metrics.clock() if metrics.enabled else None
+        eql = (item1 == item2)
+        if start is not None:
+            metrics.record(cname, aname, '==', start)
+        self.log(item1, item2, '==', cname=cname, aname=aname, result=eql)
+        return eql
+
+    def _equality_unordered(self, other):
+        """Calculate equality of the items in any order.
+
+        Items are bucketed by type and key, so items of the same type are
+        only compared when their keys match, which is O(n) expected when
+        every item has a key. Items without keys, and items left unpaired
+        in their buckets, are then compared pairwise (items of different
+        types may be equal). If that fails, all items are paired again
+        (reusing the comparisons made) to find an exact answer.
+
+        """
+        tags = ([], [])  # (type, key) of each item or None without a key
+        buckets = {}  # (type, key): ([(index, item), ...], [...])
+        rest = ([], [])  # [(index, item), ...] compared pairwise
+        for position, items in enumerate((self.items, other.items)):
+            for index, item in enumerate(items):
+                key = _key(item)
+                tag = None if key is None else (type(item), key)
+                tags[position].append(tag)
+                if tag is None:
+                    rest[position].append((index, item))
+                else:
+                    bucket = buckets.setdefault(tag, ([], []))
+                    bucket[position].append((index, item))
+
+        cache = {}  # (index1, index2): equality
+
+        def equal(entry1, entry2):  # pylint: disable=C0111
+            (index1, item1), (index2, item2) = entry1, entry2
+            if (index1, index2) not in cache:
+                tag1, tag2 = tags[0][index1], tags[1][index2]
+                if tag1 and tag2 and tag1[0] is tag2[0] and tag1 != tag2:
+                    cache[index1, index2] = False  # keys differ
+                else:
+                    cache[index1, index2] = self._equal(index1, item1, item2)
+            return cache[index1, index2]
+
+        # Pair the items with the same type and key
+        for items1, items2 in buckets.values():
+            if len(items1) != len(items2) or \
+                    not _matched(items1, items2, equal):
+                rest[0].extend(items1)
+                rest[1].extend(items2)
+        if not any(rest):
+            return True
+
+        # Items of one type with keys can only pair within their buckets
+        if all(tags[0]) and all(tags[1]) and \
+                len(set(tag[0] for tag in tags[0] + tags[1])) == 1:
+            return False
+
+        if _matched(rest[0], rest[1], equal):
+            return True
+        return _matched(list(enumerate(self.items)),
+                        list(enumerate(other.items)), equal)
+
+    def similarity(self, other, deadline=None):
+        """Calculate similarity based on best matching permutation of items.
+
+        Each pair of items is compared at most once. Without a deadline, the
+        best pairing is found exactly. With a deadline, the items are paired
+        in order, then greedily (using the pairs compared in time), and the
+        pairing is refined until an exact result or the deadline is reached.
+        Groups that override 'attributes' are compared by attributes.
+
+        @param deadline: L{Deadline} or number of seconds (default: none)
+
+        """
+        if self._overridden():
+            return super().similarity(other)
+
+        deadline = Deadline.create(deadline)
+
         # Select the longer list as the basis for comparison
         if len(self.items) > len(other.items):
             first, second = self, other
         else:
             first, second = other, self
-        items = list(first.items)  # backup items list
-        length = len(items)
-        sim = self.Similarity(0.0 if length else 1.0)
+        items1 = first.items
+        items2 = list(second.items) + [None] * (len(items1) - len(second))
+        if not items1:
+            return self.Similarity(1.0)
+
+        cells, complete = self._cells(items1, items2, deadline)
 
-        # Calculate the similarity for each permutation of items
+        if deadline is None:
+            columns, exact = self._exact(cells), True
+        else:
+            columns, exact = self._greedy(cells, items1, items2), False
+            if complete and not deadline.expired():
+                columns = self._refine(cells, deadline, columns)
+                result = self._exact(cells, deadline)
+                if result is not None:
+                    columns, exact = result, True
+            if not exact:
+                deadline.exact = False
+
+        sim = self.Similarity(self._score(cells, columns))
+        sim.exact = exact
+        return sim
+
+    def _cell(self, index, item1, item2):
+        """Compare two items for similarity.
+
+        Items follow the same rules as attributes (see
+        L{Comparable.similarity}): a missing item has no similarity.
+
+        @return: (similarity, 1 if the pair is weighted else 0)
+
+        """
         cname = self.__class__.__name__
+        aname = _name(index)
+        self.log(item1, item2, '%', cname=cname, aname=aname)
 
-        for num, perm in enumerate(permutations(items, length), start=1):
-            first.items = perm
-            aname = 'items-p{}'.format(num)
-            self.log(first, second, '%', cname=cname, aname=aname)
-            permutation_sim = super(Group, first).similarity(second)
-            self.log(first, second, '%', cname=cname, aname=aname,
-                     result=permutation_sim)
+        # Similarity is ignored if None on both objects
+        if item1 is None and item2 is None:
+            self.log(item1, item2, '%', cname=cname, aname=aname,
+                     result="attributes are both None")
+            return 0.0, 0
 
-            sim = max(sim, permutation_sim)
-            logging.debug("highest similarity: %s", sim)
+        # Similarity is 0 if either item is non-Comparable
+        if not all((isinstance(item1, Comparable),
+                    isinstance(item2, Comparable))):
+            self.log(item1, item2, '%', cname=cname, aname=aname,
+                     result="attributes not Comparable")
+            return 0.0, 1
 
-        first.items = items  # restore original items list
+        start = metrics.clock() if metrics.enabled else None
+        item_sim = (item1 % item2)
+        if start is not None:
+            metrics.record(cname, aname, '%', start)
+        self.log(item1, item2, '%', cname=cname, aname=aname,
+                 result=item_sim)
+        return float(item_sim), 1
 
-        return sim
+    def _cells(self, items1, items2, deadline):
+        """Compare every pair of items until the deadline.
+
+        @return: square matrix of L{_cell} results (None if not compared)
+                 and True if every pair was compared
+
+        """
+        length = len(items1)
+        cells = [[None] * length for _ in range(length)]
+
+        # Compare the pairs in order first, so a result is always available
+        for index in range(length):
+            cells[index][index] = self._cell(index, items1[index],
+                                             items2[index])
+
+        for index1, item1 in enumerate(items1):
+            for index2, item2 in enumerate(items2):
+                if index1 != index2:
+                    if deadline is not None and deadline.expired():
+                        return cells, False
+                    cells[index1][index2] = self._cell(index1, item1, item2)
+
+        return cells, True
+
+    @staticmethod
+    def _score(cells, columns):
+        """Get the similarity of a pairing of items as a float."""
+        return _fraction(
+            sum(cells[row][column][0] for row, column in enumerate(columns)),
+            sum(cells[row][column][1] for row, column in enumerate(columns)))
+
+    def _greedy(self, cells, items1, items2):
+        """Pair the most similar compared items first.
+
+        Rows left without a compared column are paired with the remaining
+        columns in order. The pairing in order is kept if it is better.
+
+        """
+        length = len(cells)
+        ranked = sorted((-cell[0], row, column)
+                        for row, cells_row in enumerate(cells)
+                        for column, cell in enumerate(cells_row)
+                        if cell is not None)
+        columns = [None] * length
+        used = set()
+        for _, row, column in ranked:
+            if columns[row] is None and column not in used:
+                columns[row] = column
+                used.add(column)
+
+        remaining = iter(column for column in range(length)
+                         if column not in used)
+        for row in range(length):
+            if columns[row] is None:
+                # A compared pair would have been paired above
+                column = columns[row] = next(remaining)
+                cells[row][column] = self._cell(row, items1[row],
+                                                items2[column])
+
+        in_order = list(range(length))
+        if self._score(cells, in_order) >= self._score(cells, columns):
+            return in_order
+        return columns
+
+    @staticmethod
+    def _refine(cells, deadline, columns):
+        """Swap pairs of items while the similarity improves."""
+        columns = list(columns)
+        sim = sum(cells[row][column][0] for row, column in enumerate(columns))
+        total = sum(cells[row][column][1]
+                    for row, column in enumerate(columns))
+        improved = True
+        while improved:
+            improved = False
+            for row1, row2 in combinations(range(len(columns)), 2):
+                if deadline.expired():
+                    return columns
+                column1, column2 = columns[row1], columns[row2]
+                before = (cells[row1][column1], cells[row2][column2])
+                after = (cells[row1][column2], cells[row2][column1])
+                new_sim = sim + sum(value for value, _ in after) - \
+                    sum(value for value, _ in before)
+                new_total = total + sum(weight for _, weight in after) - \
+                    sum(weight for _, weight in before)
+                if _fraction(new_sim, new_total) > \
+                        _fraction(sim, total) + 1e-12:
+                    columns[row1], columns[row2] = column2, column1
+                    sim, total, improved = new_sim, new_total, True
+        return columns
+
+    def _exact(self, cells, deadline=None):
+        """Find the best pairing of items (or None if the deadline expires).
+
+        When every pair is weighted, the best pairing is an assignment
+        problem solved in polynomial time. Otherwise, the number of weighted
+        pairs varies, so all permutations are searched.
+
+        """
+        if all(weight for row in cells for _, weight in row):
+            return _assign(cells, deadline)
+
+        best, result = None, None
+        for perm in permutations(range(len(cells))):
+            if deadline is not None and deadline.expired():
+                return None
+            score = self._score(cells, perm)
+            if best is None or score > best:
+                best, result = score, list(perm)
+        return result
+
+    def key(self):
+        """A group's key is based on the keys of its items in order.
+
+        Unordered groups have no key: they are equal to each other with the
+        items in any order, but also to ordered groups with the items in the
+        same order, which have different keys.
+        Groups that override 'attributes' use the keys of the attributes.
+
+        """
+        if self._overridden():
+            return super().key()
+        if not self.ordered:
+            return None
+
+        keys = []
+        for item in self.items:
+            if isinstance(item, Comparable):
+                item = item.key()
+                if item is None:
+                    return None
+            keys.append(item)
+
+        key = tuple(keys)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def bound(self, other):
+        """Items may match in any order, so attribute bounds do not apply."""
+        return self.Similarity(1.0)
@@ -0,0 +1,509 @@
+"""Reference lists of items prepared for repeated matching."""
+
+import os
+import heapq
+from array import array
+from bisect import bisect_left
+from itertools import repeat
+from difflib import SequenceMatcher
+
+from comparable.simple import Number, Text, TextEnum, TextTitle
+from comparable.vector import TextVector, Matrix
+
+
+class _Scan(object):
+
+    """Prepared items of any type (compared one at a time)."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def match(self, base):
+        """Find the position of the most similar matching item."""
+        best, best_sim = None, None
+        for position, item in enumerate(self.items):
+            if not base.bound(item):
+                continue
+            sim = base.similarity(item)
+            if sim and (best is None or sim > best_sim):
+                best, best_sim = position, sim
+        return best, best_sim
+
+    def top(self, base, k, exclude=None):
+        """Find the positions of the most similar items.
+
+        @param base: base item to locate similar items
+        @param k: maximum number of items
+        @param exclude: position of an item to skip
+        @return: list of (position, float similarity > 0) in descending
+                 similarity, then ascending position
+
+        """
+        heap = []  # (similarity, -position) of the best items so far
+        for position, item in enumerate(self.items):
+            if position == exclude:
+                continue
+            # Later items must be more similar to replace the k-th item
+            if len(heap) == k and float(base.bound(item)) <= heap[0][0]:
+                continue
+            _push(heap, k, float(base.similarity(item)), position)
+        return _ranked(heap)
+
+
+def _push(heap, k, similarity, position):
+    """Keep an item in a heap of the k most similar items."""
+    if similarity <= 0:
+        return
+    entry = similarity, -position
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+def _ranked(heap):
+    """Get the (position, similarity) of a heap's items from the best."""
+    return [(-negative, similarity) for similarity, negative
+            in sorted(heap, reverse=True)]
+
+
+class _Numbers(_Scan):
+
+    """Prepared numbers (sorted for binary search)."""
+
+    def __init__(self, items):
+        super().__init__(items)
+        values = {}  # value: positions
+        for position, item in enumerate(items):
+            values.setdefault(float(item), []).append(position)
+        self.values = sorted(values)
+        self.groups = [values[value] for value in self.values]
+        self.positions = [group[0] for group in self.groups]
+
+    def match(self, base):
+        # The most similar values are adjacent to the base value
+        index = bisect_left(self.values, float(base))
+        best, best_sim = None, None
+        for rank in (index - 1, index):
+            if not 0 <= rank < len(self.values):
+                continue
+            position = self.positions[rank]
+            sim = base.similarity(self.items[position])
+            if best is None or float(sim) > float(best_sim) or \
+                    (float(sim) == float(best_sim) and position < best):
+                best, best_sim = position, sim
+        if best_sim:
+            return best, best_sim
+        return None, None
+
+    def top(self, base, k, exclude=None):
+        # Values are visited outward from the base value in descending
+        # similarity until the next value is less similar than the k-th
+        index = bisect_left(self.values, float(base))
+        left, right = index - 1, index
+        found = []  # (position, similarity)
+        while k:
+            sims = [(float(base.similarity(self.items[self.positions[rank]])),
+                     rank) for rank in (left, right)
+                    if 0 <= rank < len(self.values)]
+            if not sims:
+                break
+            sim, rank = max(sims)
+            if sim <= 0 or len(found) >= k and sim < found[-1][1]:
+                break
+            if rank == left:
+                left -= 1
+            else:
+                right += 1
+            found.extend((position, sim) for position in self.groups[rank]
+                         if position != exclude)
+        found.sort(key=lambda result: (-result[1], result[0]))
+        return found[:k]
+
+
+class _Enums(_Scan):
+
+    """Prepared textual enumerations (hashed by lowercase value)."""
+
+    def __init__(self, items):
+        super().__init__(items)
+        self.folded = {}  # lowercase value: positions
+        for position, item in enumerate(items):
+            self.folded.setdefault(str(item).lower(), []).append(position)
+
+    def match(self, base):
+        positions = self.folded.get(str(base).lower())
+        if positions is None:
+            return None, None
+        # Equal lowercase values are always similar enough
+        return positions[0], base.similarity(self.items[positions[0]])
+
+    def top(self, base, k, exclude=None):
+        found = []
+        for position in self.folded.get(str(base).lower(), ()):
+            if len(found) >= k:
+                break
+            sim = float(base.similarity(self.items[position]))
+            if position != exclude and sim > 0:
+                found.append((position, sim))
+        return found
+
+
+class _Texts(_Scan):
+
+    """Prepared texts (with reusable 'SequenceMatcher' objects)."""
+
+    def __init__(self, items):
+        super().__init__(items)
+        texts = {}  # text: positions
+        for position, item in enumerate(items):
+            texts.setdefault(self._text(item), []).append(position)
+        self.groups = sorted(texts.values(), key=lambda positions: len(
+            self._text(items[positions[0]])))
+        self.positions = [group[0] for group in self.groups]
+        self.lengths = [items[position].sketch.length
+                        for position in self.positions]
+        self.histograms = [items[position].sketch.histogram
+                           for position in self.positions]
+        self.matchers = [SequenceMatcher(b=self._text(items[position]))
+                         for position in self.positions]
+
+    @staticmethod
+    def _text(item):
+        """Get the text of an item used for similarity."""
+        return item.stripped if isinstance(item, TextTitle) else item.value
+
+    def _estimated(self, base):
+        """Determine if a base may be compared by shingle sketches."""
+        if base.long or base.sketch is None or not self.positions:
+            return base.long
+        longest = self.items[self.positions[-1]]  # sorted by length
+        return base._long(longest, longest.sketch)  # pylint: disable=W0212
+
+    def match(self, base):
+        if self._estimated(base):
+            return super().match(base)  # estimated from shingle sketches
+        threshold = base.threshold
+        best, best_ratio = None, None
+        limit = [threshold]  # ratio needed to beat the best match so far
+
+        for rank, ratio in self._walk(base, limit):
+            position = self.positions[rank]
+            if ratio >= threshold and (best is None or ratio > best_ratio or
+                                       (ratio == best_ratio and
+                                        position < best)):
+                best, best_ratio = position, ratio
+                limit[0] = ratio
+
+        if best is None:
+            return None, None
+        return best, base.Similarity(best_ratio)
+
+    def top(self, base, k, exclude=None):
+        if self._estimated(base):
+            return super().top(base, k, exclude)  # estimated from sketches
+        heap = []  # (ratio, -position) of the best texts so far
+        limit = [0.0]  # ratio needed to reach the k-th best text so far
+        if not k:
+            return []
+
+        for rank, ratio in self._walk(base, limit):
+            for position in self.groups[rank]:
+                if position != exclude:
+                    _push(heap, k, ratio, position)
+            if len(heap) == k:
+                limit[0] = heap[0][0]
+        return _ranked(heap)
+
+    def _walk(self, base, limit):
+        """Generate (rank, ratio) of texts that may reach a limit.
+
+        Texts are visited outward from the base length, which orders them
+        by descending length bound, so the search stops at the first text
+        that cannot reach the limit (which may rise after each text).
+        Texts without common characters are never generated.
+
+        @param base: base text
+        @param limit: list containing the ratio required
+
+        """
+        length = base.sketch.length
+        text = self._text(base)
+        buckets = [(bucket, count) for bucket, count
+                   in enumerate(base.sketch.histogram) if count]
+
+        left = bisect_left(self.lengths, length) - 1
+        right = left + 1
+        while left >= 0 or right < len(self.lengths):
+            if right >= len(self.lengths) or (
+                    left >= 0 and self._bound(length, left) >=
+                    self._bound(length, right)):
+                rank, left = left, left - 1
+            else:
+                rank, right = right, right + 1
+            required = limit[0]
+            bound = self._bound(length, rank)
+            if bound < required or not bound:
+                break  # no remaining text can be similar enough
+
+            # Matching characters are limited by the common buckets
+            histogram = self.histograms[rank]
+            total = length + self.lengths[rank]
+            matches = sum(min(count, histogram[bucket])
+                          for bucket, count in buckets)
+            if total and (2.0 * matches / total < required or not matches):
+                continue
+
+            matcher = self.matchers[rank]
+            matcher.set_seq1(text)
+            yield rank, matcher.ratio()
+
+    def _bound(self, length, rank):
+        """Get the ratio bound from the lengths of two texts."""
+        other = self.lengths[rank]
+        total = length + other
+        return 2.0 * min(length, other) / total if total else 1.0
+
+
+class _Vectors(_Scan):
+
+    """Prepared token vectors (stored by dimension for bulk scoring)."""
+
+    def __init__(self, items):
+        super().__init__(items)
+        self.matrix = Matrix(items)
+
+    def match(self, base):
+        return self.matrix.match(base)
+
+    def top(self, base, k, exclude=None):
+        return self.matrix.top(base, k, exclude=exclude)
+
+
+class PreparedCorpus(object):
+
+    """List of reference items prepared once for matching many bases.
+
+    Lists of a single simple type are preprocessed to avoid repeating work
+    for each base: numbers are sorted, textual enumerations are hashed,
+    texts keep 'SequenceMatcher' objects (which cache information about the
+    reference text) ordered by length for pruning, and token vectors are
+    stored in a L{vector.Matrix}. Other lists are scanned.
+
+    """
+
+    PREPARERS = {Number: _Numbers, Text: _Texts, TextTitle: _Texts,
+                 TextEnum: _Enums, TextVector: _Vectors}
+
+    def __init__(self, items):
+        self.items = list(items)
+        self._prepare()
+
+    def __repr__(self):
+        return "<{} of {} items>".format(self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getstate__(self):
+        return {'items': self.items}  # prepared data is recreated
+
+    def __setstate__(self, state):
+        self.items = state['items']
+        self._prepare()
+
+    def _prepare(self):
+        """Preprocess the items based on their type."""
+        kinds = {type(item) for item in self.items}
+        self.kind = kinds.pop() if len(kinds) == 1 else None
+        preparer = self.PREPARERS.get(self.kind, _Scan)
+        if preparer is _Texts and \
+                not all(isinstance(item.value, str) and not item.long
+                        for item in self.items):
+            preparer = _Scan  # ratios are not calculated directly
+        if preparer is _Vectors and len({item.vocabulary.uid
+                                         for item in self.items}) > 1:
+            preparer = _Scan
+        self._prepared = preparer(self.items)
+        self._scan = _Scan(self.items)
+
+    def match_position(self, base):
+        """Get the position of the most similar matching item.
+
+        @param base: base item to locate best match
+        @return: (position, L{Similarity}) or (None, None)
+
+        """
+        if type(base) is self.kind and 0 < base.threshold <= 1:  # pylint: disable=C0123
+            return self._prepared.match(base)
+        return self._scan.match(base)
+
+    def top_positions(self, base, k, exclude=None):
+        """Get the positions of the most similar items.
+
+        Unlike L{match_position}, the threshold is ignored: any item with
+        a similarity above zero may be returned.
+
+        @param base: base item to locate similar items
+        @param k: maximum number of items
+        @param exclude: position of an item to skip (e.g. the base's own)
+        @return: list of (position, float similarity) in descending
+                 similarity, then ascending position
+
+        """
+        if type(base) is self.kind:  # pylint: disable=C0123
+            return self._prepared.top(base, k, exclude)
+        return self._scan.top(base, k, exclude)
+
+    def match(self, base):
+        """Get the most similar matching item (see L{tools.match_similar}).
+
+        @param base: base item to locate best match
+        @return: (item, L{Similarity}) or (None, None)
+
+        """
+        position, similarity = self.match_position(base)
+        if position is None:
+            return None, None
+        return self.items[position], similarity
+
+
+_WORKER_CORPUS = None  # corpus in each worker process
+
+
+def _initialize(corpus):
+    """Store the corpus in a worker process."""
+    global _WORKER_CORPUS  # pylint: disable=W0603
+    _WORKER_CORPUS = corpus
+
+
+def _pool(processes, corpus):
+    """Start worker processes that each store a corpus."""
+    from concurrent.futures import ProcessPoolExecutor  # slow to import
+    return ProcessPoolExecutor(processes, initializer=_initialize,
+                               initargs=(corpus,))
+
+
+def _match_positions(bases, corpus=None):
+    """Find the position of the best match for each base."""
+    corpus = corpus if corpus is not None else _WORKER_CORPUS
+    return [corpus.match_position(base) for base in bases]
+
+
+def match_many(bases, items, processes=None):
+    """Get the most similar matching item for each of many bases.
+
+    @param bases: list of base items
+    @param items: list of items (or L{PreparedCorpus}) for comparison
+    @param processes: number of worker processes (default: CPU count)
+
+    @return: list of (item, L{Similarity}) or (None, None) for each base
+
+    """
+    bases = list(bases)
+    if not isinstance(items, PreparedCorpus):
+        items = PreparedCorpus(items)
+    processes = min(processes or os.cpu_count() or 1, len(bases))
+
+    if processes <= 1:
+        positions = _match_positions(bases, items)
+    else:
+        size = -(-len(bases) // (processes * 4))  # chunks per process
+        chunks = [bases[index:index + size]
+                  for index in range(0, len(bases), size)]
+        with _pool(processes, items) as executor:
+            positions = [result for results in
+                         executor.map(_match_positions, chunks)
+                         for result in results]
+
+    return [(None, None) if position is None else
+            (items.items[position], similarity)
+            for position, similarity in positions]
+
+
+class Graph(object):
+
+    """Adjacency of items to their most similar other items.
+
+    The neighbors of the item at a position are stored in flat arrays:
+    'indices[offsets[position]:offsets[position + 1]]' are the positions
+    of the neighbors (from the most similar) and 'scores' are the float
+    similarities at the same indices.
+
+    """
+
+    def __init__(self, k, offsets, indices, scores):
+        self.k = k
+        self.offsets = offsets  # array of the first index of each item
+        self.indices = indices  # array of positions of neighbors
+        self.scores = scores  # array of similarities to neighbors
+
+    def __repr__(self):
+        return "<{} of {} items with {} edges>".format(
+            self.__class__.__name__, len(self), len(self.indices))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        return self.neighbors(position)
+
+    def __iter__(self):
+        return (self.neighbors(position) for position in range(len(self)))
+
+    def neighbors(self, position):
+        """Get the neighbors of an item.
+
+        @param position: position of the item
+        @return: list of (position, float similarity) from the most similar
+
+        """
+        start, stop = self.offsets[position], self.offsets[position + 1]
+        return list(zip(self.indices[start:stop], self.scores[start:stop]))
+
+
+def _neighbors(span, k, corpus=None):
+    """Find the nearest neighbors of each item in a range of positions."""
+    corpus = corpus if corpus is not None else _WORKER_CORPUS
+    counts, indices, scores = array('l'), array('l'), array('d')
+    for position in range(*span):
+        found = corpus.top_positions(corpus.items[position], k,
+                                     exclude=position)
+        counts.append(len(found))
+        for index, score in found:
+            indices.append(index)
+            scores.append(score)
+    return counts, indices, scores
+
+
+def knn_graph(items, k, processes=None):
+    """Get the k most similar other items of every item.
+
+    @param items: list of items (or L{PreparedCorpus})
+    @param k: maximum number of neighbors of each item
+    @param processes: number of worker processes (default: CPU count)
+
+    @return: L{Graph} of the neighbors with a similarity above zero
+
+    """
+    if not isinstance(items, PreparedCorpus):
+        items = PreparedCorpus(items)
+    count = len(items)
+    processes = min(processes or os.cpu_count() or 1, count) or 1
+    size = -(-count // (processes * 4)) or 1  # chunks per process
+    spans = [(start, min(start + size, count))
+             for start in range(0, count, size)]
+
+    if processes <= 1:
+        results = [_neighbors(span, k, items) for span in spans]
+    else:
+        with _pool(processes, items) as executor:
+            results = list(executor.map(_neighbors, spans, repeat(k)))
+
+    offsets, indices, scores = array('l', [0]), array('l'), array('d')
+    for counts, chunk_indices, chunk_scores in results:
+        for number in counts:
+            offsets.append(offsets[-1] + number)
+        indices.extend(chunk_indices)
+        scores.extend(chunk_scores)
+    return Graph(k, offsets, indices, scores)
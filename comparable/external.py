@@ -0,0 +1,245 @@
+"""Functions to utilize collections of items larger than memory.
+
+These functions give the same results as their counterparts in L{tools},
+but items are read from any iterable (e.g. a generator over a file) and
+only a bounded amount of them is held in memory at once. Items that must
+be revisited are pickled into temporary files in chunks of at most
+'memory' bytes, and sorted chunks are combined with a k-way merge:
+
+    >>> from comparable.simple import Number
+    >>> items = (Number(value) for value in (1, 40, 42.001, 42))
+    >>> list(sort(Number(42), items, memory=64))
+    [Number(42), Number(42.001), Number(40), Number(1)]
+
+The memory budget counts the pickled size of the items held in memory
+(plus a small fixed overhead for each one), so the actual memory used is
+usually larger by a constant factor.
+
+"""
+
+import os
+import heapq
+import pickle
+import tempfile
+from itertools import groupby
+
+from comparable import tools
+
+MEMORY = 64 * 1024 * 1024  # default bytes of items held in memory
+FANIN = 64  # maximum number of files merged at once
+OVERHEAD = 100  # bytes of memory counted for each item held
+
+
+class _Spill(object):
+
+    """Temporary directory of files of pickled records."""
+
+    def __init__(self, directory=None):
+        self._directory = tempfile.TemporaryDirectory(dir=directory,
+                                                      prefix='comparable-')
+        self._count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Delete the files."""
+        self._directory.cleanup()
+
+    def write(self, blobs):
+        """Write pickled records to a new file.
+
+        @param blobs: iterable of pickled records
+        @return: path of the file
+
+        """
+        path = os.path.join(self._directory.name,
+                            "chunk{}.pickle".format(self._count))
+        self._count += 1
+        with open(path, 'wb') as stream:
+            for blob in blobs:
+                stream.write(blob)
+        return path
+
+    @staticmethod
+    def read(path):
+        """Get an iterator of the records in a file."""
+        with open(path, 'rb') as stream:
+            while True:
+                try:
+                    yield pickle.load(stream)
+                except EOFError:
+                    return
+
+
+def _chunks(records, memory):
+    """Split records into lists of (record, pickled record) within budget.
+
+    @param records: iterable of records
+    @param memory: maximum bytes of records in each list
+    @return: generator of lists of (record, bytes)
+
+    """
+    chunk, size = [], 0
+    for record in records:
+        blob = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        if chunk and size + len(blob) + OVERHEAD > memory:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append((record, blob))
+        size += len(blob) + OVERHEAD
+    if chunk:
+        yield chunk
+
+
+def _sorted(records, spill, memory):
+    """Sort records that may not fit in memory.
+
+    Records must be tuples of a unique key followed by other values (so
+    values are never compared).
+
+    @param records: iterable of records
+    @param spill: L{_Spill} to write sorted chunks
+    @param memory: maximum bytes of records held in memory
+    @return: generator of records sorted by key
+
+    """
+    paths = []
+    for chunk in _chunks(records, memory):
+        chunk.sort(key=lambda entry: entry[0][0])
+        paths.append(spill.write(blob for _, blob in chunk))
+        del chunk  # release it while the next chunk is read
+
+    # Merge in passes to limit the number of files open at once
+    while len(paths) > FANIN:
+        merged = []
+        for start in range(0, len(paths), FANIN):
+            group = paths[start:start + FANIN]
+            merged.append(spill.write(
+                pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+                for record in _merge(group)))
+            for path in group:
+                os.remove(path)
+        paths = merged
+
+    return _merge(paths)
+
+
+def _merge(paths):
+    """Merge files of records sorted by (unique) key."""
+    return heapq.merge(*(_Spill.read(path) for path in paths))
+
+
+def sort(base, items, memory=MEMORY, directory=None):
+    """Get an iterator of items ranked in descending similarity.
+
+    Items with equal similarity keep their order (like L{tools.sort}).
+
+    @param base: base item to perform comparison against
+    @param items: iterable of items to compare to the base
+    @param memory: maximum bytes of items held in memory
+    @param directory: directory for temporary files (default: system's)
+    @return: generator of items sorted by similarity to the base
+
+    """
+    records = (((-float(base.similarity(item)), position), item)
+               for position, item in enumerate(items))
+    with _Spill(directory) as spill:
+        for _, item in _sorted(records, spill, memory):
+            yield item
+
+
+def top_k(base, items, k, deadline=None):
+    """Get a list of the items most similar to the base.
+
+    Only the best k items are held in memory, so nothing is written to
+    disk (see L{tools.top_k}).
+
+    @param base: base item to perform comparison against
+    @param items: iterable of items to compare to the base
+    @param k: maximum number of items to return
+    @param deadline: L{Deadline} or seconds to stop searching (default: none)
+    @return: list of up to k items sorted by similarity to the base
+
+    """
+    return tools.top_k(base, items, k, deadline=deadline)
+
+
+def duplicates(base, items, deadline=None):
+    """Get an iterator of items similar but not equal to the base.
+
+    Items are compared one at a time, so nothing is written to disk (see
+    L{tools.duplicates}).
+
+    @param base: base item to perform comparison against
+    @param items: iterable of items to compare to the base
+    @param deadline: L{Deadline} or seconds to stop searching (default: none)
+    @return: generator of similar items that are not equal
+
+    """
+    return tools.duplicates(base, items, deadline=deadline)
+
+
+def cluster(items, memory=MEMORY, directory=None):
+    """Get an iterator of groups of items linked by similarity.
+
+    Items are written to disk in chunks. Every chunk is loaded in turn and
+    compared to itself and to the items of each earlier chunk read back
+    from disk, so every pair of items is compared once (like
+    L{tools.cluster}) while a single chunk is held in memory. Only the
+    group label of each item is kept for the whole collection. Items are
+    then sorted on disk by group to yield one group at a time.
+
+    @param items: iterable of items to group
+    @param memory: maximum bytes of items held in memory
+    @param directory: directory for temporary files (default: system's)
+    @return: generator of groups (lists of items) ordered by their first
+             item
+
+    """
+    with _Spill(directory) as spill:
+
+        # Write the items in chunks
+        spans = []  # (path, first position, number of items)
+        count = 0
+        for chunk in _chunks(items, memory):
+            spans.append((spill.write(blob for _, blob in chunk),
+                          count, len(chunk)))
+            count += len(chunk)
+            del chunk  # release it while the next chunk is read
+
+        # Link similar items and group them by their first item
+        labels = tools._labels(count, _pairs(spans))  # pylint: disable=W0212
+        records = (((labels[position], position), item) for position, item
+                   in enumerate(item for path, _, _ in spans
+                                for item in spill.read(path)))
+        for _, group in groupby(_sorted(records, spill, memory),
+                                key=lambda record: record[0][0]):
+            yield [item for _, item in group]
+
+
+def _pairs(spans):
+    """Get the positions of similar items in chunk files.
+
+    @param spans: list of (path, first position, number of items)
+    @return: generator of (position, earlier position)
+
+    """
+    for number, (path, first, _) in enumerate(spans):
+        chunk = list(_Spill.read(path))
+
+        # Compare each item to the earlier items of its chunk
+        for index, item in enumerate(chunk):
+            for other in range(index):
+                if item.bound(chunk[other]) and item.similarity(chunk[other]):
+                    yield first + index, first + other
+
+        # Compare the chunk to the items of each earlier chunk
+        for earlier, start, _ in spans[:number]:
+            for offset, other in enumerate(_Spill.read(earlier)):
+                for index, item in enumerate(chunk):
+                    if item.bound(other) and item.similarity(other):
+                        yield first + index, start + offset
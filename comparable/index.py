@@ -0,0 +1,381 @@
+"""Compact equality and similarity indexes of simple comparable types.
+
+An index is stored in a single binary buffer of fixed-width arrays. The
+buffer can be saved to disk and later opened with 'mmap', so queries run
+directly against the mapped file without creating any Comparable objects.
+Processes opening the same file share a single page-cached copy.
+
+"""
+
+import sys
+import mmap
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from difflib import SequenceMatcher
+
+from comparable.simple import Number, Text, TextEnum, TextTitle
+from comparable.simple import _hash
+from comparable import registry
+
+MAGIC = b'CMPIDX01'
+HEADER = struct.Struct('<8s16s8sQ')  # magic, type name, byte order, count
+SECTIONS = (
+    # name, array type code
+    ('numbers', 'd'),  # number values by position
+    ('sorted_numbers', 'd'),  # number values in ascending order
+    ('number_positions', 'I'),  # positions of the sorted number values
+    ('keys', 'Q'),  # sorted hashes of the text values
+    ('key_positions', 'I'),  # positions of the sorted text hashes
+    ('folds', 'Q'),  # sorted hashes of the lowercase text values
+    ('fold_positions', 'I'),  # positions of the sorted lowercase hashes
+    ('lengths', 'I'),  # sorted lengths of the compared texts
+    ('length_positions', 'I'),  # positions of the sorted lengths
+    ('bitmaps', 'Q'),  # character bitmaps of the sorted lengths
+    ('value_offsets', 'Q'),  # offsets of each text value
+    ('values', 'B'),  # UTF-8 encoded text values
+    ('text_offsets', 'Q'),  # offsets of each compared text (if different)
+    ('texts', 'B'),  # UTF-8 encoded compared texts (if different)
+)
+DIRECTORY = struct.Struct('<' + 'QQ' * len(SECTIONS))  # offset, size
+INDEXED = ('Number', 'Text', 'TextEnum', 'TextTitle')  # registered names
+
+
+def indexable(kind):
+    """Determine if items of a type can be stored in an index.
+
+    @param kind: comparable class
+    @return: True if the class is registered under an indexed name
+
+    """
+    name = getattr(kind, '__name__', None)
+    return name in INDEXED and registry.resolve(name) is kind
+
+
+def _sorted(keys):
+    """Get keys in ascending order and their original positions."""
+    positions = sorted(range(len(keys)), key=keys.__getitem__)
+    return [keys[position] for position in positions], positions
+
+
+def _blob(texts):
+    """Get the concatenated UTF-8 encoding of texts and their offsets."""
+    offsets = [0]
+    chunks = []
+    for text in texts:
+        chunk = text.encode('utf-8')
+        chunks.append(chunk)
+        offsets.append(offsets[-1] + len(chunk))
+    return b''.join(chunks), offsets
+
+
+def _bound(length1, bitmap1, length2, bitmap2):
+    """Get an upper bound on the ratio of two texts from their bitmaps.
+
+    Every character bucket present in only one of the texts contains at
+    least one character that cannot be matched in the other text.
+
+    """
+    total = length1 + length2
+    if not total:
+        return 1.0
+    matches = min(length1 - bin(bitmap1 & ~bitmap2).count('1'),
+                  length2 - bin(bitmap2 & ~bitmap1).count('1'))
+    return 2.0 * max(matches, 0) / total
+
+
+def _ratio(value1, value2):
+    """Get the similarity ratio of two numbers (see L{Number})."""
+    numerator, denominator = sorted((value1, value2))
+    try:
+        return float(numerator) / denominator
+    except ZeroDivisionError:
+        return 0.0 if numerator else 1.0
+
+
+class Index(object):
+
+    """Equality and similarity index of a list of simple comparable items.
+
+    All items must have the same type: L{Number}, L{Text}, L{TextEnum},
+    or L{TextTitle}. Results refer to items by their position in the list.
+
+    """
+
+    def __init__(self, items):
+        self._mmap = None
+        self._views = []
+        self._load(memoryview(self._build(list(items))))
+
+    def __repr__(self):
+        return "<{} of {} {} items>".format(self.__class__.__name__,
+                                            len(self), self.type.__name__)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, position):
+        """Create the item at a position in the index."""
+        if not 0 <= position < self.count:
+            raise IndexError("index position out of range")
+        if self.type is Number:
+            return Number(self._numbers[position])
+        return self.type(self._value(position))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    # Building and loading ###################################################
+
+    @classmethod
+    def _build(cls, items):
+        """Serialize items into an index buffer."""
+        kinds = {type(item) for item in items}
+        if len(kinds) > 1:
+            raise TypeError("index items must have the same type")
+        kind = kinds.pop() if kinds else Text
+        if not indexable(kind):
+            raise TypeError("cannot index {} items".format(kind.__name__))
+
+        sections = {}
+        if kind is Number:
+            numbers = [float(item) for item in items]
+            ordered, positions = _sorted(numbers)
+            sections['numbers'] = numbers
+            sections['sorted_numbers'] = ordered
+            sections['number_positions'] = positions
+        else:
+            values = [str(item) for item in items]
+            ordered, positions = _sorted([_hash(value) for value in values])
+            sections['keys'] = ordered
+            sections['key_positions'] = positions
+            if kind is TextEnum:
+                folds = [_hash(value.lower()) for value in values]
+                ordered, positions = _sorted(folds)
+                sections['folds'] = ordered
+                sections['fold_positions'] = positions
+            ordered, positions = _sorted([item.sketch.length
+                                          for item in items])
+            sections['lengths'] = ordered
+            sections['length_positions'] = positions
+            sections['bitmaps'] = [items[position].sketch.bitmap
+                                   for position in positions]
+            blob, offsets = _blob(values)
+            sections['values'] = blob
+            sections['value_offsets'] = offsets
+            if kind is TextTitle:
+                blob, offsets = _blob(item.stripped for item in items)
+                sections['texts'] = blob
+                sections['text_offsets'] = offsets
+
+        # Lay out the 8-byte aligned sections after the header and directory
+        chunks = []
+        directory = []
+        offset = HEADER.size + DIRECTORY.size
+        for name, code in SECTIONS:
+            data = array(code, sections.get(name, ())).tobytes()
+            directory.extend((offset, len(data)))
+            padding = b'\0' * (-len(data) % 8)
+            chunks.append(data + padding)
+            offset += len(data) + len(padding)
+
+        header = HEADER.pack(MAGIC, kind.__name__.encode('ascii'),
+                             sys.byteorder.encode('ascii'), len(items))
+        return header + DIRECTORY.pack(*directory) + b''.join(chunks)
+
+    def _load(self, buffer):
+        """Attach the index to a serialized buffer."""
+        magic, name, byteorder, self.count = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("not a comparable index")
+        if byteorder.rstrip(b'\0').decode('ascii') != sys.byteorder:
+            raise ValueError("index was created with a different byte order")
+        self.type = registry.resolve(name.rstrip(b'\0').decode('ascii'))
+
+        self._buffer = buffer
+        self._views.append(buffer)
+        directory = DIRECTORY.unpack_from(buffer, HEADER.size)
+        for index, (name, code) in enumerate(SECTIONS):
+            offset, size = directory[index * 2:index * 2 + 2]
+            view = buffer[offset:offset + size].cast(code)
+            self._views.append(view)
+            setattr(self, '_' + name, view)
+
+    @classmethod
+    def open(cls, path):
+        """Open an index previously saved to a file.
+
+        @param path: path of the index file
+        @return: L{Index} backed by the memory-mapped file
+
+        """
+        index = cls.__new__(cls)
+        index._views = []  # pylint: disable=W0212
+        with open(path, 'rb') as infile:
+            index._mmap = mmap.mmap(infile.fileno(), 0,  # pylint: disable=W0212
+                                    access=mmap.ACCESS_READ)
+        index._load(memoryview(index._mmap))  # pylint: disable=W0212
+        return index
+
+    def save(self, path):
+        """Save the index to a file.
+
+        @param path: path of the index file
+
+        """
+        with open(path, 'wb') as outfile:
+            outfile.write(self._buffer)
+
+    def close(self):
+        """Release the buffer backing the index."""
+        while self._views:
+            self._views.pop().release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    # Queries ################################################################
+
+    def equal(self, base):
+        """Get the positions of items equal to the base.
+
+        @param base: base item to find equality
+        @return: sorted list of positions
+
+        """
+        if self.type is Number:
+            value = float(base)
+            ordered = self._sorted_numbers
+            start = bisect_left(ordered, value)
+            end = bisect_right(ordered, value, start)
+            positions = self._number_positions[start:end]
+        else:
+            value = str(base)
+            positions = [position for position in
+                         self._search(self._keys, self._key_positions,
+                                      _hash(value))
+                         if self._value(position) == value]
+        return sorted(positions)
+
+    def similar(self, base, threshold=None):
+        """Get the positions and similarities of items similar to the base.
+
+        @param base: base item to locate similar items
+        @param threshold: similarity ratio required (default: base threshold)
+        @return: sorted list of (position, L{Similarity})
+
+        """
+        if threshold is None:
+            threshold = base.threshold
+
+        if self.type is Number:
+            results = self._similar_numbers(base, threshold)
+        elif self.type is TextEnum:
+            results = self._similar_folds(base)
+        else:
+            results = self._similar_texts(base, threshold)
+
+        return sorted((position, base.Similarity(ratio))
+                      for position, ratio in results if ratio >= threshold)
+
+    def find_equal(self, base):
+        """Get an iterator of items equal to the base (see L{tools})."""
+        return (self[position] for position in self.equal(base))
+
+    def match_equal(self, base):
+        """Get the first item that is equivalent to the base."""
+        for item in self.find_equal(base):
+            return item
+
+        return None
+
+    def find_similar(self, base):
+        """Get an iterator of items similar to the base (see L{tools})."""
+        return (self[position] for position, _ in self.similar(base))
+
+    def match_similar(self, base):
+        """Get the most similar matching item (see L{tools})."""
+        best = None
+        for position, similarity in self.similar(base):
+            if best is None or similarity > best[1]:
+                best = position, similarity
+        if best:
+            return self[best[0]]
+
+        return None
+
+    def _similar_numbers(self, base, threshold):
+        """Find candidate positions and ratios for a number."""
+        value = float(base)
+        ordered = self._sorted_numbers
+        if threshold <= 0:
+            start, end = 0, len(ordered)
+        elif value:
+            # Ratio min/max >= threshold limits the range of values
+            start = bisect_left(ordered, value * threshold * (1 - 1e-9))
+            end = bisect_right(ordered, value / threshold * (1 + 1e-9))
+        else:
+            start = bisect_left(ordered, 0.0)
+            end = bisect_right(ordered, 0.0)
+        for rank in range(start, end):
+            yield (self._number_positions[rank],
+                   _ratio(base.value, ordered[rank]))
+
+    def _similar_folds(self, base):
+        """Find candidate positions and ratios for a textual enumeration."""
+        value = str(base).lower()
+        for position in self._search(self._folds, self._fold_positions,
+                                     _hash(value)):
+            if self._value(position).lower() == value:
+                yield position, 1.0
+
+    def _similar_texts(self, base, threshold):
+        """Find candidate positions and ratios for a text."""
+        text = base.stripped if self.type is TextTitle else base.value
+        length, bitmap = base.sketch.length, base.sketch.bitmap
+        lengths = self._lengths
+
+        # Ratio 2*matches/total >= threshold limits the range of lengths
+        if threshold > 0:
+            start = bisect_left(lengths,
+                                int(length * threshold / (2 - threshold)))
+            end = bisect_right(lengths, length * (2 - threshold) / threshold)
+        else:
+            start, end = 0, len(lengths)
+
+        matcher = SequenceMatcher(a=text)
+        limit = base.long_length
+        for rank in range(start, end):
+            position = self._length_positions[rank]
+            if limit is not None and max(length, lengths[rank]) > limit:
+                # Long texts are estimated from their shingle sketches
+                if bitmap & self._bitmaps[rank] or not length:
+                    yield position, float(base.similarity(self[position]))
+                continue
+            if _bound(length, bitmap,
+                      lengths[rank], self._bitmaps[rank]) < threshold:
+                continue
+            matcher.set_seq2(self._text(position))
+            yield position, matcher.ratio()
+
+    @staticmethod
+    def _search(keys, positions, key):
+        """Get the positions matching a key in sorted keys."""
+        start = bisect_left(keys, key)
+        end = bisect_right(keys, key, start)
+        return positions[start:end]
+
+    def _value(self, position):
+        """Decode the text value at a position."""
+        start, end = self._value_offsets[position:position + 2]
+        return bytes(self._values[start:end]).decode('utf-8')
+
+    def _text(self, position):
+        """Decode the compared text at a position."""
+        if self.type is not TextTitle:
+            return self._value(position)
+        start, end = self._text_offsets[position:position + 2]
+        return bytes(self._texts[start:end]).decode('utf-8')
@@ -0,0 +1,111 @@
+"""Counters and latency histograms of comparisons.
+
+Metrics are only recorded while enabled:
+
+    >>> from comparable import metrics
+    >>> metrics.enable()
+    >>> metrics.disable()
+
+Times are inclusive, so the time of a compound comparison includes the
+time spent comparing each of its attributes.
+
+"""
+
+import time
+from collections import OrderedDict
+
+BUCKETS = 24  # latency histogram buckets (in powers of two microseconds)
+
+enabled = False  # pylint: disable=C0103
+clock = time.perf_counter  # pylint: disable=C0103
+_metrics = {}  # (class name, attribute name, operation): _Metric
+
+
+class _Metric(object):  # pylint: disable=R0903
+
+    """Count, cumulative time, and latency histogram of one comparison."""
+
+    __slots__ = ('calls', 'seconds', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.histogram = [0] * BUCKETS
+
+    def snapshot(self):
+        """Get a dictionary of the metric's values."""
+        return OrderedDict([('calls', self.calls),
+                            ('seconds', self.seconds),
+                            ('histogram', list(self.histogram))])
+
+
+def enable():
+    """Start recording metrics."""
+    global enabled  # pylint: disable=W0603
+    enabled = True
+
+
+def disable():
+    """Stop recording metrics."""
+    global enabled  # pylint: disable=W0603
+    enabled = False
+
+
+def record(cname, aname, operation, start):
+    """Record a comparison that began at a time from L{clock}.
+
+    @param cname: name of class being compared
+    @param aname: name of attribute being compared (or None)
+    @param operation: operation performed ('==' or '%')
+    @param start: value of L{clock} before the comparison
+
+    """
+    seconds = clock() - start
+    index = cname, aname, operation
+    metric = _metrics.get(index)
+    if metric is None:
+        metric = _metrics[index] = _Metric()
+    metric.calls += 1
+    metric.seconds += seconds
+    bucket = int(seconds * 1000000).bit_length()  # [2^(n-1), 2^n) us
+    metric.histogram[min(bucket, BUCKETS - 1)] += 1
+
+
+def reset():
+    """Discard all recorded metrics."""
+    _metrics.clear()
+
+
+def stats(reset=False):  # pylint: disable=W0621
+    """Get a snapshot of the recorded metrics.
+
+    Histogram bucket 0 counts comparisons under 1 microsecond and bucket
+    n counts comparisons from 2^(n-1) to 2^n microseconds.
+
+    @param reset: discard the recorded metrics after the snapshot
+
+    @return: dictionary with 'classes' ({class: {operation: metric}}) and
+             'attributes' ({'class.attribute': {operation: metric}})
+
+    """
+    classes = OrderedDict()
+    attributes = OrderedDict()
+    for (cname, aname, operation), metric in sorted(_metrics.items(),
+                                                    key=_sort_key):
+        if aname is None:
+            group = classes.setdefault(cname, OrderedDict())
+        else:
+            name = "{}.{}".format(cname, aname)
+            group = attributes.setdefault(name, OrderedDict())
+        group[operation] = metric.snapshot()
+
+    if reset:
+        _metrics.clear()
+
+    return OrderedDict([('classes', classes), ('attributes', attributes)])
+
+
+def _sort_key(entry):
+    """Sort metrics by class, attribute, and operation."""
+    cname, aname, operation = entry[0]
+    return cname, aname or '', operation
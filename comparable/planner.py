@@ -0,0 +1,299 @@
+"""Cost-based planning of similarity searches over compound comparables.
+
+A search for items similar to a base can be driven by a single attribute:
+an item can only reach the base threshold 't' if the attribute with weight
+'w' (of total weight 'W') reaches '1 - (1 - t) * W / w'. When that is
+selective, an L{Index} of the attribute's values finds the candidates and
+only they are fully compared. The planner keeps statistics of each
+attribute to estimate which attribute (or a full scan) is cheapest:
+
+    >>> from comparable.simple import Number
+    >>> Planner([Number(1), Number(2)]).plan(Number(1)).attribute is None
+    True
+
+"""
+
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+
+from comparable.base import Comparable, CompoundComparable
+from comparable.simple import Number, Text, TextEnum, TextTitle
+from comparable.index import Index, indexable
+
+SAMPLE = 20  # number of comparisons timed to estimate the cost of each
+
+
+class AttributeStats(object):  # pylint: disable=R0902,R0903
+
+    """Statistics of the values of one attribute across items."""
+
+    def __init__(self, name, weight, values):
+        """Collect statistics from the attribute's values.
+
+        @param name: attribute name
+        @param weight: attribute weight
+        @param values: list of attribute values (None if missing)
+
+        """
+        self.name = name
+        self.weight = weight
+        self.count = len(values)
+        self.nones = sum(value is None for value in values)
+        present = [value for value in values if value is not None]
+        kinds = {type(value) for value in present}
+        self.type = kinds.pop() if len(kinds) == 1 else None
+        if self.type in (Text, TextEnum, TextTitle) and \
+                any(value.sketch is None for value in present):
+            self.type = None  # only texts of strings can be indexed
+
+        # Value distribution
+        self.frequencies = Counter(self._key(value) for value in present)
+        self.cardinality = len(self.frequencies)
+        if self.type is Number:
+            self.sorted = sorted(float(value) for value in present)
+        elif self.type in (Text, TextTitle):
+            self.sorted = sorted(value.sketch.length for value in present)
+        else:
+            self.sorted = []
+
+        # Measured comparison cost
+        pairs = list(zip(present, present[1:]))[:SAMPLE]
+        start = time.perf_counter()
+        for value1, value2 in pairs:
+            _ = value1 % value2
+        self.cost = (time.perf_counter() - start) / max(len(pairs), 1)
+
+    def __repr__(self):
+        return ("<{} of {!r}: {} values, {} distinct, {} None, "
+                "{:.1f} us per comparison>").format(
+                    self.__class__.__name__, self.name, self.count,
+                    self.cardinality, self.nones, self.cost * 1e6)
+
+    @property
+    def indexable(self):
+        """Determine if the values can be searched with an L{Index}."""
+        return indexable(self.type)
+
+    def _key(self, value):
+        """Get the value counted in the distribution (None if unhashable)."""
+        if self.type is TextEnum:
+            return str(value).lower()
+        key = value.key() if isinstance(value, Comparable) else value
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def estimate(self, value, threshold):
+        """Estimate the number of values similar to a base value.
+
+        Values reach the threshold of similarity with the base value; the
+        number of values examined to find them is also estimated.
+
+        @param value: base value of the attribute
+        @param threshold: similarity ratio required
+        @return: (matches, examined)
+
+        """
+        if self.type is TextEnum:
+            matches = self.frequencies.get(str(value).lower(), 0)
+            return matches, matches
+
+        if self.type is Number:
+            number = float(value)
+            low, high = sorted((number * threshold, number / threshold))
+            matches = (bisect_right(self.sorted, high * (1 + 1e-9)) -
+                       bisect_left(self.sorted, low * (1 - 1e-9)))
+            return matches, matches
+
+        # Ratio 2*matches/total >= threshold limits the range of lengths
+        length = value.sketch.length
+        examined = (bisect_right(self.sorted,
+                                 length * (2 - threshold) / threshold) -
+                    bisect_left(self.sorted,
+                                int(length * threshold / (2 - threshold))))
+        if threshold >= 1.0:
+            matches = self.frequencies.get(value.key(), 0)
+        else:
+            matches = examined  # every examined text may match
+        return matches, examined
+
+
+class Plan(object):  # pylint: disable=R0902,R0903
+
+    """Chosen strategy to find items similar to a base."""
+
+    def __init__(self, attribute, threshold, candidates, cost):
+        self.attribute = attribute  # driving attribute or None to scan
+        self.threshold = threshold  # similarity required of the attribute
+        self.estimated_candidates = candidates
+        self.estimated_cost = cost  # seconds
+        self.actual_candidates = None
+        self.actual_cost = None  # seconds
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self)
+
+    def __str__(self):
+        if self.attribute is None:
+            text = "scan"
+        else:
+            text = "index on {!r} (similarity >= {:.3f})".format(
+                self.attribute, self.threshold)
+        text += ": {:,} candidates, {:.3f} ms estimated".format(
+            self.estimated_candidates, self.estimated_cost * 1e3)
+        if self.actual_cost is not None:
+            text += "; {:,} candidates, {:.3f} ms actual".format(
+                self.actual_candidates, self.actual_cost * 1e3)
+        return text
+
+
+class Planner(object):
+
+    """Statistics and attribute indexes for searches of a list of items.
+
+    Items should be compound comparables of the same class, whose
+    similarity is based on their attributes. Other items are scanned.
+
+    """
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.stats = OrderedDict()  # attribute name: AttributeStats
+        self.cost = 0.0  # estimated seconds to compare two items
+        self._indexes = {}  # attribute name: (Index, item positions)
+        self._nones = {}  # attribute name: positions of None values
+        self._collect()
+
+    def __repr__(self):
+        return "<{} of {} items>".format(self.__class__.__name__,
+                                         len(self.items))
+
+    def _collect(self):
+        """Collect statistics of each attribute."""
+        if not self.items:
+            return
+        cls = self.items[0].__class__
+        if not all(item.__class__ is cls for item in self.items) or \
+                not issubclass(cls, CompoundComparable) or \
+                cls.equality is not CompoundComparable.equality or \
+                cls.similarity is not CompoundComparable.similarity:
+            return  # results may not use attributes
+
+        for name, weight in self.items[0].attributes.items():
+            values = [getattr(item, name, None) for item in self.items]
+            stats = self.stats[name] = AttributeStats(name, weight, values)
+            self._nones[name] = [position for position, value
+                                 in enumerate(values) if value is None]
+            self.cost += stats.cost
+
+    def plan(self, base, threshold=None):
+        """Choose the cheapest way to find items similar to the base.
+
+        @param base: base item to locate similar items
+        @param threshold: similarity ratio required (default: base threshold)
+        @return: L{Plan}
+
+        """
+        if threshold is None:
+            threshold = base.threshold
+        count = len(self.items)
+        best = Plan(None, threshold, count, count * self.cost)
+
+        total = sum(stats.weight for stats in self.stats.values())
+        for name, stats in self.stats.items():
+            value = getattr(base, name, None)
+            if not stats.indexable or type(value) is not stats.type or \
+                    not stats.weight:  # pylint: disable=C0123
+                continue
+            required = 1.0 - (1.0 - threshold) * total / stats.weight
+            if required <= 0:
+                continue  # any value of the attribute may be similar
+
+            # Items without the attribute are always candidates
+            matches, examined = stats.estimate(value, required)
+            candidates = matches + stats.nones
+            cost = examined * stats.cost + candidates * self.cost
+            if cost < best.estimated_cost:
+                best = Plan(name, required, candidates, cost)
+
+        return best
+
+    def candidates(self, base, plan):
+        """Get the positions of items that may be similar to the base.
+
+        @param base: base item to locate similar items
+        @param plan: L{Plan} from L{plan}
+        @return: sorted list of positions
+
+        """
+        if plan.attribute is None:
+            return range(len(self.items))
+
+        index, positions = self._index(plan.attribute)
+        value = getattr(base, plan.attribute)
+        found = [positions[position] for position, _ in
+                 index.similar(value, plan.threshold)]
+        return sorted(found + self._nones[plan.attribute])
+
+    def find_similar(self, base, plan=None):
+        """Get an iterator of items similar to the base (see L{tools}).
+
+        The plan's actual number of candidates and cost are recorded when
+        the iterator is exhausted.
+
+        @param base: base item to locate similar items
+        @param plan: L{Plan} to follow (default: chosen by L{plan})
+        @return: generator of similar items
+
+        """
+        return (item for item, _ in self._similar(base, plan))
+
+    def match_similar(self, base, plan=None):
+        """Get the most similar matching item (see L{tools}).
+
+        @param base: base item to locate best match
+        @param plan: L{Plan} to follow (default: chosen by L{plan})
+        @return: most similar matching item or None
+
+        """
+        best, best_sim = None, None
+        for item, sim in self._similar(base, plan):
+            if best is None or sim > best_sim:
+                best, best_sim = item, sim
+
+        return best
+
+    def _similar(self, base, plan):
+        """Yield similar items and similarities, recording actual costs."""
+        if plan is None:
+            plan = self.plan(base)
+
+        start = time.perf_counter()
+        elapsed = 0.0
+        count = 0
+        for position in self.candidates(base, plan):
+            item = self.items[position]
+            count += 1
+            if not base.bound(item):
+                continue
+            sim = base.similarity(item)
+            if sim:
+                elapsed += time.perf_counter() - start
+                yield item, sim
+                start = time.perf_counter()
+
+        plan.actual_candidates = count
+        plan.actual_cost = elapsed + time.perf_counter() - start
+
+    def _index(self, name):
+        """Get (and build once) the index of an attribute's values."""
+        if name not in self._indexes:
+            positions = [position for position, item in enumerate(self.items)
+                         if getattr(item, name, None) is not None]
+            index = Index(getattr(self.items[position], name)
+                          for position in positions)
+            self._indexes[name] = index, positions
+        return self._indexes[name]
@@ -0,0 +1,146 @@
+"""Lazy queries of items compared to a base item."""
+
+import copy
+import heapq
+
+from comparable import registry
+
+
+def _score(result):
+    """Get the similarity of an (item, similarity) result as a float."""
+    return float(result[1])
+
+
+class Query(object):
+
+    """Lazy chain of operations on items compared to a base item.
+
+    Operations only describe the results: nothing is compared until the
+    query is iterated. All operations are then applied in a single pass
+    that compares each item at most once, rejects items using 'bound'
+    before calculating similarity, and searches an L{Index} (if the items
+    are indexed) instead of scanning every item.
+
+        >>> from comparable.simple import Number
+        >>> items = [Number(42), Number(42.001), Number(43)]
+        >>> list(Query(Number(42), items).exclude_equal().similar())
+        [Number(42.001)]
+
+    """
+
+    def __init__(self, base, items):
+        self.base = base
+        self.items = items
+        self._equal = None  # True to keep only equal, False to exclude
+        self._threshold = None  # similarity required to keep items
+        self._order = None  # None, 'sort', or 'top'
+        self._count = None  # number of items to keep when ordered
+
+    def __repr__(self):
+        return "<{} of {!r}>".format(self.__class__.__name__, self.base)
+
+    def __iter__(self):
+        return (item for item, _ in self.scored())
+
+    # Operations #############################################################
+
+    def equal(self):
+        """Keep only items equal to the base."""
+        return self._copy(_equal=True)
+
+    def exclude_equal(self):
+        """Discard items equal to the base."""
+        return self._copy(_equal=False)
+
+    def similar(self, threshold=None):
+        """Keep only items similar to the base.
+
+        @param threshold: similarity ratio required (default: base threshold)
+
+        """
+        if threshold is None:
+            threshold = self.base.threshold
+        return self._copy(_threshold=threshold)
+
+    def sort(self):
+        """Order items in descending similarity to the base."""
+        return self._copy(_order='sort', _count=None)
+
+    def top(self, k):
+        """Keep only the k items most similar to the base (in order)."""
+        return self._copy(_order='top', _count=k)
+
+    # Results ################################################################
+
+    def all(self):
+        """Get a list of all resulting items."""
+        return list(self)
+
+    def first(self):
+        """Get the first resulting item or None."""
+        for item in self:
+            return item
+
+        return None
+
+    def scored(self):
+        """Get an iterator of resulting items and their similarities.
+
+        @return: iterable of (item, L{Similarity} or None if not calculated)
+
+        """
+        results = self._filter(self._candidates())
+        if self._order == 'top':
+            results = heapq.nlargest(self._count, results, key=_score)
+        elif self._order == 'sort':
+            results = sorted(results, key=_score, reverse=True)
+        return iter(results)
+
+    def _copy(self, **changes):
+        """Create a copy of the query with changes applied."""
+        query = copy.copy(self)
+        query.__dict__.update(changes)
+        return query
+
+    def _candidates(self):
+        """Get items (and known similarities) that may be in the results."""
+        base = self.base
+        if isinstance(self.items, registry.backend('index').Index):
+            index = self.items
+            if self._threshold is not None:
+                return ((index[position], similarity) for position, similarity
+                        in index.similar(base, self._threshold))
+            if self._equal:
+                return ((index[position], None)
+                        for position in index.equal(base))
+        return ((item, None) for item in self.items)
+
+    def _filter(self, candidates):
+        """Compare each candidate at most once and apply the filters."""
+        base = self.base
+        threshold = self._threshold
+        need_equality = self._equal is not None
+        need_similarity = threshold is not None or self._order is not None
+
+        for item, similarity in candidates:
+
+            # Reject items that cannot reach the threshold
+            if threshold is not None and similarity is None and \
+                    float(base.bound(item)) < threshold:
+                continue
+
+            # Calculate only the results needed
+            equality = None
+            if need_equality and need_similarity and similarity is None:
+                equality, similarity = base.compare(item)
+            elif need_equality:
+                equality = base.equality(item)
+            elif need_similarity and similarity is None:
+                similarity = base.similarity(item)
+
+            if need_equality and bool(equality) != self._equal:
+                continue
+            if threshold is not None and float(similarity) < threshold:
+                continue
+
+            yield item, similarity
@@ -0,0 +1,192 @@
+"""Items kept in order of similarity to a base as they change.
+
+A L{RankedView} compares each item to the base once, when it is added,
+and keeps the items in descending similarity, so the ranking does not
+have to be sorted again whenever items are added or removed:
+
+    >>> from comparable.simple import Number
+    >>> view = RankedView(Number(42), [Number(40), Number(42.5)])
+    >>> view.add(Number(41.9))
+    >>> view.top(2)
+    [Number(41.9), Number(42.5)]
+
+Items are stored in a list of sorted chunks (each at most a few thousand
+items long), so adding or removing an item only shifts the items of one
+chunk after a binary search.
+
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from itertools import count, islice
+
+LOAD = 1000  # chunks are split when twice this size
+
+
+class RankedView(object):
+
+    """Items ranked in descending similarity to a base item.
+
+    Items with the same similarity are ranked in the order they were added
+    (like L{tools.sort}). Items are removed by identity, so they need not
+    be hashable.
+
+    """
+
+    def __init__(self, base, items=()):
+        """Compare and rank the initial items.
+
+        @param base: base item to perform comparison against
+        @param items: iterable of items to rank
+
+        """
+        self.base = base
+        self._chunks = []  # sorted lists of (-similarity, order, item)
+        self._maxes = []  # last entry of each chunk
+        self._entries = {}  # id(item): list of entries of the item
+        self._order = count()
+        self._length = 0
+        self.update(items)
+
+    def __repr__(self):
+        return "<{} of {} items ranked by {!r}>".format(
+            self.__class__.__name__, len(self), self.base)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return (entry[2] for chunk in self._chunks for entry in chunk)
+
+    def __contains__(self, item):
+        return id(item) in self._entries
+
+    def __getitem__(self, index):
+        """Get the item (or list of items) at a rank."""
+        if isinstance(index, slice):
+            return [entry[2] for entry in self._slice(index)]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("rank out of range")
+        return self._slice(slice(index, index + 1))[0][2]
+
+    # Changes ################################################################
+
+    def add(self, item):
+        """Compare an item to the base and insert it in rank order."""
+        entry = (-float(self.base.similarity(item)), next(self._order), item)
+        self._entries.setdefault(id(item), []).append(entry)
+        self._length += 1
+
+        if not self._chunks:
+            self._chunks.append([entry])
+            self._maxes.append(entry)
+            return
+        number = bisect_left(self._maxes, entry)
+        if number == len(self._chunks):
+            number -= 1
+            self._chunks[number].append(entry)
+            self._maxes[number] = entry
+        else:
+            insort(self._chunks[number], entry)
+
+        # Split large chunks to keep insertions cheap
+        chunk = self._chunks[number]
+        if len(chunk) > 2 * LOAD:
+            self._chunks.insert(number + 1, chunk[LOAD:])
+            del chunk[LOAD:]
+            self._maxes.insert(number, chunk[-1])
+
+    def update(self, items):
+        """Compare and insert many items."""
+        for item in items:
+            self.add(item)
+
+    def remove(self, item):
+        """Remove an item (the first added, if it was added more than once).
+
+        @raise ValueError: if the item is not in the view
+
+        """
+        entries = self._entries.get(id(item))
+        if not entries:
+            raise ValueError("item is not in the view: {!r}".format(item))
+        entry = entries.pop(0)
+        if not entries:
+            del self._entries[id(item)]
+        self._length -= 1
+
+        number = bisect_left(self._maxes, entry)
+        chunk = self._chunks[number]
+        del chunk[bisect_left(chunk, entry)]
+        if not chunk:
+            del self._chunks[number]
+            del self._maxes[number]
+        else:
+            self._maxes[number] = chunk[-1]
+
+    def discard(self, item):
+        """Remove an item if it is in the view."""
+        if item in self:
+            self.remove(item)
+
+    # Results ################################################################
+
+    def similarity(self, item):
+        """Get the similarity of an item in the view (without comparing).
+
+        @raise ValueError: if the item is not in the view
+
+        """
+        entries = self._entries.get(id(item))
+        if not entries:
+            raise ValueError("item is not in the view: {!r}".format(item))
+        return self.base.Similarity(-entries[0][0])
+
+    def scored(self):
+        """Get an iterator of ranked items and their similarities.
+
+        @return: iterable of (item, float similarity)
+
+        """
+        return ((entry[2], -entry[0])
+                for chunk in self._chunks for entry in chunk)
+
+    def top(self, k):
+        """Get a list of the k items most similar to the base (in order)."""
+        return [item for item, _ in islice(self.scored(), k)]
+
+    def similar(self, threshold=None):
+        """Get a list of the items that reach a threshold (in order).
+
+        @param threshold: similarity ratio required (default: base threshold)
+        @return: list of items sorted by similarity to the base
+
+        """
+        if threshold is None:
+            threshold = self.base.threshold
+        return self[:self._rank(threshold)]
+
+    def _rank(self, threshold):
+        """Get the number of items with a similarity of at least a threshold."""
+        key = (-threshold, float('inf'))
+        number = bisect_right(self._maxes, key)
+        ranked = sum(len(chunk) for chunk in self._chunks[:number])
+        if number < len(self._chunks):
+            ranked += bisect_right(self._chunks[number], key)
+        return ranked
+
+    def _slice(self, index):
+        """Get the entries of a slice of ranks."""
+        start, stop, step = index.indices(self._length)
+        if step != 1:
+            return [entry for chunk in self._chunks for entry in chunk][index]
+        entries = []
+        for chunk in self._chunks:
+            if start >= stop:
+                break
+            if start < len(chunk):
+                entries.extend(chunk[start:stop])
+            start = max(start - len(chunk), 0)
+            stop -= len(chunk)
+        return entries
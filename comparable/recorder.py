@@ -0,0 +1,161 @@
+"""Low-overhead flight recorder of comparisons.
+
+While enabled, every comparison logged by L{Comparable.log} is stored as a
+compact event in preallocated ring buffers. Nothing is formatted until the
+most recent events are dumped as the familiar indented text:
+
+    >>> from comparable import recorder
+    >>> recorder.enable()
+    >>> recorder.disable()
+
+"""
+
+import math
+from array import array
+
+SIZE = 10000  # default number of events kept
+
+BEGIN, BOOLEAN, SIMILARITY, NOTE = range(4)  # kinds of events
+
+enabled = False  # pylint: disable=C0103
+
+
+class Recorder(object):
+
+    """Ring buffer of comparison events."""
+
+    def __init__(self, size=SIZE):
+        self.size = size
+        self.count = 0  # total number of events recorded
+        self._classes1 = [None] * size
+        self._classes2 = [None] * size
+        self._cnames = [None] * size
+        self._anames = [None] * size
+        self._operations = [None] * size
+        self._notes = [None] * size
+        self._kinds = array('B', bytes(size))
+        self._depths = array('H', bytes(2 * size))
+        self._scores = array('d', bytes(8 * size))
+
+    def __repr__(self):
+        return "<{} of {} events>".format(self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def record(self, obj1, obj2, sym, cname, aname, result, depth):  # pylint: disable=R0913
+        """Store a comparison event (see L{Comparable.log})."""
+        index = self.count % self.size
+        self.count += 1
+        self._classes1[index] = obj1.__class__
+        self._classes2[index] = obj2.__class__
+        self._cnames[index] = cname
+        self._anames[index] = aname
+        self._operations[index] = sym
+        self._depths[index] = min(depth, 0xFFFF)
+        note = None
+        if result is None:
+            kind, score = BEGIN, math.nan
+        elif result is True or result is False:
+            kind, score = BOOLEAN, float(result)
+        elif isinstance(result, str):
+            kind, score, note = NOTE, math.nan, result
+        else:
+            kind, score = SIMILARITY, float(result)
+        self._kinds[index] = kind
+        self._scores[index] = score
+        self._notes[index] = note
+
+    def events(self):
+        """Get the recorded events from oldest to newest.
+
+        @return: list of (class name, attribute name, operation, score,
+                 depth) where score is None when a comparison begins
+
+        """
+        events = []
+        for index in self._indices():
+            kind = self._kinds[index]
+            score = None if kind in (BEGIN, NOTE) else self._scores[index]
+            if kind == BOOLEAN:
+                score = bool(score)
+            events.append((self._cnames[index] or
+                           self._classes1[index].__name__,
+                           self._anames[index], self._operations[index],
+                           score, self._depths[index]))
+        return events
+
+    def dump(self):
+        """Format the recorded events as indented text.
+
+        @return: text with one line per event
+
+        """
+        lines = []
+        for index in self._indices():
+            fmt = "{o1} {sym} {o2} : {r}"
+            if self._cnames[index]:
+                fmt = "{c}.{a}: " + fmt
+            kind = self._kinds[index]
+            if kind == BEGIN:
+                result = '...'
+            elif kind == BOOLEAN:
+                result = bool(self._scores[index])
+            elif kind == NOTE:
+                result = self._notes[index]
+            else:
+                result = "{:.1%} similar".format(self._scores[index])
+            lines.append('| ' * self._depths[index] + fmt.format(
+                o1=self._classes1[index].__name__,
+                o2=self._classes2[index].__name__,
+                c=self._cnames[index], a=self._anames[index],
+                sym=self._operations[index], r=result))
+        return '\n'.join(lines)
+
+    def clear(self):
+        """Discard all recorded events."""
+        self.count = 0
+        for index in range(self.size):
+            self._classes1[index] = self._classes2[index] = None
+            self._notes[index] = None
+
+    def _indices(self):
+        """Get the buffer indices of events from oldest to newest."""
+        start = max(self.count - self.size, 0)
+        return (number % self.size for number in range(start, self.count))
+
+
+RECORDER = Recorder()
+
+
+def enable(size=None):
+    """Start recording comparisons.
+
+    @param size: number of events to keep (default: unchanged)
+
+    """
+    global enabled, RECORDER  # pylint: disable=W0603
+    if size is not None and size != RECORDER.size:
+        RECORDER = Recorder(size)
+    enabled = True
+
+
+def disable():
+    """Stop recording comparisons."""
+    global enabled  # pylint: disable=W0603
+    enabled = False
+
+
+def record(obj1, obj2, sym, cname, aname, result, depth):  # pylint: disable=R0913
+    """Store a comparison event in the global recorder."""
+    RECORDER.record(obj1, obj2, sym, cname, aname, result, depth)
+
+
+def dump():
+    """Format the events in the global recorder as indented text."""
+    return RECORDER.dump()
+
+
+def clear():
+    """Discard all events in the global recorder."""
+    RECORDER.clear()
@@ -0,0 +1,102 @@
+"""Registry of comparable types and optional backends resolved on use.
+
+Types and backends are registered by name and the modules providing them
+are only imported the first time they are resolved, so programs pay the
+import cost of what they use:
+
+    >>> resolve('Number')
+    <class 'comparable.simple.Number'>
+
+Backends are modules that accelerate searches. A third-party backend
+that is not installed (NumPy) resolves to None so callers can fall back,
+while errors importing the package's own backends are raised:
+
+    >>> backend('index').__name__
+    'comparable.index'
+
+"""
+
+import importlib
+from collections import OrderedDict
+
+TYPES = OrderedDict([  # name: class or 'module:attribute'
+    ('Number', 'comparable.simple:Number'),
+    ('Text', 'comparable.simple:Text'),
+    ('TextEnum', 'comparable.simple:TextEnum'),
+    ('TextTitle', 'comparable.simple:TextTitle'),
+    ('TextVector', 'comparable.vector:TextVector'),
+    ('Group', 'comparable.compound:Group'),
+])
+
+BACKENDS = OrderedDict([  # name: module
+    ('numpy', 'numpy'),  # bulk scoring of vectors
+    ('index', 'comparable.index'),  # memory-mapped indexes
+    ('corpus', 'comparable.corpus'),  # prepared corpora and worker pools
+])
+
+_types = {}  # name: resolved class
+_backends = {}  # name: resolved module or None if not installed
+
+
+def register(name, target):
+    """Register (or replace) a comparable type.
+
+    @param name: name of the type
+    @param target: class or 'module:attribute' string to import on use
+
+    """
+    TYPES[name] = target
+    _types.pop(name, None)
+
+
+def types():
+    """Get the names of the registered types."""
+    return list(TYPES)
+
+
+def resolve(name):
+    """Get a registered type, importing its module on first use.
+
+    @param name: name of the type
+    @return: comparable class
+    @raise ValueError: if the type is not registered
+
+    """
+    cls = _types.get(name)
+    if cls is None:
+        if name not in TYPES:
+            raise ValueError("unknown type {!r} (choose from: {})".format(
+                name, ', '.join(sorted(TYPES))))
+        target = TYPES[name]
+        if isinstance(target, str):
+            module, attribute = target.split(':')
+            target = getattr(importlib.import_module(module), attribute)
+        cls = _types[name] = target
+    return cls
+
+
+def backend(name):
+    """Get an optional backend, importing it on first use.
+
+    @param name: name of the backend
+    @return: module or None if a third-party backend is not installed
+    @raise ValueError: if the backend is not registered
+    @raise ImportError: if a backend fails to import for another reason
+
+    """
+    try:
+        return _backends[name]
+    except KeyError:
+        pass
+    if name not in BACKENDS:
+        raise ValueError("unknown backend {!r} (choose from: {})".format(
+            name, ', '.join(BACKENDS)))
+    path = BACKENDS[name]
+    try:
+        module = importlib.import_module(path)
+    except ImportError as error:
+        if error.name != path or path.startswith(__package__ + '.'):
+            raise  # a bug rather than an optional backend not installed
+        module = None
+    _backends[name] = module
+    return module
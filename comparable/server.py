@@ -0,0 +1,474 @@
+#!/usr/bin/env python
+
+"""Local query server sharing similarity indexes between processes.
+
+Reference items are split into shards saved as L{Index} files. The server
+opens each shard in its own worker processes (memory-mapped, so every
+process shares the operating system's single cached copy) and accepts
+batched queries over a Unix socket. Each query is fanned out to all
+shards and the results are merged.
+
+Serve saved shards:
+
+    python -m comparable.server --socket /tmp/comparable.sock shard*.idx
+
+Measure throughput with concurrent clients:
+
+    python -m comparable.server --benchmark
+
+Requests and responses are single lines of JSON. A request names an
+operation ('match', 'top_k', or 'equal') and the values of the bases:
+
+    {"op": "match", "values": ["abc", "def"], "threshold": 0.8}
+
+and the response contains one result per base, where items are referred
+to by their position across all shards in order:
+
+    {"results": [[3, 0.857], null]}
+
+"""
+
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import socketserver
+import multiprocessing
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+
+from comparable.simple import Number, Text
+from comparable.index import Index
+
+OPERATIONS = ('match', 'top_k', 'equal')
+
+_INDEX = None  # shard index opened by each worker process
+
+
+def _open(path):
+    """Open a shard index in a worker process."""
+    global _INDEX  # pylint: disable=W0603
+    _INDEX = Index.open(path)
+
+
+def _query(request):
+    """Run a request against the shard index of a worker process."""
+    return _run(_INDEX, request)
+
+
+def _run(index, request):
+    """Run a request against one index.
+
+    @param index: L{Index} of a shard
+    @param request: dictionary of the request
+    @return: list of results (with positions in the shard) for each base
+
+    @raise ValueError: if the values do not match the type of the index
+
+    """
+    operation = request['op']
+    threshold = request.get('threshold')
+    if index.type is Number:
+        kinds, name = (int, float), "numbers"
+    else:
+        kinds, name = str, "strings"
+    if not all(isinstance(value, kinds) and not isinstance(value, bool)
+               for value in request['values']):
+        raise ValueError("'values' must be {} for an index of {}".format(
+            name, index.type.__name__))
+    bases = [index.type(value) for value in request['values']]
+
+    results = []
+    for base in bases:
+        if operation == 'equal':
+            results.append(index.equal(base))
+            continue
+        if operation == 'top_k' and threshold is None:
+            threshold = 0.0  # any similarity is ranked
+        found = index.similar(base, threshold)
+        scored = ((position, float(similarity))
+                  for position, similarity in found)
+        if operation == 'match':
+            best = max(scored, key=_rank, default=None)
+            results.append(best and list(best))
+        else:
+            results.append([list(result) for result in
+                            heapq.nlargest(request['k'], scored, key=_rank)])
+    return results
+
+
+def _rank(result):
+    """Rank (position, similarity) by similarity, then lowest position."""
+    position, similarity = result
+    return similarity, -position
+
+
+def _merge(request, shard_results, offsets):
+    """Combine the results of each shard.
+
+    @param request: dictionary of the request
+    @param shard_results: list of results from each shard
+    @param offsets: position of the first item of each shard
+
+    @return: list of results (with global positions) for each base
+
+    """
+    operation = request['op']
+    merged = []
+    for results in zip(*shard_results):
+        if operation == 'equal':
+            merged.append([position + offset for positions, offset
+                           in zip(results, offsets)
+                           for position in positions])
+        elif operation == 'match':
+            found = [(result[0] + offset, result[1]) for result, offset
+                     in zip(results, offsets) if result]
+            best = max(found, key=_rank, default=None)
+            merged.append(best and list(best))
+        else:
+            found = [(position + offset, similarity)
+                     for shard, offset in zip(results, offsets)
+                     for position, similarity in shard]
+            merged.append([list(result) for result in
+                           heapq.nlargest(request['k'], found, key=_rank)])
+    return merged
+
+
+def _validate(request):
+    """Check that a request can be run.
+
+    @raise ValueError: if the request is invalid
+
+    """
+    if not isinstance(request, dict) or request.get('op') not in OPERATIONS:
+        raise ValueError("'op' must be one of: " + ', '.join(OPERATIONS))
+    if not isinstance(request.get('values'), list):
+        raise ValueError("'values' must be a list")
+    if request['op'] == 'top_k' and not isinstance(request.get('k'), int):
+        raise ValueError("'k' must be an integer")
+
+
+def _offsets(counts):
+    """Get the position of the first item of each shard."""
+    offsets = [0]
+    for count in counts[:-1]:
+        offsets.append(offsets[-1] + count)
+    return offsets
+
+
+def save_shards(items, directory, shards):
+    """Split items into shards saved as index files.
+
+    @param items: list of items of a single type (see L{Index})
+    @param directory: directory to save the index files
+    @param shards: number of shards
+
+    @return: list of index file paths
+
+    """
+    items = list(items)
+    size = -(-len(items) // shards) or 1  # items per shard
+    paths = []
+    for number, start in enumerate(range(0, max(len(items), 1), size)):
+        path = os.path.join(directory, "shard{}.idx".format(number))
+        with Index(items[start:start + size]) as index:
+            index.save(path)
+        paths.append(path)
+    return paths
+
+
+class _Queries(object, metaclass=ABCMeta):
+
+    """Batched queries shared by clients."""
+
+    @abstractmethod
+    def query(self, request):  # pragma: no cover, abstract
+        """Run a request and get its results."""
+
+    def match(self, values, threshold=None):
+        """Get the most similar matching item for each base.
+
+        @param values: list of base values
+        @param threshold: similarity ratio required (default: base threshold)
+        @return: list of [position, similarity] or None for each base
+
+        """
+        return self.query({'op': 'match', 'values': values,
+                           'threshold': threshold})
+
+    def top_k(self, values, k, threshold=None):
+        """Get the most similar items for each base.
+
+        @param values: list of base values
+        @param k: maximum number of items for each base
+        @param threshold: similarity ratio required (default: any)
+        @return: list of [[position, similarity], ...] for each base
+
+        """
+        return self.query({'op': 'top_k', 'values': values, 'k': k,
+                           'threshold': threshold})
+
+    def equal(self, values):
+        """Get the items equal to each base.
+
+        @param values: list of base values
+        @return: list of [position, ...] for each base
+
+        """
+        return self.query({'op': 'equal', 'values': values})
+
+    def close(self):
+        """Release any resources."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class LocalClient(_Queries):
+
+    """Stand-in client that runs queries on shards in this process."""
+
+    def __init__(self, paths):
+        self.indexes = [Index.open(path) for path in paths]
+        self.offsets = _offsets([len(index) for index in self.indexes])
+
+    def query(self, request):
+        _validate(request)
+        return _merge(request, [_run(index, request)
+                                for index in self.indexes], self.offsets)
+
+    def close(self):
+        while self.indexes:
+            self.indexes.pop().close()
+
+
+class Client(_Queries):
+
+    """Client of a query server listening on a Unix socket."""
+
+    def __init__(self, address):
+        self._socket = socket.socket(socket.AF_UNIX,  # pylint: disable=E1101
+                                     socket.SOCK_STREAM)
+        self._socket.connect(address)
+        self._file = self._socket.makefile('rwb')
+
+    def query(self, request):
+        """Run a request on the server.
+
+        @raise ValueError: if the server rejects the request
+
+        """
+        self._file.write(json.dumps(request).encode('utf-8') + b'\n')
+        self._file.flush()
+        response = json.loads(self._file.readline().decode('utf-8'))
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response['results']
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    """Answer each line of JSON received with a line of JSON."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line.decode('utf-8'))
+                response = {'results': self.server.owner.query(request)}
+            except Exception as error:  # pylint: disable=W0703
+                # Any failure is reported so the connection stays usable
+                response = {'error': str(error) or type(error).__name__}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn,
+                  socketserver.UnixStreamServer):  # pylint: disable=E1101
+
+    """Threaded Unix socket server."""
+
+    daemon_threads = True
+
+
+class Server(object):
+
+    """Query server fanning requests out to shard worker processes."""
+
+    def __init__(self, paths, address, workers=1):
+        """Start the worker processes and listen on a Unix socket.
+
+        @param paths: list of shard index file paths
+        @param address: path of the Unix socket to create
+        @param workers: number of worker processes for each shard
+
+        """
+        self.paths = list(paths)
+        self.address = address
+        counts = []
+        for path in self.paths:
+            with Index.open(path) as index:
+                counts.append(len(index))
+        self.offsets = _offsets(counts)
+        self._executors = [ProcessPoolExecutor(workers, initializer=_open,
+                                               initargs=(path,))
+                           for path in self.paths]
+        self._server = _UnixServer(address, _Handler)
+        self._server.owner = self
+        self._thread = None
+
+    def __repr__(self):
+        return "<{} of {} shards on {}>".format(self.__class__.__name__,
+                                                len(self.paths), self.address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def query(self, request):
+        """Run a request on every shard and merge the results.
+
+        @raise ValueError: if the request is invalid
+
+        """
+        _validate(request)
+        futures = [executor.submit(_query, request)
+                   for executor in self._executors]
+        return _merge(request, [future.result() for future in futures],
+                      self.offsets)
+
+    def serve_forever(self):
+        """Answer requests until L{close} is called."""
+        self._server.serve_forever()
+
+    def start(self):
+        """Answer requests in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop answering requests and stop the worker processes."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        for executor in self._executors:
+            executor.shutdown()
+        if os.path.exists(self.address):
+            os.remove(self.address)
+
+
+# Benchmark ##################################################################
+
+WORDS = ("the cat and hat a clockwork orange hello world of green eggs "
+         "ham one fish two red blue sun also rises catch").split()
+
+
+def _texts(count, seed):
+    """Generate random title-like texts."""
+    rand = random.Random(seed)
+    return [' '.join(rand.choice(WORDS) for _ in range(rand.randint(1, 5)))
+            for _ in range(count)]
+
+
+def _client(address, batches, batch, seed):
+    """Send batches of match queries from a client process."""
+    with Client(address) as client:
+        for number in range(batches):
+            client.match(_texts(batch, seed + number))
+
+
+def benchmark(size=100000, shards=None, clients=None, batches=10, batch=100,
+              log=print):  # pylint: disable=R0913
+    """Measure the throughput of the server against a local client.
+
+    @param size: number of reference items
+    @param shards: number of shards (default: CPU count)
+    @param clients: number of concurrent client processes (default: CPUs)
+    @param batches: number of batches sent by each client
+    @param batch: number of bases in each batch
+    @param log: function to display results
+
+    @return: dictionary of queries per second for 'local' and 'server'
+
+    """
+    shards = shards or os.cpu_count() or 1
+    clients = clients or os.cpu_count() or 1
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = save_shards([Text(text) for text in _texts(size, seed=0)],
+                            directory, shards)
+
+        with LocalClient(paths) as client:
+            start = time.perf_counter()
+            for number in range(batches):
+                client.match(_texts(batch, number))
+            results['local'] = batches * batch / (time.perf_counter() - start)
+
+        address = os.path.join(directory, 'server.sock')
+        with Server(paths, address) as server:
+            server.start()
+            processes = [multiprocessing.Process(
+                target=_client, args=(address, batches, batch, 1000 * number))
+                         for number in range(clients)]
+            start = time.perf_counter()
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            results['server'] = (clients * batches * batch /
+                                 (time.perf_counter() - start))
+
+    log("{:,} items, {} shards: local client {:,.1f} queries/s, "
+        "{} server clients {:,.1f} queries/s".format(
+            size, shards, results['local'], clients, results['server']))
+    return results
+
+
+def main(args=None):
+    """Process command-line arguments and run the server."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('paths', nargs='*', metavar='PATH',
+                        help="shard index files to serve")
+    parser.add_argument('--socket', metavar='PATH',
+                        help="path of the Unix socket to create")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes for each shard")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="measure throughput instead of serving")
+    parser.add_argument('--size', type=int, default=100000,
+                        help="number of items for the benchmark")
+    args = parser.parse_args(args)
+
+    if args.benchmark:
+        benchmark(args.size)
+        return 0
+
+    if not args.paths or not args.socket:
+        parser.error("shard index files and --socket are required")
+    with Server(args.paths, args.socket, args.workers) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:  # pragma: no cover (manual test)
+            pass
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover (manual test)
+    sys.exit(main())
@@ -1,9 +1,124 @@
 """Class definitions for simple comparable types."""
 
-import logging
+import heapq
+import hashlib
+from array import array
+from collections import Counter
 from difflib import SequenceMatcher
 
-from comparable.base import SimpleComparable
+from comparable.base import SimpleComparable, Comparison, _debug
+
+
+class Sketch(object):  # pylint: disable=R0903
+
+    """Compact features of a text used to quickly bound its similarity.
+
+    Characters are folded into a fixed number of histogram buckets, so the
+    sketch has the same size regardless of the length of the text.
+
+    """
+
+    BUCKETS = 64  # number of character histogram buckets
+
+    __slots__ = ('length', 'bitmap', 'histogram', 'folded')
+
+    def __init__(self, text, fold=False):
+        self.length = len(text)
+        histogram = [0] * self.BUCKETS
+        for char, count in Counter(text).items():
+            histogram[ord(char) % self.BUCKETS] += count
+        self.histogram = tuple(histogram)
+        self.bitmap = sum(1 << index for index, count in enumerate(histogram)
+                          if count)
+        self.folded = _hash(text.lower()) if fold else None
+
+    def disjoint(self, other):
+        """Determine if two texts are certain to have a ratio of zero."""
+        if not self.length and not other.length:
+            return False
+        return not self.bitmap & other.bitmap
+
+    def bound(self, other, threshold=0.0):
+        """Get an upper bound on the 'SequenceMatcher' ratio of two texts.
+
+        @param other: sketch of the second text
+        @param threshold: ratio below which cheaper bounds are sufficient
+        @return: ratio no less than the actual ratio
+
+        """
+        total = self.length + other.length
+        if not total:
+            return 1.0
+
+        # Matching characters are limited by the shorter text
+        ratio = 2.0 * min(self.length, other.length) / total
+        if ratio < threshold:
+            return ratio
+
+        # Texts without any common characters cannot match at all
+        if not self.bitmap & other.bitmap:
+            return 0.0
+
+        # Matching characters are limited by the common histogram buckets
+        matches = sum(map(min, self.histogram, other.histogram))
+        return 2.0 * matches / total
+
+
+class Shingles(object):  # pylint: disable=R0903
+
+    """Bottom-k sketch of the character shingles of a long text.
+
+    Every substring of SIZE characters (a shingle) is hashed once, and
+    only the K smallest distinct hashes are kept. The K smallest hashes of
+    two sketches combined are a random sample of the shingles of both
+    texts, so the fraction found in both sketches estimates the Jaccard
+    index J of the shingle sets, and 2J / (1 + J) estimates their Dice
+    coefficient, which follows the 'SequenceMatcher' ratio of the texts.
+
+    The sample's standard error on J is at most sqrt(J (1 - J) / K), i.e.
+    0.031 for K = 256, which is about 0.06 on the ratio of unrelated texts
+    and 0.02 on the ratio of nearly identical texts. Compared to the exact
+    ratio (without the 'autojunk' heuristic), estimates are within about
+    0.1 for texts that differ by words or blocks of text. Texts differing
+    by scattered character edits are underestimated, as each edit changes
+    up to SIZE shingles. Repetitive texts are badly underestimated, as the
+    sets of shingles ignore how often each shingle occurs (e.g. "x" * 5000
+    and "x" * 5000 + "y" have a ratio of 1.0 but an estimate of 0.67).
+    Estimates never exceed the bound of a L{Sketch}.
+
+    """
+
+    SIZE = 4  # characters per shingle
+    K = 256  # number of hashes kept
+
+    __slots__ = ('hashes',)
+
+    def __init__(self, text):
+        size = self.SIZE
+        shingles = {text[index:index + size]
+                    for index in range(max(len(text) - size + 1, 1))}
+        self.hashes = array('Q', sorted(heapq.nsmallest(
+            self.K, {_hash(str(shingle)) for shingle in shingles})))
+
+    def ratio(self, other):
+        """Estimate the similarity ratio of two texts.
+
+        @param other: sketch of the second text
+        @return: estimated ratio
+
+        """
+        hashes1, hashes2 = set(self.hashes), set(other.hashes)
+        union = heapq.nsmallest(self.K, hashes1 | hashes2)  # never empty
+        shared = sum(1 for value in union
+                     if value in hashes1 and value in hashes2)
+        jaccard = shared / len(union)
+        return 2.0 * jaccard / (1.0 + jaccard)
+
+
+def _hash(text):
+    """Get a stable 64-bit hash of a text."""
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
 
 
 class _Simple(SimpleComparable):  # pylint: disable=W0223
@@ -41,6 +156,10 @@ class Number(_Simple):
         """Get equality using floating point equality."""
         return float(self) == float(other)
 
+    def key(self):
+        """Get the floating point value used for equality."""
+        return float(self)
+
     def similarity(self, other):
         """Get similarity as a ratio of the two numbers."""
         numerator, denominator = sorted((self.value, other.value))
@@ -51,50 +170,178 @@ class Number(_Simple):
         similarity = self.Similarity(ratio)
         return similarity
 
+    def compare(self, other):
+        """Get equality and similarity, skipping the ratio of equal numbers."""
+        if self.equality(other):
+            return Comparison(True, self.Similarity(1.0))
+        return Comparison(False, self.similarity(other))
+
 
 class Text(_Simple):
 
-    """Comparable generic text."""
+    """Comparable generic text.
+
+    Texts longer than 'long_length' are compared by estimating their
+    similarity from L{Shingles} sketches (see there for error bounds),
+    as 'SequenceMatcher' takes quadratic time on long texts. Two texts
+    use the lower of their limits, so similarity is symmetric.
+
+    """
 
     threshold = 0.83  # "Hello, world!" ~ "hello world"
+    long_length = 4096  # characters to use shingle sketches (None: never)
+    sketched = 'value'  # attribute sketched (and compared by 'similarity')
+
+    def __init__(self, value):
+        super().__init__(value)
+        self.sketch = self._sketch() if isinstance(value, str) else None
+        self.shingles = self._shingles() if self.long else None
+
+    @property
+    def long(self):
+        """Determine if the text is compared by its shingle sketch."""
+        return self.sketch is not None and self._long(self, self.sketch)
 
     def equality(self, other):
         """Get equality using string comparison."""
         return str(self) == str(other)
 
+    def key(self):
+        """Get the string value used for equality."""
+        return str(self)
+
     def similarity(self, other):
         """Get similarity as a ratio of the two texts."""
-        ratio = SequenceMatcher(a=self.value, b=other.value).ratio()
+        sketch = self._sketched(other)
+        if sketch is not None and self.sketch.disjoint(sketch):
+            ratio = 0.0  # no common characters
+        elif sketch is not None and self._long(other, sketch):
+            return self._estimate(other)
+        else:
+            ratio = SequenceMatcher(a=self.value, b=other.value).ratio()
+        similarity = self.Similarity(ratio)
+        return similarity
+
+    def compare(self, other):
+        """Get equality and similarity, skipping the ratio of equal texts."""
+        equality = self.equality(other)
+        if equality and isinstance(self.value, str) and \
+                isinstance(other.value, str):
+            # Identical texts are fully matched by 'SequenceMatcher'
+            return Comparison(True, self.Similarity(1.0))
+        return Comparison(equality, self.similarity(other))
+
+    def bound(self, other):
+        """Get an upper bound on similarity from the two text sketches."""
+        sketch = self._sketched(other)
+        if sketch is None:
+            return super().bound(other)
+        ratio = self.sketch.bound(sketch, self.threshold)
+        similarity = self.Similarity(ratio)
+        return similarity
+
+    def _sketched(self, other):
+        """Get the other text's sketch if it is of the text compared.
+
+        @return: L{Sketch} or None if the sketches are not of the texts
+                 compared by 'similarity' (e.g. a stripped title)
+
+        """
+        sketch = getattr(other, 'sketch', None)
+        if sketch is None or self.sketch is None or \
+                getattr(other, 'sketched', None) != self.sketched:
+            return None
+        return sketch
+
+    def _long(self, other, sketch):
+        """Determine if two texts are compared by their shingle sketches.
+
+        @param other: second text
+        @param sketch: L{Sketch} of the second text
+
+        """
+        limits = [limit for limit in (self.long_length,
+                                      getattr(other, 'long_length', None))
+                  if limit is not None]
+        return bool(limits) and \
+            max(self.sketch.length, sketch.length) > min(limits)
+
+    def _estimate(self, other):
+        """Estimate similarity from the shingle sketches of two texts."""
+        ratio = self._shingled().ratio(other._shingled())  # pylint: disable=W0212
+        # Sets of shingles ignore repetition, but the ratio cannot exceed
+        # the bound from character counts
+        ratio = min(ratio, self.sketch.bound(other.sketch))
         similarity = self.Similarity(ratio)
+        similarity.exact = False
         return similarity
 
+    def _shingled(self):
+        """Get (and create once) the shingle sketch of the text."""
+        if self.shingles is None:
+            self.shingles = self._shingles()
+        return self.shingles
+
+    def _sketch(self):
+        """Create the sketch of the text used for similarity."""
+        return Sketch(self.value)
+
+    def _shingles(self):
+        """Create the shingle sketch of the text used for similarity."""
+        return Shingles(self.value)
+
 
 class TextEnum(Text):
 
     """Comparable case-insensitive textual enumeration."""
 
     threshold = 1.0  # enumerations must match
+    long_length = None  # enumerations are never estimated
 
     def similarity(self, other):
         """Get similarity as a discrete ratio (1.0 or 0.0)."""
-        ratio = 1.0 if (str(self).lower() == str(other).lower()) else 0.0
+        sketch = self._sketched(other)
+        if sketch is not None and sketch.folded is not None and \
+                sketch.folded != self.sketch.folded:
+            ratio = 0.0  # lowercase hashes differ
+        else:
+            ratio = 1.0 if (str(self).lower() == str(other).lower()) else 0.0
         similarity = self.Similarity(ratio)
         return similarity
 
+    def bound(self, other):
+        """Get an upper bound on similarity from the lowercase hashes."""
+        sketch = self._sketched(other)
+        if sketch is None or sketch.folded is None:
+            return super(Text, self).bound(other)  # case is not ignored
+        ratio = 1.0 if self.sketch.folded == sketch.folded else 0.0
+        similarity = self.Similarity(ratio)
+        return similarity
+
+    def _sketch(self):
+        return Sketch(self.value, fold=True)
+
 
 class TextTitle(Text):
 
     """Comparable case-insensitive textual titles."""
 
     threshold = 0.93  # "The Cat and the Hat" ~ "cat an' the hat"
+    sketched = 'stripped'
 
     ARTICLES = 'a', 'an', 'the'  # stripped from the front
     JOINERS = '&', '+'  # replaced with 'and'
 
     def __init__(self, value):
+        self.stripped = self._strip(value)
+        _debug("stripped %r to %r", value, self.stripped)
         super().__init__(value)
-        self.stripped = self._strip(self.value)
-        logging.debug("stripped %r to %r", self.value, self.stripped)
+
+    def _sketch(self):
+        return Sketch(self.stripped)
+
+    def _shingles(self):
+        return Shingles(self.stripped)
 
     @staticmethod
     def _strip(text):
@@ -112,7 +359,13 @@ class TextTitle(Text):
 
     def similarity(self, other):
         """Get similarity as a ratio of the stripped text."""
-        logging.debug("comparing %r and %r...", self.stripped, other.stripped)
-        ratio = SequenceMatcher(a=self.stripped, b=other.stripped).ratio()
+        _debug("comparing %r and %r...", self.stripped, other.stripped)
+        sketch = self._sketched(other)
+        if sketch is not None and self.sketch.disjoint(sketch):
+            ratio = 0.0  # no common characters
+        elif sketch is not None and self._long(other, sketch):
+            return self._estimate(other)
+        else:
+            ratio = SequenceMatcher(a=self.stripped, b=other.stripped).ratio()
         similarity = self.Similarity(ratio)
         return similarity
@@ -0,0 +1,545 @@
+#!/usr/bin/env python
+
+"""Benchmarks for the comparable package.
+
+Run all benchmarks and save the results:
+
+    python -m comparable.test.bench --save bench.json
+
+Compare against previously saved results (exits non-zero on regression):
+
+    python -m comparable.test.bench --baseline bench.json --tolerance 0.25
+
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from collections import OrderedDict
+
+from comparable.base import CompoundComparable
+from comparable.simple import Number, Text, TextEnum, TextTitle
+from comparable.compound import Group
+from comparable.vector import TextVector
+from comparable.corpus import PreparedCorpus
+from comparable.ranked import RankedView
+from comparable import tools
+from comparable import external
+
+from comparable.test import settings
+
+WORDS = ("the cat and hat a clockwork orange hello world of green eggs "
+         "ham one fish two red blue sun also rises catch").split()
+SIZES = [10 ** exponent for exponent in range(2, 7)]  # up to 1M
+GROUP_SIZES = list(range(2, 13))
+BUDGET = 10.0  # seconds before larger sizes of a benchmark are skipped
+REPEAT = 0.2  # seconds to repeat short runs for stable timing
+TOLERANCE = 0.25  # allowed relative change before a regression
+
+BENCHMARKS = OrderedDict()  # name: (function, sizes)
+
+
+def benchmark(name, sizes=None):
+    """Decorate a function to register it as a benchmark.
+
+    The function is called with the input size and must return a callable
+    that runs the benchmark once and the number of operations it performs.
+
+    """
+    def decorator(function):
+        """Register the function."""
+        BENCHMARKS[name] = function, sizes or SIZES
+        return function
+    return decorator
+
+
+def _text(rand):
+    """Generate a random title-like text."""
+    return ' '.join(rand.choice(WORDS) for _ in range(rand.randint(1, 5)))
+
+
+def _numbers(size, seed=0):
+    """Generate a list of random numbers."""
+    rand = random.Random(seed)
+    return [Number(rand.randint(1, size) * 1.0001 ** rand.randint(0, 1))
+            for _ in range(size)]
+
+
+def _texts(cls, size, seed=0):
+    """Generate a list of random texts."""
+    rand = random.Random(seed)
+    return [cls(_text(rand)) for _ in range(size)]
+
+
+def _pairs(items):
+    """Create a benchmark comparing each item to its neighbor."""
+    def run():
+        """Compare each item to the next."""
+        for index in range(len(items) - 1):
+            _ = items[index] == items[index + 1]
+            _ = items[index] % items[index + 1]
+    return run, len(items) - 1
+
+
+# Comparable types ###########################################################
+
+@benchmark('compare-number', SIZES[:4])
+def bench_number(size):
+    """Compare neighboring numbers."""
+    return _pairs(_numbers(size + 1))
+
+
+@benchmark('compare-text', SIZES[:4])
+def bench_text(size):
+    """Compare neighboring texts."""
+    return _pairs(_texts(Text, size + 1))
+
+
+@benchmark('compare-text-enum', SIZES[:4])
+def bench_text_enum(size):
+    """Compare neighboring enumeration texts."""
+    return _pairs(_texts(TextEnum, size + 1))
+
+
+@benchmark('compare-text-title', SIZES[:4])
+def bench_text_title(size):
+    """Compare neighboring title texts."""
+    return _pairs(_texts(TextTitle, size + 1))
+
+
+@benchmark('compare-group', GROUP_SIZES)
+def bench_group(size):
+    """Compare two groups of texts."""
+    group1 = Group(_texts(Text, size, seed=1))
+    group2 = Group(_texts(Text, size, seed=2))
+    return _pairs([group1, group2])
+
+
+@benchmark('group-create', SIZES[:4])
+def bench_group_create(size):
+    """Create groups of numbers."""
+    items = _numbers(size)
+
+    def run():
+        """Create 100 groups."""
+        _ = [Group(items) for _ in range(100)]
+
+    return run, 100
+
+
+@benchmark('group-equality', SIZES[:4])
+def bench_group_equality(size):
+    """Compare two groups of the same numbers."""
+    group1 = Group(_numbers(size))
+    group2 = Group(list(group1.items))
+
+    def run():
+        """Compare the groups."""
+        _ = group1 == group2
+
+    return run, size
+
+
+class _Record(CompoundComparable):  # pylint: disable=W0223
+
+    """Record whose declared first attribute is slow and rarely differs."""
+
+    attributes = {'title': 1, 'kind': 1, 'size': 1}
+
+    def __init__(self, title, kind, size):
+        self.title = TextTitle(title)
+        self.kind = TextEnum(kind)
+        self.size = Number(size)
+
+
+class _AdaptiveRecord(_Record):  # pylint: disable=W0223
+
+    """Record compared in the order learned at run time."""
+
+    adaptive = True
+
+
+def _records(cls, size):
+    """Create a benchmark comparing records for equality."""
+    rand = random.Random(0)
+    title = ' '.join(WORDS)
+    items = [cls(title, 'book', rand.randint(1, size))
+             for _ in range(size + 1)]
+
+    def run():
+        """Compare each record to the next."""
+        for index in range(size):
+            _ = items[index] == items[index + 1]
+
+    return run, size
+
+
+@benchmark('record-equality', SIZES[:3])
+def bench_record_equality(size):
+    """Compare records in their declared order."""
+    return _records(_Record, size)
+
+
+@benchmark('record-equality-adaptive', SIZES[:3])
+def bench_record_equality_adaptive(size):
+    """Compare records in their learned order."""
+    return _records(_AdaptiveRecord, size)
+
+
+# Tools ######################################################################
+
+def _tool(function, size, *args):
+    """Create a benchmark calling a tools function on a list of numbers."""
+    items = _numbers(size)
+    base = items[len(items) // 2]
+
+    def run():
+        """Call the function and consume its result."""
+        result = function(base, items, *args)
+        if not isinstance(result, (list, Number, type(None))):
+            for _ in result:
+                pass
+
+    return run, size
+
+
+@benchmark('tools-find-equal')
+def bench_find_equal(size):
+    """Find numbers equal to a base."""
+    return _tool(tools.find_equal, size)
+
+
+@benchmark('tools-match-equal')
+def bench_match_equal(size):
+    """Match a number equal to a base."""
+    return _tool(tools.match_equal, size)
+
+
+@benchmark('tools-find-similar')
+def bench_find_similar(size):
+    """Find numbers similar to a base."""
+    return _tool(tools.find_similar, size)
+
+
+@benchmark('tools-match-similar')
+def bench_match_similar(size):
+    """Match the number most similar to a base."""
+    return _tool(tools.match_similar, size)
+
+
+@benchmark('tools-duplicates')
+def bench_duplicates(size):
+    """Find duplicates of a base."""
+    return _tool(tools.duplicates, size)
+
+
+@benchmark('tools-sort')
+def bench_sort(size):
+    """Sort numbers by similarity to a base."""
+    return _tool(tools.sort, size)
+
+
+@benchmark('external-sort', SIZES[:4])
+def bench_external_sort(size):
+    """Sort numbers with bounded memory."""
+    items = _numbers(size)
+    base = items[len(items) // 2]
+
+    def run():
+        """Consume the sorted items."""
+        for _ in external.sort(base, iter(items), memory=2 ** 20):
+            pass
+
+    return run, size
+
+
+@benchmark('tools-top-k')
+def bench_top_k(size):
+    """Get the numbers most similar to a base."""
+    return _tool(tools.top_k, size, 10)
+
+
+@benchmark('tools-stream-dedupe')
+def bench_stream_dedupe(size):
+    """Label duplicates in a stream of numbers."""
+    items = _numbers(size)
+
+    def run():
+        """Consume the labeled stream."""
+        for _ in tools.stream_dedupe(items, window=100):
+            pass
+
+    return run, size
+
+
+@benchmark('tools-knn-graph', SIZES[:4])
+def bench_knn_graph(size):
+    """Get the nearest neighbors of every number."""
+    items = _numbers(size)
+
+    def run():
+        """Build the graph."""
+        tools.knn_graph(items, 10, processes=1)
+
+    return run, size
+
+
+@benchmark('tools-cluster', SIZES[:3])
+def bench_cluster(size):
+    """Group numbers linked by similarity."""
+    items = _numbers(size)
+
+    def run():
+        """Group the items."""
+        tools.cluster(items)
+
+    return run, size
+
+
+def _query(base, items):
+    """Get the ten most similar other items with a chained query."""
+    return tools.query(base, items).exclude_equal().similar().top(10)
+
+
+@benchmark('tools-query')
+def bench_query(size):
+    """Chain query operations on numbers."""
+    return _tool(_query, size)
+
+
+@benchmark('tools-match-many', SIZES[:4])
+def bench_match_many(size):
+    """Match many texts against texts in worker processes."""
+    items = _texts(Text, size)
+    bases = _texts(Text, 100, seed=1)
+
+    def run():
+        """Match the bases."""
+        tools.match_many(bases, items, processes=2)
+
+    return run, len(bases)
+
+
+@benchmark('ranked-view-change')
+def bench_ranked_view(size):
+    """Add and remove items in a ranked view."""
+    items = _numbers(size)
+    view = RankedView(items[len(items) // 2], items)
+    changes = _numbers(100, seed=1)
+
+    def run():
+        """Add each change and get the top items, then remove the changes."""
+        for item in changes:
+            view.add(item)
+            view.top(10)
+        for item in changes:
+            view.remove(item)
+
+    return run, 2 * len(changes)
+
+
+def _prepared(cls, size):
+    """Create a benchmark matching bases against prepared texts."""
+    corpus = PreparedCorpus(_texts(cls, size))
+    bases = _texts(cls, 100, seed=1)
+
+    def run():
+        """Match each base."""
+        for base in bases:
+            corpus.match(base)
+
+    return run, len(bases)
+
+
+@benchmark('prepared-match-text', SIZES[:4])
+def bench_prepared_text(size):
+    """Match texts against a prepared corpus."""
+    return _prepared(Text, size)
+
+
+@benchmark('prepared-match-text-vector', SIZES[:4])
+def bench_prepared_text_vector(size):
+    """Match text vectors against a prepared corpus."""
+    return _prepared(TextVector, size)
+
+
+# Startup ####################################################################
+
+def _cold(statement):
+    """Create a benchmark running a statement in a new interpreter."""
+    def run():
+        """Run the statement."""
+        subprocess.check_call([sys.executable, '-c', statement])
+    return run, 1
+
+
+@benchmark('import-python', [1])
+def bench_import_python(_):
+    """Start the interpreter."""
+    return _cold('pass')
+
+
+@benchmark('import-package', [1])
+def bench_import_package(_):
+    """Import the package."""
+    return _cold('import comparable')
+
+
+@benchmark('import-simple', [1])
+def bench_import_simple(_):
+    """Import the simple types."""
+    return _cold('from comparable.simple import Text')
+
+
+@benchmark('import-tools', [1])
+def bench_import_tools(_):
+    """Import the tools."""
+    return _cold('from comparable import tools')
+
+
+@benchmark('import-cli', [1])
+def bench_import_cli(_):
+    """Import the command-line interface."""
+    return _cold('import comparable.cli')
+
+
+# Runner #####################################################################
+
+def measure(function, size):
+    """Run a benchmark and measure its time and peak memory.
+
+    @param function: benchmark function
+    @param size: input size for the benchmark
+    @return: dictionary of results
+
+    """
+    run, operations = function(size)
+    seconds = None
+    elapsed = 0.0
+    while elapsed < REPEAT:  # use the fastest of repeated short runs
+        start = time.perf_counter()
+        run()
+        duration = time.perf_counter() - start
+        elapsed += duration
+        seconds = duration if seconds is None else min(seconds, duration)
+
+    run, operations = function(size)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return OrderedDict([('seconds', seconds),
+                        ('throughput', operations / max(seconds, 1e-9)),
+                        ('peak_memory', peak)])
+
+
+def run_all(names=None, max_size=None, budget=BUDGET, log=print):
+    """Run benchmarks at growing input sizes.
+
+    Larger sizes of a benchmark are skipped once a run exceeds the budget.
+
+    @param names: names of benchmarks to run (default: all)
+    @param max_size: largest input size to run
+    @param budget: number of seconds a run may take before skipping
+    @param log: function to display progress
+
+    @return: list of result dictionaries
+
+    """
+    results = []
+    for name, (function, sizes) in BENCHMARKS.items():
+        if names and not any(pattern in name for pattern in names):
+            continue
+        for size in sizes:
+            if max_size and size > max_size:
+                break
+            result = OrderedDict([('name', name), ('size', size)])
+            result.update(measure(function, size))
+            results.append(result)
+            log("{name:<24} {size:>9,} {throughput:>14,.1f} ops/s "
+                "{peak_memory:>14,} B".format(**result))
+            if result['seconds'] > budget:
+                log("{:<24} {:>9} larger sizes skipped".format(name, '...'))
+                break
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Find tracked metrics that regressed from a baseline.
+
+    @param results: list of result dictionaries
+    @param baseline: list of result dictionaries from a previous run
+    @param tolerance: allowed relative change in each metric
+
+    @return: list of regression descriptions
+
+    """
+    previous = {(result['name'], result['size']): result
+                for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result['name'], result['size']))
+        if not old:
+            continue
+        if result['throughput'] < old['throughput'] * (1 - tolerance):
+            regressions.append("{name} ({size}): throughput {0:,.0f} -> "
+                               "{throughput:,.0f} ops/s".format(
+                                   old['throughput'], **result))
+        if result['peak_memory'] > old['peak_memory'] * (1 + tolerance):
+            regressions.append("{name} ({size}): peak memory {0:,} -> "
+                               "{peak_memory:,} B".format(
+                                   old['peak_memory'], **result))
+    return regressions
+
+
+def main(args=None):
+    """Process command-line arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('names', nargs='*',
+                        help="only run benchmarks containing these names")
+    parser.add_argument('--save', metavar='PATH',
+                        help="save the results as JSON")
+    parser.add_argument('--baseline', metavar='PATH',
+                        help="compare with results saved as JSON")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="allowed relative change in tracked metrics")
+    parser.add_argument('--max-size', type=int,
+                        help="largest input size to run")
+    parser.add_argument('--budget', type=float, default=BUDGET,
+                        help="seconds per run before larger sizes are skipped")
+    args = parser.parse_args(args)
+
+    results = run_all(args.names, args.max_size, args.budget)
+
+    if args.save:
+        data = OrderedDict([('python', platform.python_version()),
+                            ('platform', platform.platform()),
+                            ('results', results)])
+        with open(args.save, 'w') as outfile:
+            json.dump(data, outfile, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION: " + regression)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover (manual test)
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=logging.WARNING)
+    sys.exit(main())
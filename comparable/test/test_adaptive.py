@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.adaptive module."""
+
+import random
+import unittest
+from itertools import count
+from unittest.mock import patch
+
+from comparable.base import CompoundComparable
+from comparable.simple import Number, Text, TextEnum
+from comparable import adaptive
+
+from comparable.test import TestCase
+
+
+class Record(CompoundComparable):  # pylint: disable=W0223
+
+    """Compound comparable with an unselective first attribute."""
+
+    attributes = {'kind': 1, 'name': 1, 'size': 1}
+    adaptive = True
+
+    def __init__(self, kind, name, size):
+        self.kind = TextEnum(kind)
+        self.name = Text(name)
+        self.size = Number(size)
+
+    def __repr__(self):
+        return self._repr(str(self.kind), str(self.name), self.size)
+
+
+class DeclaredRecord(Record):  # pylint: disable=W0223
+
+    """The same compound comparable compared in the declared order."""
+
+    adaptive = False
+
+
+def _records(cls, number, seed=0):
+    """Generate records of one kind with a few distinct sizes."""
+    rand = random.Random(seed)
+    return [cls('book', "title", rand.randint(1, 4)) for _ in range(number)]
+
+
+class TestAdaptive(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for adaptive equality."""
+
+    def setUp(self):
+        adaptive.reset()
+
+    def tearDown(self):
+        adaptive.reset()
+
+    def test_results(self):
+        """Verify adaptive equality matches the declared order."""
+        items = _records(Record, 300)
+        declared = _records(DeclaredRecord, 300)
+        for item1, item2, other1, other2 in zip(items, items[1:],
+                                                declared, declared[1:]):
+            self.assertEqual(other1.equality(other2), item1.equality(item2))
+        self.assertFalse(Record('book', "title", 1).equality(Number(1)))
+
+    def test_converges(self):
+        """Verify the most selective attribute is compared first."""
+        ticks = count()
+        items = _records(Record, 2 * adaptive.REORDER + 1)
+        with patch.object(adaptive, 'clock', lambda: next(ticks)):
+            for item1, item2 in zip(items, items[1:]):
+                _ = item1 == item2
+        stats = adaptive.stats()['Record']
+        self.assertListEqual(['size', 'kind', 'name'],
+                             [attribute['name'] for attribute in stats])
+        self.assertEqual(0, stats[1]['rejections'])
+        self.assertLess(stats[1]['checks'], 2 * adaptive.REORDER)
+
+    def test_cost(self):
+        """Verify cheaper (or unmeasured) attributes are compared first."""
+        ordering = adaptive.Order()
+        for _ in range(10):
+            ordering.record('kind', False, 0.002)
+            ordering.record('size', False, 0.001)
+        self.assertListEqual(['name', 'size', 'kind'],
+                             ordering.order(['kind', 'name', 'size']))
+
+    def test_reorder(self):
+        """Verify the order only changes periodically."""
+        ordering = adaptive.Order()
+        names = ['kind', 'size']
+        self.assertListEqual(names, ordering.order(names))
+        ordering.record('kind', True, 0.001)
+        self.assertListEqual(names, ordering.order(names))
+        for _ in range(adaptive.REORDER):
+            ordering.compared()
+        self.assertListEqual(['size', 'kind'], ordering.order(names))
+        self.assertEqual("<Order of 1 attributes after 100 comparisons>",
+                         repr(ordering))
+
+    def test_not_adaptive(self):
+        """Verify statistics are only recorded for adaptive classes."""
+        items = _records(DeclaredRecord, 10)
+        for item1, item2 in zip(items, items[1:]):
+            _ = item1 == item2
+        self.assertDictEqual({}, dict(adaptive.stats()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.aiotools module."""
+
+import asyncio
+import logging
+import unittest
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+
+from comparable.simple import Number
+from comparable import aiotools
+
+from comparable.test import TestCase, settings
+
+
+async def stream(items):
+    """Stand-in for an asynchronous source of items (e.g. a queue)."""
+    for item in items:
+        await asyncio.sleep(0)
+        yield item
+
+
+async def collect(aitems):
+    """Collect the items from an asynchronous iterator."""
+    return [item async for item in aitems]
+
+
+def run(coroutine):
+    """Run a coroutine to completion in a new event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAsync(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for asynchronous functions."""
+
+    items = [Number(42), Number(42.001), Number(43), Number(42.002)]
+
+    def test_afind_similar(self):
+        """Verify similar items can be found in a stream."""
+        base = Number(42)
+        aitems = aiotools.afind_similar(base, stream(self.items), batch=3)
+        self.assertListEqual([Number(42), Number(42.001), Number(42.002)],
+                             run(collect(aitems)))
+
+    def test_afind_similar_executor(self):
+        """Verify similar items can be found using a custom executor."""
+        base = Number(42)
+        with ThreadPoolExecutor(2) as executor:
+            aitems = aiotools.afind_similar(base, stream(self.items),
+                                            executor=executor)
+            self.assertListEqual([Number(42), Number(42.001),
+                                  Number(42.002)], run(collect(aitems)))
+
+    def test_afind_similar_incremental(self):
+        """Verify items are only pulled from the source as needed."""
+        pulled = []
+
+        async def source():
+            for item in self.items:
+                pulled.append(item)
+                yield item
+
+        async def first():
+            aitems = aiotools.afind_similar(Number(42), source(), batch=1)
+            async for item in aitems:
+                await aitems.aclose()
+                return item
+
+        self.assertEqual(Number(42), run(first()))
+        self.assertEqual(1, len(pulled))
+
+    def test_amatch_similar(self):
+        """Verify the most similar item can be matched in a stream."""
+        base = Number(42.002)
+        item = run(aiotools.amatch_similar(base, stream(self.items), batch=2))
+        self.assertEqual(Number(42.002), item)
+
+    def test_amatch_similar_batches(self):
+        """Verify the best match is kept over later, less similar batches."""
+        base = Number(42.001)
+        item = run(aiotools.amatch_similar(base, stream(self.items), batch=1))
+        self.assertEqual(Number(42.001), item)
+
+    def test_amatch_similar_once(self):
+        """Verify each item is compared to the base only once."""
+        base = Number(42.002)
+        with patch.object(Number, 'similarity', side_effect=Number.similarity,
+                          autospec=True) as similarity:
+            run(aiotools.amatch_similar(base, stream(self.items), batch=2))
+        self.assertEqual(len(self.items), similarity.call_count)
+
+    def test_amatch_similar_none(self):
+        """Verify None is returned when no similar item is in a stream."""
+        base = Number(41)
+        item = run(aiotools.amatch_similar(base, stream(self.items)))
+        self.assertIsNone(item)
+
+    def test_atop_k(self):
+        """Verify the most similar items can be found in a stream."""
+        base = Number(42.001)
+        items = run(aiotools.atop_k(base, stream(self.items), 2, batch=1))
+        self.assertListEqual([Number(42.001), Number(42.002)], items)
+
+    def test_aduplicates(self):
+        """Verify duplicate items can be found in a stream."""
+        base = Number(42)
+        aitems = aiotools.aduplicates(base, stream(self.items), batch=2)
+        self.assertListEqual([Number(42.001), Number(42.002)],
+                             run(collect(aitems)))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main(verbosity=0)
@@ -8,8 +8,9 @@ from collections import OrderedDict
 from unittest.mock import patch, Mock, MagicMock
 
 
-from comparable.base import _Base, Similarity, equal, similar
-from comparable.base import SimpleComparable, CompoundComparable
+from comparable.base import _Base, Similarity, Comparison, Deadline
+from comparable.base import equal, similar, compare
+from comparable.base import Comparable, SimpleComparable, CompoundComparable
 
 from comparable.test import TestCase
 from comparable.test import settings
@@ -71,6 +72,12 @@ class TestSimilarity(TestCase):  # pylint: disable=R0904
         sim = Similarity(0.89, threshold=0.87)
         self.assertEqual("Similarity(0.89, threshold=0.87)", repr(sim))
 
+    def test_repr_inexact(self):
+        """Verify an approximate similarity is marked in its representation."""
+        sim = Similarity(0.89, threshold=0.87, exact=False)
+        self.assertEqual("Similarity(0.89, exact=False, threshold=0.87)",
+                         repr(sim))
+
     def test_bool_true(self):
         """Verify a similarity of 1.0 is True."""
         self.assertTrue(Similarity(1.0))
@@ -182,6 +189,49 @@ class TestSimilarity(TestCase):  # pylint: disable=R0904
         self.assertEqual(0.42, round(Similarity(0.421), 2))
 
 
+class TestComparison(TestCase):  # pylint: disable=R0904
+
+    """Unit tests for the Comparison class."""
+
+    def test_str(self):
+        """Verify comparison objects can be represented as strings."""
+        self.assertEqual("equal, 100.0% similar",
+                         str(Comparison(True, Similarity(1.0))))
+        self.assertEqual("not equal, 50.0% similar",
+                         str(Comparison(False, Similarity(0.5))))
+
+    def test_unpack(self):
+        """Verify comparison objects can be unpacked."""
+        equality, similarity = Comparison(True, Similarity(0.5))
+        self.assertTrue(equality)
+        self.assertEqual(0.5, similarity)
+
+    def test_float(self):
+        """Verify comparison objects can be treated as floats."""
+        self.assertEqual(0.5, float(Comparison(True, Similarity(0.5))))
+
+
+class TestDeadline(TestCase):  # pylint: disable=R0904
+
+    """Unit tests for the Deadline class."""
+
+    def test_expired(self):
+        """Verify a deadline expires after its time limit."""
+        self.assertTrue(Deadline(0).expired())
+        self.assertEqual(0.0, Deadline(0).remaining())
+        deadline = Deadline(60)
+        self.assertFalse(deadline.expired())
+        self.assertLess(0.0, deadline.remaining())
+        self.assertTrue(deadline.exact)
+
+    def test_create(self):
+        """Verify deadlines can be created from seconds."""
+        deadline = Deadline(1)
+        self.assertIs(deadline, Deadline.create(deadline))
+        self.assertIsNone(Deadline.create(None))
+        self.assertEqual("Deadline(0.5)", repr(Deadline.create(0.5)))
+
+
 class TestSimpleComparable(TestCase):  # pylint: disable=R0904
 
     """Unit tests for the SimpleComparable class."""
@@ -225,6 +275,20 @@ class TestSimpleComparable(TestCase):  # pylint: disable=R0904
             self.assertTrue(similarity)
             self.obj1.similarity.assert_called_once_with(self.obj2)
 
+    def test_log(self):
+        """Verify comparisons are logged with indentation when enabled."""
+        with self.assertLogs(level=logging.INFO) as logs:
+            Comparable.log("a", "b", '==')
+            Comparable.log("c", "d", '%', cname='Item', aname='name')
+            Comparable.log("c", "d", '%', cname='Item', aname='name',
+                           result=0.5)
+            Comparable.log("a", "b", '==', result=False)
+        self.assertListEqual(["'a' == 'b' : ...",
+                              "| Item.name: 'c' % 'd' : ...",
+                              "| Item.name: 'c' % 'd' : 0.5",
+                              "'a' == 'b' : False"],
+                             [record.getMessage() for record in logs.records])
+
     def test_similarity_false(self):
         """Verify two simple comparables can be compared for non-similarity."""
         sim = Similarity(0.90, threshold=0.95)
@@ -233,6 +297,15 @@ class TestSimpleComparable(TestCase):  # pylint: disable=R0904
             self.assertFalse(similarity)
             self.obj1.similarity.assert_called_once_with(self.obj2)
 
+    def test_compare(self):
+        """Verify simple comparables are compared for both by default."""
+        sim = Similarity(0.90, threshold=0.85)
+        with patch.object(self.Simple, 'equality', Mock(return_value=False)):
+            with patch.object(self.Simple, 'similarity',
+                              Mock(return_value=sim)):
+                comparison = compare(self.obj1, self.obj2)
+        self.assertEqual(Comparison(False, sim), comparison)
+
     def test_similarity_constructor(self):
         """Verify a default Similarity is created correctly."""
         self.assertEqual(Similarity(0.0, 1.0), self.obj1.Similarity())
@@ -330,6 +403,13 @@ class TestCompoundComparable(TestCase):  # pylint: disable=R0904
         equality = (self.obj1 == self.obj2)
         self.assertFalse(equality)
 
+    def test_equality_missing_attribute_unlogged(self):
+        """Verify a missing attribute is handled without logging imported."""
+        self.obj1.item1.equality.return_value = True
+        del self.obj2.item1
+        with patch('comparable.base._logging', Mock(return_value=None)):
+            self.assertFalse(self.obj1 == self.obj2)
+
     def test_similarity_missing_attribute(self):
         """Verify a missing attribute hurts similarity."""
         self.obj1.item1.similarity.return_value = Similarity(1.0)
@@ -350,6 +430,99 @@ class TestCompoundComparable(TestCase):  # pylint: disable=R0904
         self.assertFalse(similarity)
         self.assertEqual(0.25, similarity)
 
+    def test_compare(self):
+        """Verify compound comparables are compared in one pass."""
+        for item in (self.obj1.item1, self.obj1.item2):
+            item.compare = Mock(return_value=Comparison(True,
+                                                        Similarity(1.0)))
+        comparison = self.obj1.compare(self.obj2)
+        self.assertEqual((True, 1.0), comparison)
+        self.obj1.item1.compare.assert_called_once_with(self.obj2.item1)
+        self.obj1.item2.compare.assert_called_once_with(self.obj2.item2)
+        self.assertFalse(self.obj1.item1.equality.called)
+        self.assertFalse(self.obj1.item1.similarity.called)
+
+    def test_compare_unequal(self):
+        """Verify equality is not compared after an unequal attribute."""
+        self.obj1.item1.compare = Mock(
+            return_value=Comparison(False, Similarity(0.0)))
+        self.obj1.item2.similarity.return_value = Similarity(1.0)
+        comparison = self.obj1.compare(self.obj2)
+        self.assertEqual((False, 0.75), comparison)
+        self.assertFalse(self.obj1.item2.equality.called)
+
+    def test_compare_missing_attribute(self):
+        """Verify a missing attribute makes the comparison unequal."""
+        self.obj1.item1.compare = Mock(
+            return_value=Comparison(True, Similarity(1.0)))
+        del self.obj2.item2
+        comparison = self.obj1.compare(self.obj2)
+        self.assertEqual((False, 0.25), comparison)
+
+    def test_compare_none_attributes(self):
+        """Verify two empty attributes are equal and ignored."""
+        self.obj1.item1.compare = Mock(
+            return_value=Comparison(True, Similarity(0.5)))
+        self.obj1.item2 = None
+        self.obj2.item2 = None
+        comparison = self.obj1.compare(self.obj2)
+        self.assertEqual((True, 0.5), comparison)
+
+    def test_compare_overridden(self):
+        """Verify overridden comparisons are not combined."""
+
+        class Custom(self.Compound):  # pylint: disable=W0223
+
+            """Compound comparable with custom similarity."""
+
+            def similarity(self, other):
+                return self.Similarity(0.42)
+
+        obj1, obj2 = Custom(), Custom()
+        obj1.item1.equality = Mock(return_value=True)
+        obj1.item2.equality = Mock(return_value=True)
+        self.assertEqual((True, 0.42), obj1.compare(obj2))
+
+    def test_key(self):
+        """Verify a compound key is based on attribute keys."""
+        with patch.object(self.Compound.Simple, 'key', Mock(return_value=1)):
+            self.assertEqual((1, 1), self.obj1.key())
+            self.obj1.item2 = None
+            self.assertEqual((1, None), self.obj1.key())
+            del self.obj1.item2
+            self.assertIsNone(self.obj1.key())
+
+    def test_key_unavailable(self):
+        """Verify a compound key is None if an attribute key is None."""
+        self.assertIsNone(self.obj1.key())
+        with patch.object(self.Compound.Simple, 'key', Mock(return_value=1)):
+            self.obj1.item1 = []
+            self.assertIsNone(self.obj1.key())
+
+    def test_bound(self):
+        """Verify a compound bound is weighted by attribute."""
+        self.obj2.item2 = None
+        with patch.object(self.Compound.Simple, 'bound',
+                          Mock(return_value=Similarity(0.5))):
+            bound = self.obj1.bound(self.obj2)
+        self.assertEqual(0.125, bound)
+
+    def test_bound_none_attributes(self):
+        """Verify two empty attributes are not included in the bound."""
+        self.obj1.item2 = None
+        self.obj2.item2 = None
+        with patch.object(self.Compound.Simple, 'bound',
+                          Mock(return_value=Similarity(0.5))):
+            bound = self.obj1.bound(self.obj2)
+        self.assertEqual(0.5, bound)
+
+    def test_bound_all_none_attributes(self):
+        """Verify the bound is 0 when all attributes are empty."""
+        for obj in (self.obj1, self.obj2):
+            obj.item1 = None
+            obj.item2 = None
+        self.assertEqual(0.0, self.obj1.bound(self.obj2))
+
     def test_similarity_none_attributes(self):
         """Verify two empty attributes are not included in similarity."""
         self.obj1.item1.similarity.return_value = Similarity(1.0)
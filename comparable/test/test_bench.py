@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.test.bench module."""
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import unittest
+
+from comparable.test import bench
+
+from comparable.test import TestCase, settings
+
+
+class TestBench(TestCase):  # pylint: disable=R0904
+
+    """Unit tests for the benchmark runner."""
+
+    def test_run_all(self):
+        """Verify benchmarks can be run and filtered by name."""
+        results = bench.run_all(['compare-number'], max_size=100,
+                                log=lambda msg: None)
+        self.assertEqual(1, len(results))
+        self.assertEqual('compare-number', results[0]['name'])
+        self.assertLess(0, results[0]['throughput'])
+        self.assertLess(0, results[0]['peak_memory'])
+
+    def test_run_all_budget(self):
+        """Verify larger sizes are skipped once the budget is exceeded."""
+        results = bench.run_all(['compare-group'], budget=0,
+                                log=lambda msg: None)
+        self.assertEqual(1, len(results))
+
+    def test_compare(self):
+        """Verify regressions are reported past the tolerance."""
+        baseline = [dict(name='a', size=1, throughput=100, peak_memory=100)]
+        results = [dict(name='a', size=1, throughput=80, peak_memory=130)]
+        self.assertEqual(1, len(bench.compare(results, baseline, 0.25)))
+        self.assertEqual(2, len(bench.compare(results, baseline, 0.1)))
+        self.assertEqual(0, len(bench.compare(results, [], 0.1)))
+
+    def test_main(self):
+        """Verify results can be saved and compared from the command line."""
+        temp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp, 'bench.json')
+            args = ['compare-number', '--max-size', '100', '--save', path]
+            self.assertEqual(0, bench.main(args))
+            with open(path) as infile:
+                data = json.load(infile)
+            data['results'][0]['throughput'] *= 1000
+            with open(path, 'w') as outfile:
+                json.dump(data, outfile)
+            args = ['compare-number', '--max-size', '100', '--baseline', path]
+            self.assertEqual(1, bench.main(args))
+        finally:
+            shutil.rmtree(temp)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main(verbosity=0)
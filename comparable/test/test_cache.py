@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.cache module."""
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+
+from comparable.simple import Number, Text
+from comparable.compound import Group
+from comparable.cache import ScoreCache, fingerprint, version
+from comparable import tools
+
+from comparable.test import TestCase, settings
+
+
+class Unkeyed(Number):  # pylint: disable=W0223
+
+    """Number without an equality key."""
+
+    def __init__(self):
+        super().__init__(0)
+
+    def key(self):
+        return None
+
+
+class TestModule(TestCase):  # pylint: disable=R0904
+
+    """Unit tests for the module functions."""
+
+    def test_fingerprint(self):
+        """Verify fingerprints depend on the type and content."""
+        self.assertEqual(fingerprint(Number(42)), fingerprint(Number(42.0)))
+        self.assertNotEqual(fingerprint(Text("42")), fingerprint(Number(42)))
+        self.assertNotEqual(fingerprint(Text("a")), fingerprint(Text("b")))
+
+    def test_fingerprint_none(self):
+        """Verify objects without a key have no fingerprint."""
+        self.assertIsNone(fingerprint(Unkeyed()))
+
+    def test_fingerprint_unstable(self):
+        """Verify objects with keys that may not be stable are uncacheable."""
+        with patch.object(Number, 'key', return_value=object()):
+            self.assertIsNone(fingerprint(Number(1)))
+        with patch.object(Number, 'key', return_value={'a': [object()]}):
+            self.assertIsNone(fingerprint(Number(1)))
+
+    def test_fingerprint_unordered(self):
+        """Verify fingerprints of unordered keys are stable across runs."""
+        code = '\n'.join([
+            "from comparable.simple import Text",
+            "from comparable.cache import fingerprint",
+            "class Tags(Text):",
+            "    def key(self):",
+            "        return frozenset(self.value.split())",
+            "print(fingerprint(Tags('a b c d e f g h')))",
+        ])
+        fingerprints = set()
+        for seed in ('1', '2', '3'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            output = subprocess.check_output([sys.executable, '-c', code],
+                                             env=env)
+            fingerprints.add(output.strip())
+        self.assertEqual(1, len(fingerprints))
+        self.assertNotIn(b'None', fingerprints)
+
+    def test_fingerprint_mappings(self):
+        """Verify fingerprints of mapping keys do not depend on order."""
+        with patch.object(Number, 'key', return_value={'a': 1, 'b': {2, 3}}):
+            expected = fingerprint(Number(1))
+        with patch.object(Number, 'key', return_value={'b': {3, 2}, 'a': 1}):
+            self.assertEqual(expected, fingerprint(Number(1)))
+
+    def test_version(self):
+        """Verify versions depend on the class and threshold."""
+
+        class Strict(Text):  # pylint: disable=W0223
+
+            """Text with a higher threshold."""
+
+            threshold = 0.99
+
+        text = Text("abc")
+        self.assertEqual(version(text), version(Text("def")))
+        self.assertNotEqual(version(text), version(Strict("abc")))
+        text.threshold = 0.99
+        self.assertNotEqual(version(Text("abc")), version(text))
+
+    def test_version_settings(self):
+        """Verify versions depend on class attributes."""
+        expected = version(Text("abc"))
+        with patch.object(Text, 'long_length', 100):
+            self.assertNotEqual(expected, version(Text("abc")))
+        self.assertEqual(expected, version(Text("abc")))
+
+    def test_version_helpers(self):
+        """Verify versions depend on the code of every method."""
+        expected = version(Text("abc"))
+        with patch.object(Text, '_estimate', lambda self, other: 0.0):
+            self.assertNotEqual(expected, version(Text("abc")))
+
+    def test_version_attributes(self):
+        """Verify versions depend on the classes of attribute values."""
+        group = Group([Text("abc"), Number(1)])
+        same = Group([Text("def"), Number(2)])
+        swapped = Group([Number(1), Text("abc")])
+        self.assertEqual(version(group), version(same))
+        self.assertNotEqual(version(group), version(swapped))
+        strict = Text("abc")
+        strict.threshold = 0.99
+        nested = Group([Group([strict]), Number(1)])
+        self.assertNotEqual(version(Group([Group([Text("abc")]), Number(1)])),
+                            version(nested))
+
+
+class TestScoreCache(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the ScoreCache class."""
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp, 'scores.db')
+        self.cache = ScoreCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp)
+
+    def test_similarity(self):
+        """Verify similarity results are cached."""
+        a, b = Text("Hello, world!"), Text("hello world")
+        expected = a % b
+        with patch.object(Text, 'similarity', wraps=a.similarity) as mock:
+            self.assertEqual(expected, self.cache.similarity(a, b))
+            self.assertEqual(expected, self.cache.similarity(a, b))
+        self.assertEqual(1, mock.call_count)
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+
+    def test_equality(self):
+        """Verify equality results are cached."""
+        a, b = Number(1), Number(1.0)
+        self.assertTrue(self.cache.equality(a, b))
+        self.assertTrue(self.cache.equality(a, b))
+        self.assertFalse(self.cache.equality(a, Number(2)))
+        self.assertEqual(1, self.cache.hits)
+
+    def test_persistent(self):
+        """Verify cached results are available after reopening."""
+        a, b = Text("abc"), Text("abd")
+        self.cache.similarity(a, b)
+        self.cache.close()
+        self.cache = ScoreCache(self.path)
+        self.assertEqual(a % b, self.cache.similarity(a, b))
+        self.assertEqual(1, self.cache.hits)
+
+    def test_invalidation(self):
+        """Verify cached results are not used after the threshold changes."""
+        a, b = Text("abc"), Text("abd")
+        self.cache.similarity(a, b)
+        a.threshold = 0.5
+        self.assertTrue(self.cache.similarity(a, b))
+        self.assertEqual(0, self.cache.hits)
+
+    def test_invalidation_attributes(self):
+        """Verify cached results are not used after an item changes."""
+        a, b = Group([Text("abc")]), Group([Text("abd")])
+        self.cache.similarity(a, b)
+        a.items[0].threshold = 0.5
+        self.cache.similarity(a, b)
+        self.assertEqual(0, self.cache.hits)
+
+    def test_eviction(self):
+        """Verify the least recently used results are evicted."""
+        self.cache.limit = 2
+        a = Number(1)
+        for value in (1, 2, 1, 3):
+            self.cache.similarity(a, Number(value))
+        self.cache.flush()
+        self.assertEqual(2, len(self.cache))
+        self.cache.hits = 0
+        self.cache.similarity(a, Number(1))
+        self.cache.similarity(a, Number(2))
+        self.assertEqual(1, self.cache.hits)
+
+    def test_uncacheable(self):
+        """Verify objects without a fingerprint are always compared."""
+        a, b = Group([Unkeyed()]), Group([Unkeyed()])
+        self.assertTrue(self.cache.equality(a, b))
+        self.assertTrue(self.cache.equality(a, b))
+        self.assertEqual(0, len(self.cache))
+
+    def test_batches(self):
+        """Verify changes are written once a batch is full."""
+        self.cache.BATCH = 2
+        a = Number(1)
+        self.cache.similarity(a, Number(1))
+        self.assertEqual(1, len(self.cache._pending))  # pylint: disable=W0212
+        self.cache.similarity(a, Number(2))
+        self.assertEqual(0, len(self.cache._pending))  # pylint: disable=W0212
+
+    def test_other_types(self):
+        """Verify comparisons with other types are not cached."""
+        self.assertFalse(self.cache.equality(Number(1), 2))
+        self.assertEqual(0, len(self.cache))
+
+    def test_context(self):
+        """Verify the cache is closed after a 'with' block."""
+        with ScoreCache(self.path) as cache:
+            cache.equality(Number(1), Number(2))
+        self.assertEqual(1, len(self.cache))
+
+    def test_clear(self):
+        """Verify the cache can be cleared."""
+        self.cache.equality(Number(1), Number(2))
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+
+    def test_bind(self):
+        """Verify a cached base can be used with the tools."""
+        items = [Number(42), Number(42.001), Number(43)]
+        base = self.cache.bind(Number(42))
+        self.assertListEqual([Number(42), Number(42.001)],
+                             list(tools.find_similar(base, items)))
+        self.assertEqual(Number(42), tools.match_equal(base, items))
+        self.assertListEqual(tools.sort(Number(42), items),
+                             tools.sort(base, items))
+        self.assertLess(0, self.cache.hits)
+        self.assertIn("Cached(Number(42)", repr(base))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main(verbosity=0)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.cli module."""
+
+import io
+import os
+import json
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch
+from contextlib import redirect_stderr, redirect_stdout
+
+from comparable.simple import Number, TextTitle
+from comparable.cli import Schema, Record, read_rows, main
+from comparable import cli
+
+from comparable.test import TestCase, settings
+
+ROWS = [{'name': "John Smith", 'age': "42"},
+        {'name': "Jon Smith", 'age': "42"},
+        {'name': "Jane Doe", 'age': "30"},
+        {'name': "John Smith", 'age': "42"},
+        {'name': "J. Doe", 'age': "30"},
+        {'name': "Bob", 'age': ""}]
+
+
+class TestSchema(TestCase):  # pylint: disable=R0904
+
+    """Unit tests for the Schema class."""
+
+    def test_parse(self):
+        """Verify columns are mapped to types and weights."""
+        schema = Schema.parse(["name:TextTitle:2", "age:Number", "city"])
+        self.assertListEqual([2.0, 1.0, 1.0], list(schema.weights.values()))
+        self.assertEqual("<Schema of name, age, city>", repr(schema))
+
+    def test_parse_invalid(self):
+        """Verify invalid columns are rejected."""
+        for specs in ([], ["name:Unknown"], ["name:Text:x"], [":Text"],
+                      ["name:Text:1:2"], ["threshold:Number"],
+                      ["schema"], ["attributes"], ["items:Group"]):
+            self.assertRaises(ValueError, Schema.parse, specs)
+
+    def test_record(self):
+        """Verify rows are converted to records."""
+        schema = Schema.parse(["name:TextTitle", "age:Number"],
+                              threshold=0.8)
+        record = schema.record(ROWS[0])
+        self.assertIsInstance(record, Record)
+        self.assertEqual(TextTitle("John Smith"), record.name)
+        self.assertEqual(Number(42), record.age)
+        self.assertEqual(0.8, record.threshold)
+        self.assertIsNone(schema.record(ROWS[5]).age)
+        self.assertEqual("Record(name=TextTitle('John Smith'), "
+                         "age=Number(42.0))", repr(record))
+
+    def test_record_invalid(self):
+        """Verify values that cannot be converted are reported."""
+        schema = Schema.parse(["name", "age:Number"])
+        row = {'name': "Bob", 'age': "old"}
+        for function in (schema.record, schema.check):
+            with self.assertRaisesRegex(ValueError, "Number in column 'age'"):
+                function(row)
+
+    def test_record_comparison(self):
+        """Verify records are compared by their columns."""
+        schema = Schema.parse(["name:TextTitle", "age:Number"])
+        self.assertComparison(schema.record(ROWS[0]), schema.record(ROWS[3]),
+                              True, True, 1.0)
+
+
+class TestMain(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the command-line interface."""
+
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.temp.name, 'people.csv')
+        with open(self.csv, 'w') as stream:
+            stream.write("name,age\n")
+            for row in ROWS:
+                stream.write("{name},{age}\n".format(**row))
+        self.jsonl = os.path.join(self.temp.name, 'people.jsonl')
+        with open(self.jsonl, 'w') as stream:
+            for row in ROWS:
+                stream.write(json.dumps(row) + '\n')
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def run_job(self, *args):
+        """Run the command line and get the results and report."""
+        output = os.path.join(self.temp.name, 'output.jsonl')
+        report = io.StringIO()
+        with redirect_stderr(report):
+            self.assertEqual(0, main(list(args) + ['--output', output]))
+        with open(output) as stream:
+            return [json.loads(line) for line in stream], report.getvalue()
+
+    def test_read_rows(self):
+        """Verify CSV and JSONL files have the same rows."""
+        self.assertListEqual(list(read_rows(self.csv)),
+                             list(read_rows(self.jsonl)))
+
+    def test_match(self):
+        """Verify rows are matched to reference rows."""
+        results, report = self.run_job('match', self.csv, '-r', self.jsonl,
+                                       '-c', 'name:TextTitle:2', '-c',
+                                       'age:Number', '-p', '2', '--chunk', '2')
+        self.assertListEqual([0, 1, 2, 0, 4, 5],
+                             [result['match'] for result in results])
+        self.assertIn("6 rows in", report)
+        self.assertIn("rows/s", report)
+
+    def test_match_serial(self):
+        """Verify rows are matched in this process."""
+        results, _ = self.run_job('match', self.csv, '-r', self.jsonl,
+                                  '-c', 'name:TextTitle:2', '-c',
+                                  'age:Number', '-p', '1', '-q')
+        self.assertListEqual([0, 1, 2, 0, 4, 5],
+                             [result['match'] for result in results])
+
+    def test_stdin(self):
+        """Verify rows can be read from stdin and written to stdout."""
+        with open(self.jsonl) as stream:
+            stdin = io.StringIO(stream.read() + '\n')
+        stdout = io.StringIO()
+        with patch.object(cli.sys, 'stdin', stdin), redirect_stdout(stdout), \
+                redirect_stderr(io.StringIO()):
+            self.assertEqual(0, main(['dedupe', '-', '-f', 'jsonl', '-c',
+                                      'name', '-p', '1', '-q']))
+        self.assertEqual(len(ROWS), len(stdout.getvalue().splitlines()))
+        self.assertFalse(stdin.closed)
+
+    def test_progress(self):
+        """Verify progress is reported at intervals."""
+        stream = io.StringIO()
+        progress = cli._Progress(stream)  # pylint: disable=W0212
+        progress.INTERVAL = 0.0
+        progress.update(5)
+        self.assertIn("5 rows compared", stream.getvalue())
+        with patch.object(cli, 'peak_memory', return_value=None):
+            progress.finish()
+        self.assertNotIn("peak memory", stream.getvalue())
+
+    def test_dedupe(self):
+        """Verify rows are compared to earlier rows."""
+        results, _ = self.run_job('dedupe', self.csv, '-c', 'name:TextTitle',
+                                  '-c', 'age:Number', '-t', '0.8', '-q')
+        self.assertListEqual(['new', 'near-duplicate', 'new', 'duplicate',
+                              'near-duplicate', 'new'],
+                             [result['status'] for result in results])
+        self.assertListEqual([None, 0, None, 0, 2, None],
+                             [result['prior'] for result in results])
+
+    def test_cluster(self):
+        """Verify rows are labeled by their group."""
+        results, _ = self.run_job('cluster', self.jsonl, '-c', 'name',
+                                  '-c', 'age:Number', '-t', '0.7', '-p', '2',
+                                  '--chunk', '1')
+        self.assertListEqual([0, 0, 2, 0, 2, 5],
+                             [result['cluster'] for result in results])
+
+    def test_csv_output(self):
+        """Verify results can be written as CSV."""
+        output = os.path.join(self.temp.name, 'output.csv')
+        with redirect_stderr(io.StringIO()):
+            main(['cluster', self.csv, '-c', 'name', '-o', output, '-q'])
+        with open(output) as stream:
+            self.assertEqual("position,cluster", stream.readline().strip())
+
+    def test_invalid(self):
+        """Verify invalid arguments are rejected."""
+        with redirect_stderr(io.StringIO()):
+            self.assertRaises(SystemExit, main, ['match', self.csv,
+                                                 '-c', 'name'])
+            self.assertRaises(SystemExit, main, ['dedupe', self.csv])
+            self.assertRaises(SystemExit, main, ['dedupe', 'unknown.csv',
+                                                 '-c', 'name'])
+            self.assertRaises(SystemExit, main, ['dedupe', self.csv,
+                                                 '-c', 'name:Unknown'])
+
+    def test_invalid_row(self):
+        """Verify rows that cannot be converted are reported."""
+        with open(self.csv, 'a') as stream:
+            stream.write("Bob,old\n")
+        report = io.StringIO()
+        with redirect_stderr(report):
+            for job in ('match', 'dedupe', 'cluster'):
+                self.assertRaises(SystemExit, main, [
+                    job, self.csv, '-r', self.csv, '-c', 'name',
+                    '-c', 'age:Number', '-p', '2', '-q',
+                    '-o', os.path.join(self.temp.name, 'output.jsonl')])
+        self.assertIn("people.csv row 6: invalid Number in column 'age': "
+                      "'old'", report.getvalue())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main()
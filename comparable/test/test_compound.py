@@ -2,11 +2,15 @@
 
 """Tests for the comparable.compound module."""
 
+import time
 import logging
 import unittest
+from unittest.mock import patch
 
-from comparable.simple import Text
+from comparable.base import Deadline
+from comparable.simple import Number, Text
 from comparable.compound import Group
+from comparable import compound
 
 from comparable.test import TestCase, settings
 
@@ -20,6 +24,72 @@ class TestGroup(TestCase):  # pylint: disable=R0904
         self.assertRaises(AttributeError, getattr, Group([]), 'fake')
         self.assertRaises(AttributeError, getattr, Group([]), 'itemA')
         self.assertRaises(AttributeError, getattr, Group([]), 'item1')
+        self.assertRaises(AttributeError, getattr, Group([Text("a")]),
+                          'item0')
+
+    def test_items(self):
+        """Verify items can be accessed as attributes."""
+        group = Group([Text("abc"), Text("123")])
+        self.assertIs(group.items[1], group.item2)
+        self.assertDictEqual({'item1': 1, 'item2': 1}, group.attributes)
+        self.assertNotIn('attributes', vars(group))
+
+    def test_subclass(self):
+        """Verify a group can be subclassed."""
+        class Loose(Group):  # pylint: disable=W0223,C0111
+            threshold = 0.5
+
+        a = Loose([Text("abc"), Text("123")])
+        b = Loose([Text("123"), Text("abd")])
+        self.assertComparison(a, b, False, True, 0.83)
+        self.assertEqual("Loose([Text('abc'), Text('123')])", repr(a))
+
+    def test_subclass_attributes(self):
+        """Verify a group that overrides its attributes uses them."""
+        class Headed(Group):  # pylint: disable=W0223,C0111
+            attributes = {'item1': 3, 'item2': 1}
+            threshold = 0.7
+
+        a = Headed([Text("abc"), Text("123")])
+        b = Headed([Text("abc"), Text("456")])
+        c = Headed([Text("abc"), Text("123"), Text("ignored")])
+        self.assertComparison(a, b, False, True, 0.75)
+        self.assertComparison(a, c, True, True, 1.00)
+
+    def test_assigned_attributes(self):
+        """Verify a group that assigns its attributes uses them."""
+        class Headed(Group):  # pylint: disable=W0223,C0111
+            threshold = 0.7
+
+            def __init__(self, items):
+                super().__init__(items)
+                self.attributes = {'item1': 3, 'item2': 1}
+
+        a = Headed([Text("abc"), Text("123")])
+        b = Headed([Text("abc"), Text("456")])
+        c = Headed([Text("abc"), Text("123"), Text("ignored")])
+        self.assertDictEqual({'item1': 3, 'item2': 1}, a.attributes)
+        self.assertComparison(a, b, False, True, 0.75)
+        self.assertComparison(a, c, True, True, 1.00)
+
+    def test_key(self):
+        """Verify equal groups have equal keys."""
+        a = Group([Text("abc"), 1])
+        self.assertEqual(('abc', 1), a.key())
+        self.assertEqual(a.key(), Group([Text("abc"), 1.0]).key())
+        self.assertIsNone(Group([Text("abc"), [1]]).key())
+        self.assertIsNone(Group([Text("abc"), Near(1)]).key())
+
+    def test_key_attributes(self):
+        """Verify groups that override attributes use their keys."""
+        class Headed(Group):  # pylint: disable=W0223,C0111
+            attributes = {'item1': 1}
+
+        a = Headed([Text("abc"), Text("123")])
+        b = Headed([Text("abc"), Text("456")])
+        self.assertTrue(a == b)
+        self.assertEqual(('abc',), a.key())
+        self.assertEqual(a.key(), b.key())
 
     def test_identical(self):
         """Verify two identical groups can be compared."""
@@ -57,6 +127,175 @@ class TestGroup(TestCase):  # pylint: disable=R0904
         b = Group([])
         self.assertComparison(a, b, True, True, 1.0)
 
+    def test_exact(self):
+        """Verify the best pairing of items is found without a deadline."""
+        a = Group([Text("abc"), Text("xyz"), Text("123"), Text("abd")])
+        b = Group([Text("abd"), Text("12"), Text("xy"), Text("abc")])
+        sim = a % b
+        self.assertEqual(0.9, sim)
+        self.assertTrue(sim.exact)
+
+    def test_deadline(self):
+        """Verify an exact result is found before a distant deadline."""
+        a = Group([Text("abc"), Text("xyz"), Text("123"), Text("abd")])
+        b = Group([Text("abd"), Text("12"), Text("xy"), Text("abc")])
+        deadline = Deadline(60)
+        sim = a.similarity(b, deadline=deadline)
+        self.assertEqual(0.9, sim)
+        self.assertTrue(sim.exact)
+        self.assertTrue(deadline.exact)
+
+    def test_deadline_expired(self):
+        """Verify items are paired in order when the deadline expires."""
+        a = Group([Text("abc"), Text("xyz"), Text("123")])
+        b = Group([Text("xyz"), Text("123"), Text("abc")])
+        deadline = Deadline(0)
+        sim = a.similarity(b, deadline=deadline)
+        self.assertEqual(0.0, sim)
+        self.assertFalse(sim.exact)
+        self.assertFalse(deadline.exact)
+
+    def test_deadline_large(self):
+        """Verify large groups return an approximate result in time."""
+        texts = ["{:03}".format(number) for number in range(200)]
+        a = Group([Text(text) for text in texts])
+        b = Group([Text(text) for text in reversed(texts)])
+        start = time.monotonic()
+        sim = a.similarity(b, deadline=0.1)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertFalse(sim.exact)
+        self.assertLessEqual(float(sim), 1.0)
+
+    def test_deadline_pairing(self):
+        """Verify the pairing found so far is kept if no exact one is found."""
+        a = Group([Text("abc"), Text("xyz"), Text("123")])
+        b = Group([Text("xyz"), Text("123"), Text("abc")])
+        with patch.object(Group, '_exact', return_value=None):
+            sim = a.similarity(b, deadline=60)
+        self.assertEqual(1.0, sim)
+        self.assertFalse(sim.exact)
+
+    def test_deadline_steps(self):
+        """Verify each step of the pairing stops once the deadline expires."""
+        cells = [[(0.0, 1), (1.0, 1)], [(1.0, 1), (0.0, 1)]]
+        group = Group([])
+        self.assertIsNone(compound._assign(cells, Deadline(0)))  # pylint: disable=W0212
+        self.assertListEqual([1, 0], compound._assign(cells, Deadline(60)))  # pylint: disable=W0212
+        self.assertListEqual([0, 1], group._refine(cells, Deadline(0), [0, 1]))  # pylint: disable=W0212
+        self.assertListEqual([1, 0], group._refine(cells, Deadline(60), [0, 1]))  # pylint: disable=W0212
+        cells[0][0] = (0.0, 0)
+        self.assertIsNone(group._exact(cells, Deadline(0)))  # pylint: disable=W0212
+
+    def test_missing_items(self):
+        """Verify the best pairing is found when items are None."""
+        a = Group([None, Text("abc"), None])
+        b = Group([Text("abc"), None])
+        self.assertEqual(1.0, a % b)
+        self.assertEqual(1.0, a.similarity(b, deadline=60))
+
+    def test_bound(self):
+        """Verify a group is never rejected by its bound."""
+        a = Group([Text("abc"), Text("123")])
+        b = Group([Text("123"), Text("abc")])
+        self.assertEqual(1.0, a.bound(b))
+
+
+class Loud(Text):  # pylint: disable=R0904
+
+    """Text with an upper case key."""
+
+    def key(self):
+        return str(self).upper()
+
+
+class Near(Number):  # pylint: disable=R0904
+
+    """Number equal to numbers within 1 (without a key)."""
+
+    def equality(self, other):
+        return abs(self.value - other.value) <= 1
+
+    def key(self):
+        return None
+
+
+class TestUnorderedGroup(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for groups with ordered=False."""
+
+    def test_repr(self):
+        """Verify unordered groups are represented with their mode."""
+        self.assertEqual("Group([Text('a')], ordered=False)",
+                         repr(Group([Text("a")], ordered=False)))
+
+    def test_equal_any_order(self):
+        """Verify unordered groups are equal in any order."""
+        a = Group([Text("a"), Text("b"), Text("a"), None, 3], ordered=False)
+        b = Group([3, Text("a"), None, Text("b"), Text("a")], ordered=False)
+        self.assertTrue(a == b)
+        self.assertFalse(Group(a.items) == b)
+
+    def test_unhashable(self):
+        """Verify items without a hash are paired by equality."""
+        a = Group([[1], Text("a")], ordered=False)
+        self.assertTrue(a == Group([Text("a"), [1]], ordered=False))
+        self.assertFalse(a == Group([Text("a"), [2]], ordered=False))
+
+    def test_key(self):
+        """Verify unordered groups have no key.
+
+        Unordered groups with their items in any order are equal, but they
+        are also equal to ordered groups with their items in the same order,
+        which have different keys.
+
+        """
+        a = Group([Text("a"), Text("b")], ordered=False)
+        b = Group([Text("b"), Text("a")], ordered=False)
+        self.assertTrue(a == b)
+        self.assertTrue(a == Group(a.items))
+        self.assertTrue(b == Group(b.items))
+        self.assertNotEqual(Group(a.items).key(), Group(b.items).key())
+        self.assertIsNone(a.key())
+        self.assertIsNone(b.key())
+
+    def test_mode_symmetric(self):
+        """Verify groups are compared in order unless both are unordered."""
+        a = Group([Text("a"), Text("b")], ordered=False)
+        b = Group([Text("b"), Text("a")])
+        self.assertFalse(a == b)
+        self.assertFalse(b == a)
+
+    def test_types(self):
+        """Verify items of different types are paired by equality."""
+        a = Group([Text("a"), Text("b")], ordered=False)
+        b = Group([Loud("b"), Text("a")], ordered=False)
+        self.assertTrue(a == b)
+        self.assertTrue(b == a)
+        self.assertFalse(a == Group([Loud("c"), Text("a")], ordered=False))
+
+    def test_different_counts(self):
+        """Verify unordered groups compare the number of each item."""
+        a = Group([Text("a"), Text("b"), Text("a")], ordered=False)
+        b = Group([Text("a"), Text("b"), Text("b")], ordered=False)
+        self.assertFalse(a == b)
+
+    def test_linear(self):
+        """Verify only items with the same key are compared."""
+        items = [Text(str(number)) for number in range(100)]
+        a = Group(items, ordered=False)
+        b = Group(list(reversed(items)), ordered=False)
+        with patch.object(Text, 'equality', autospec=True,
+                          side_effect=lambda self, other:
+                          str(self) == str(other)) as mock:
+            self.assertTrue(a == b)
+        self.assertEqual(100, mock.call_count)
+
+    def test_keyless(self):
+        """Verify items without keys are paired by equality."""
+        a = Group([Near(1.5), Near(1)], ordered=False)
+        self.assertTrue(a == Group([Near(0.5), Near(2.5)], ordered=False))
+        self.assertFalse(a == Group([Near(0.5), Near(3)], ordered=False))
+
 
 if __name__ == '__main__':
     logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
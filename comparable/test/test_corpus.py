@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.corpus module."""
+
+import pickle
+import random
+import logging
+import unittest
+from unittest.mock import patch
+
+from comparable.simple import Number, Text, TextEnum, TextTitle
+from comparable.compound import Group
+from comparable.vector import TextVector, Vocabulary
+from comparable.corpus import PreparedCorpus
+from comparable import corpus as corpus_module
+from comparable import tools
+
+from comparable.test import TestCase, settings
+
+WORDS = "the cat and hat a clockwork orange hello world".split()
+
+
+def _texts(cls, count, seed):
+    """Generate a list of random texts."""
+    rand = random.Random(seed)
+    return [cls(' '.join(rand.choice(WORDS)
+                         for _ in range(rand.randint(1, 4))))
+            for _ in range(count)]
+
+
+class TestPreparedCorpus(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the PreparedCorpus class."""
+
+    def assertMatches(self, bases, items):  # pylint: disable=C0103
+        """Verify a corpus finds the same matches as tools.match_similar."""
+        corpus = PreparedCorpus(items)
+        for base in bases:
+            item, similarity = corpus.match(base)
+            self.assertIs(tools.match_similar(base, items), item)
+            if item is not None:
+                self.assertEqual(base % item, similarity)
+
+    def test_numbers(self):
+        """Verify prepared numbers find the same matches."""
+        items = [Number(value) for value in
+                 (4, 100.05, 0, 99.95, 1, 100, 99.9, 2, 99.95, 100.05)]
+        bases = [Number(value) for value in
+                 (0, 1, 2.5, 3, 50, 99.85, 99.9, 100, 100.1, 1000)]
+        self.assertMatches(bases, items)
+
+    def test_texts(self):
+        """Verify prepared texts find the same matches."""
+        items = _texts(Text, 200, seed=1)
+        self.assertMatches(_texts(Text, 50, seed=2) + items[:10], items)
+
+    def test_text_titles(self):
+        """Verify prepared titles find the same matches."""
+        items = _texts(TextTitle, 200, seed=1)
+        self.assertMatches(_texts(TextTitle, 50, seed=2) + items[:10], items)
+
+    def test_text_enums(self):
+        """Verify prepared enumerations find the same matches."""
+        items = _texts(TextEnum, 200, seed=1)
+        bases = [TextEnum(str(item).upper()) for item in items[:10]]
+        self.assertMatches(_texts(TextEnum, 50, seed=2) + bases, items)
+
+    def test_long_texts(self):
+        """Verify long texts are compared by their items."""
+        with patch.object(Text, 'long_length', 12):
+            items = _texts(Text, 100, seed=1)
+            self.assertTrue(any(item.long for item in items))
+            self.assertMatches(_texts(Text, 30, seed=2) + items[:10], items)
+        items = _texts(Text, 100, seed=1)
+        with patch.object(Text, 'long_length', 12):
+            bases = _texts(Text, 30, seed=2)
+            self.assertMatches(bases, items)
+
+    def test_long_bases(self):
+        """Verify long bases are compared to short texts by their sketches."""
+        items = _texts(Text, 100, seed=1)
+        bases = _texts(Text, 30, seed=2)
+        for base in bases:
+            base.long_length = 12
+        self.assertMatches(bases, items)
+        corpus = PreparedCorpus(items)
+        for base in bases[:5]:
+            scored = ((position, float(base % item))
+                      for position, item in enumerate(items))
+            expected = sorted((result for result in scored if result[1] > 0),
+                              key=lambda result: (-result[1], result[0]))
+            self.assertListEqual(expected[:3], corpus.top_positions(base, 3))
+
+    def test_top_none(self):
+        """Verify no positions are found when none are requested."""
+        for items in ([Number(1)], [Text("abc")], [TextEnum("abc")]):
+            corpus = PreparedCorpus(items)
+            self.assertListEqual([], corpus.top_positions(items[0], 0))
+
+    def test_top_other_type(self):
+        """Verify bases of another type are compared to every item."""
+        corpus = PreparedCorpus([TextEnum("abc"), TextEnum("abd"),
+                                 TextEnum("abcdefghijklmnop")])
+        self.assertListEqual([(0, 1.0), (1, 0.6666666666666666)],
+                             corpus.top_positions(Text("abc"), 2))
+
+    def test_text_vectors(self):
+        """Verify prepared token vectors find the same matches."""
+        items = _texts(TextVector, 200, seed=1)
+        self.assertMatches(_texts(TextVector, 50, seed=2) + items[:10], items)
+
+    def test_vocabularies(self):
+        """Verify vectors with different vocabularies are scanned."""
+        items = [TextVector("hello world", Vocabulary()),
+                 TextVector("hello there", Vocabulary())]
+        prepared = PreparedCorpus(items)._prepared  # pylint: disable=W0212
+        self.assertIs(corpus_module._Scan, type(prepared))  # pylint: disable=W0212
+
+    def test_mixed(self):
+        """Verify lists of mixed types are scanned."""
+        items = [Text("abc"), TextEnum("abd"), Text("xyz")]
+        self.assertMatches([Text("abd"), TextEnum("ABC")], items)
+
+    def test_other_type(self):
+        """Verify lists of other types are scanned."""
+        items = [Group([Number(1), Number(2)]), Group([Number(3)])]
+        self.assertMatches([Group([Number(2), Number(1)])], items)
+
+    def test_no_match(self):
+        """Verify (None, None) is returned without a match."""
+        corpus = PreparedCorpus([Text("abc")])
+        self.assertEqual((None, None), corpus.match(Text("xyz")))
+        self.assertEqual((None, None), PreparedCorpus([]).match(Text("abc")))
+
+    def test_repr(self):
+        """Verify the number of items is shown."""
+        self.assertEqual("<PreparedCorpus of 2 items>",
+                         repr(PreparedCorpus([Number(1), Number(2)])))
+
+    def test_pickle(self):
+        """Verify a corpus is prepared again when unpickled."""
+        corpus = PreparedCorpus(_texts(Text, 10, seed=1))
+        copy = pickle.loads(pickle.dumps(corpus))
+        self.assertEqual(len(corpus), len(copy))
+        self.assertEqual(corpus.match_position(corpus.items[3]),
+                         copy.match_position(copy.items[3]))
+
+
+class TestMatchMany(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for tools.match_many."""
+
+    items = _texts(Text, 100, seed=1)
+    bases = _texts(Text, 20, seed=2)
+
+    def test_serial(self):
+        """Verify the best match is found for each base."""
+        results = tools.match_many(self.bases, self.items, processes=1)
+        self.assertEqual(len(self.bases), len(results))
+        for base, (item, similarity) in zip(self.bases, results):
+            self.assertIs(tools.match_similar(base, self.items), item)
+            self.assertEqual(None if item is None else base % item,
+                             similarity)
+
+    def test_parallel(self):
+        """Verify worker processes find the same matches."""
+        corpus = PreparedCorpus(self.items)
+        expected = tools.match_many(self.bases, corpus, processes=1)
+        results = tools.match_many(self.bases, corpus, processes=2)
+        self.assertEqual([item for item, _ in expected],
+                         [item for item, _ in results])
+
+    def test_empty(self):
+        """Verify no bases produce no results."""
+        self.assertListEqual([], tools.match_many([], self.items))
+
+    def test_empty_items(self):
+        """Verify bases have no match in an empty list."""
+        self.assertListEqual([(None, None)],
+                             tools.match_many([Number(1)], []))
+        self.assertListEqual([(None, None)],
+                             tools.match_many([Number(1)], PreparedCorpus([])))
+
+    def test_worker(self):
+        """Verify worker processes match against their stored corpus."""
+        corpus = PreparedCorpus(self.items)
+        corpus_module._initialize(corpus)  # pylint: disable=W0212
+        try:
+            positions = corpus_module._match_positions(  # pylint: disable=W0212
+                self.bases)
+            self.assertListEqual(
+                [corpus.match_position(base) for base in self.bases],
+                positions)
+        finally:
+            corpus_module._initialize(None)  # pylint: disable=W0212
+
+
+class TestKnnGraph(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for tools.knn_graph."""
+
+    def assertNeighbors(self, items, k):  # pylint: disable=C0103
+        """Verify the graph has the same neighbors as comparing all pairs."""
+        graph = tools.knn_graph(items, k, processes=1)
+        self.assertEqual(len(items), len(graph))
+        for position, item in enumerate(items):
+            scored = [(other, float(item % items[other]))
+                      for other in range(len(items)) if other != position]
+            expected = sorted((result for result in scored if result[1] > 0),
+                              key=lambda result: (-result[1], result[0]))[:k]
+            neighbors = graph.neighbors(position)
+            self.assertListEqual([other for other, _ in expected],
+                                 [other for other, _ in neighbors])
+            for (_, score), (_, expected_score) in zip(neighbors, expected):
+                self.assertAlmostEqual(expected_score, score)
+
+    def test_numbers(self):
+        """Verify the nearest numbers are found on both sides."""
+        items = [Number(value) for value in
+                 (4, 100.05, 0, 99.95, 1, 100, 99.9, 2, 99.95, 100.05, 0)]
+        self.assertNeighbors(items, 3)
+
+    def test_texts(self):
+        """Verify the nearest texts are found."""
+        self.assertNeighbors(_texts(Text, 100, seed=1), 5)
+
+    def test_text_titles(self):
+        """Verify the nearest titles are found."""
+        self.assertNeighbors(_texts(TextTitle, 100, seed=1), 4)
+
+    def test_text_enums(self):
+        """Verify equal enumerations are neighbors."""
+        self.assertNeighbors(_texts(TextEnum, 60, seed=1), 3)
+
+    def test_text_vectors(self):
+        """Verify the nearest token vectors are found."""
+        self.assertNeighbors(_texts(TextVector, 100, seed=1), 5)
+
+    def test_other_type(self):
+        """Verify lists of other types are scanned."""
+        items = [Group(_texts(Text, 2, seed=seed)) for seed in range(30)]
+        self.assertNeighbors(items, 4)
+
+    def test_parallel(self):
+        """Verify worker processes find the same neighbors."""
+        items = _texts(Text, 50, seed=1)
+        expected = tools.knn_graph(items, 3, processes=1)
+        graph = tools.knn_graph(items, 3, processes=2)
+        self.assertListEqual(list(expected), list(graph))
+        self.assertEqual("<Graph of 50 items with 150 edges>", repr(graph))
+
+    def test_small(self):
+        """Verify items may have fewer than k neighbors."""
+        graph = tools.knn_graph([Text("abc"), Text("abd"), Text("xyz")], 5)
+        self.assertListEqual([[(1, 0.6666666666666666)],
+                              [(0, 0.6666666666666666)], []], list(graph))
+        self.assertEqual(0, len(tools.knn_graph([], 5)))
+        graph = tools.knn_graph([Number(1), Number(2), Number(3)], 5)
+        self.assertListEqual([(1, 0.5), (2, 0.3333333333333333)], graph[0])
+
+    def test_prepared(self):
+        """Verify a prepared corpus may be used."""
+        items = _texts(Text, 20, seed=1)
+        self.assertListEqual(list(tools.knn_graph(items, 3, processes=1)),
+                             list(tools.knn_graph(PreparedCorpus(items), 3,
+                                                  processes=1)))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main()
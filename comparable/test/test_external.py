@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.external module."""
+
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from comparable.simple import Number, Text
+from comparable import external
+from comparable import tools
+
+from comparable.test import TestCase
+
+WORDS = "the cat and hat a clockwork orange hello world".split()
+
+
+def _numbers(count, seed=0):
+    """Generate random numbers with repeated and similar values."""
+    rand = random.Random(seed)
+    return [Number(rand.randint(1, 100) * 1.0001 ** rand.randint(0, 1))
+            for _ in range(count)]
+
+
+def _texts(count, seed=0):
+    """Generate random title-like texts."""
+    rand = random.Random(seed)
+    return [Text(' '.join(rand.choice(WORDS)
+                          for _ in range(rand.randint(1, 3))))
+            for _ in range(count)]
+
+
+def _reprs(items):
+    """Get the representations of items (copies are not identical)."""
+    return [repr(item) for item in items]
+
+
+class TestExternal(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the external module."""
+
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.assertListEqual([], os.listdir(self.temp.name))
+        self.temp.cleanup()
+
+    def test_sort(self):
+        """Verify items are sorted like tools.sort within any budget."""
+        items = _numbers(500)
+        base = Number(50)
+        expected = _reprs(tools.sort(base, items))
+        for memory in (1, 2000, external.MEMORY):
+            self.assertListEqual(expected, _reprs(external.sort(
+                base, iter(items), memory=memory, directory=self.temp.name)))
+
+    def test_sort_merge_passes(self):
+        """Verify many chunks are merged in several passes."""
+        items = _texts(200)
+        base = Text("the cat")
+        with patch.object(external, 'FANIN', 3):
+            found = external.sort(base, iter(items), memory=500,
+                                  directory=self.temp.name)
+            self.assertListEqual(_reprs(tools.sort(base, items)),
+                                 _reprs(found))
+
+    def test_sort_closed(self):
+        """Verify temporary files are deleted if a sort is not finished."""
+        found = external.sort(Number(1), _numbers(100), memory=100,
+                              directory=self.temp.name)
+        next(found)
+        self.assertNotEqual([], os.listdir(self.temp.name))
+        found.close()
+
+    def test_sort_empty(self):
+        """Verify an empty iterable can be sorted."""
+        self.assertListEqual([], list(external.sort(
+            Number(1), iter([]), directory=self.temp.name)))
+
+    def test_top_k(self):
+        """Verify the top items match tools.top_k."""
+        items = _numbers(200)
+        base = Number(50)
+        self.assertListEqual(tools.top_k(base, items, 5),
+                             external.top_k(base, iter(items), 5))
+
+    def test_duplicates(self):
+        """Verify duplicates match tools.duplicates."""
+        items = _numbers(200)
+        base = Number(50)
+        self.assertListEqual(list(tools.duplicates(base, items)),
+                             list(external.duplicates(base, iter(items))))
+
+    def test_cluster(self):
+        """Verify groups match tools.cluster within any budget."""
+        for items in (_numbers(150), _texts(150)):
+            expected = [_reprs(group) for group in tools.cluster(items)]
+            for memory in (1, 1500, external.MEMORY):
+                found = external.cluster(iter(items), memory=memory,
+                                         directory=self.temp.name)
+                self.assertListEqual(expected,
+                                     [_reprs(group) for group in found])
+
+    def test_cluster_empty(self):
+        """Verify an empty iterable has no groups."""
+        self.assertListEqual([], list(external.cluster(
+            iter([]), directory=self.temp.name)))
+
+
+if __name__ == '__main__':
+    unittest.main()
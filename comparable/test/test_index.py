@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.index module."""
+
+import os
+import shutil
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from comparable.simple import Number, Text, TextEnum, TextTitle
+from comparable.compound import Group
+from comparable.index import Index
+from comparable import index as index_module
+from comparable import tools
+
+from comparable.test import TestCase, settings
+
+
+class TestIndex(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the Index class."""  # pylint: disable=C0103
+
+    def setUp(self):
+        self.temp = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp, 'test.idx')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp)
+
+    def assertIndexed(self, items, bases):  # pylint: disable=C0103
+        """Fail if an index does not match the results of L{tools}."""
+        Index(items).save(self.path)
+        with Index.open(self.path) as index:
+            for base in bases:
+                self.assertListEqual(list(tools.find_equal(base, items)),
+                                     list(index.find_equal(base)))
+                self.assertListEqual(list(tools.find_similar(base, items)),
+                                     list(index.find_similar(base)))
+                self.assertEqual(tools.match_similar(base, items),
+                                 index.match_similar(base))
+
+    def test_numbers(self):
+        """Verify numbers can be indexed."""
+        items = [Number(42), Number(0), Number(42.001), Number(43)]
+        self.assertIndexed(items, items + [Number(41), Number(42.01)])
+
+    def test_texts(self):
+        """Verify texts can be indexed."""
+        items = [Text("Hello, world!"), Text(""), Text("hello world"),
+                 Text("xyz"), Text("Hello, world!")]
+        self.assertIndexed(items, items + [Text("Hello")])
+
+    def test_text_enums(self):
+        """Verify textual enumerations can be indexed."""
+        items = [TextEnum("abc"), TextEnum("ABC"), TextEnum("abd")]
+        self.assertIndexed(items, items + [TextEnum("aBc")])
+
+    def test_text_titles(self):
+        """Verify textual titles can be indexed."""
+        items = [TextTitle("The Cat and the Hat"), TextTitle("cat & hat"),
+                 TextTitle("cat an' the hat"), TextTitle("A Clockwork Orange")]
+        self.assertIndexed(items, items + [TextTitle("the cat & the hat")])
+
+    def test_long_texts(self):
+        """Verify long texts are estimated like the items themselves."""
+        texts = ["the cat in the hat " * 5, "the cat in the hat " * 4,
+                 "the bat in the hat " * 5, "hello world", ""]
+        with patch.object(Text, 'long_length', 60):
+            items = [Text(text) for text in texts]
+            self.assertIndexed(items, items + [Text("the cat in a hat " * 5),
+                                               Text("xyz" * 30)])
+
+    def test_hash_collisions(self):
+        """Verify enumerations with the same hash are told apart."""
+        with patch.object(index_module, '_hash', return_value=1):
+            items = [TextEnum("abc"), TextEnum("abd")]
+            self.assertIndexed(items, items)
+
+    def test_unicode(self):
+        """Verify non-ASCII texts can be indexed."""
+        items = [Text("café"), Text("cafe"), Text("☃")]
+        self.assertIndexed(items, items)
+
+    def test_similar_threshold(self):
+        """Verify the similarity threshold can be overridden."""
+        index = Index([Number(1), Number(2), Number(4)])
+        self.assertListEqual([1, 2], [position for position, _ in
+                                      index.similar(Number(3), 0.6)])
+        self.assertListEqual([0, 1, 2], [position for position, _ in
+                                         index.similar(Number(3), 0.0)])
+
+    def test_getitem(self):
+        """Verify items can be recreated from an index."""
+        index = Index([TextTitle("The Cat"), TextTitle("The Hat")])
+        self.assertEqual(2, len(index))
+        self.assertEqual(TextTitle("The Hat"), index[1])
+        self.assertEqual("cat", index[0].stripped)
+        self.assertRaises(IndexError, index.__getitem__, 2)
+
+    def test_match_none(self):
+        """Verify None is returned when no item matches."""
+        index = Index([Number(1)])
+        self.assertIsNone(index.match_equal(Number(2)))
+        self.assertIsNone(index.match_similar(Number(2)))
+        self.assertEqual(Number(1), index.match_equal(Number(1)))
+
+    def test_empty(self):
+        """Verify an empty list can be indexed."""
+        index = Index([])
+        self.assertEqual(0, len(index))
+        self.assertListEqual([], index.equal(Text("abc")))
+
+    def test_repr(self):
+        """Verify an index can be represented."""
+        self.assertEqual("<Index of 1 Number items>", repr(Index([Number(1)])))
+
+    def test_mixed_types(self):
+        """Verify an index requires items of the same type."""
+        self.assertRaises(TypeError, Index, [Number(1), Text("1")])
+
+    def test_unsupported_type(self):
+        """Verify an index requires items of a supported type."""
+        self.assertRaises(TypeError, Index, [Group([])])
+
+    def test_invalid_file(self):
+        """Verify an invalid file cannot be opened."""
+        with open(self.path, 'wb') as outfile:
+            outfile.write(b'\0' * 1024)
+        self.assertRaises(ValueError, Index.open, self.path)
+
+    def test_byte_order(self):
+        """Verify an index from a different byte order cannot be opened."""
+        Index([Number(1)]).save(self.path)
+        other = 'big' if index_module.sys.byteorder == 'little' else 'little'
+        with patch.object(index_module.sys, 'byteorder', other):
+            self.assertRaises(ValueError, Index.open, self.path)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main(verbosity=0)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.metrics module."""
+
+import logging
+import unittest
+
+import comparable
+from comparable.simple import Number, Text
+from comparable.base import CompoundComparable, compare
+from comparable.compound import Group
+from comparable import metrics
+
+from comparable.test import TestCase, settings
+
+
+class Pair(CompoundComparable):  # pylint: disable=W0223
+
+    """Compound comparable compared by its attributes."""
+
+    attributes = {'name': 1, 'size': 1}
+
+    def __init__(self, name, size):
+        self.name = Text(name)
+        self.size = Number(size)
+
+    def __repr__(self):
+        return self._repr(str(self.name), self.size)
+
+
+class AdaptivePair(Pair):  # pylint: disable=W0223
+
+    """The same compound comparable with adaptive equality."""
+
+    adaptive = True
+
+
+class TestMetrics(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for comparison metrics."""
+
+    def setUp(self):
+        metrics.reset()
+        metrics.enable()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.reset()
+
+    def test_classes(self):
+        """Verify comparisons are counted per class."""
+        _ = Number(1) == Number(2)
+        _ = Number(1) % Number(2)
+        _ = Number(1) % Number(3)
+        stats = comparable.stats()
+        self.assertEqual(1, stats['classes']['Number']['==']['calls'])
+        self.assertEqual(2, stats['classes']['Number']['%']['calls'])
+        self.assertEqual(2, sum(stats['classes']['Number']['%']['histogram']))
+        self.assertLess(0, stats['classes']['Number']['%']['seconds'])
+
+    def test_attributes(self):
+        """Verify attribute comparisons are counted per attribute."""
+        a = Group([Text("abc"), Text("def")])
+        b = Group([Text("abc"), Text("deg")])
+        _ = a == b
+        _ = a % b
+        stats = metrics.stats()
+        self.assertEqual(1, stats['classes']['Group']['==']['calls'])
+        self.assertEqual(1, stats['attributes']['Group.item1']['==']['calls'])
+        self.assertEqual(1, stats['attributes']['Group.item2']['==']['calls'])
+        self.assertEqual(2, stats['attributes']['Group.item1']['%']['calls'])
+        self.assertEqual(4, stats['classes']['Text']['%']['calls'])
+
+    def test_compound(self):
+        """Verify comparisons of compound attributes are counted."""
+        for cls in (Pair, AdaptivePair):
+            metrics.reset()
+            a, b = cls("abc", 1), cls("abc", 2)
+            _ = a == b
+            _ = a % b
+            _ = compare(a, b)
+            stats = metrics.stats()
+            classes = stats['classes'][cls.__name__]
+            self.assertEqual(1, classes['==']['calls'])
+            self.assertEqual(1, classes['%']['calls'])
+            self.assertEqual(1, classes['<=>']['calls'])
+            name = stats['attributes'][cls.__name__ + '.name']
+            size = stats['attributes'][cls.__name__ + '.size']
+            self.assertEqual(1, name['==']['calls'])
+            self.assertEqual(1, size['%']['calls'])
+            self.assertEqual(2, size['<=>']['calls'] + name['<=>']['calls'])
+
+    def test_reset(self):
+        """Verify metrics can be reset after a snapshot."""
+        _ = Number(1) == Number(2)
+        self.assertTrue(metrics.stats(reset=True)['classes'])
+        self.assertFalse(metrics.stats()['classes'])
+
+    def test_disabled(self):
+        """Verify nothing is recorded while disabled."""
+        metrics.disable()
+        _ = Number(1) == Number(2)
+        self.assertFalse(metrics.stats()['classes'])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main(verbosity=0)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.planner module."""
+
+import random
+import logging
+import unittest
+
+from comparable.base import CompoundComparable
+from comparable.simple import Number, Text, TextEnum, TextTitle
+from comparable.compound import Group
+from comparable.planner import Planner, AttributeStats
+from comparable import tools
+
+from comparable.test import TestCase, settings
+
+WORDS = "the cat and hat a clockwork orange hello world of green eggs".split()
+
+
+class Record(CompoundComparable):  # pylint: disable=W0223
+
+    """Compound comparable with attributes of several types."""
+
+    attributes = {'title': 4, 'kind': 1, 'size': 1}
+    threshold = 0.9
+
+    def __init__(self, title, kind, size):
+        self.title = TextTitle(title) if title is not None else None
+        self.kind = TextEnum(kind)
+        self.size = Number(size) if size is not None else None
+
+    def __repr__(self):
+        return self._repr(str(self.title), str(self.kind), self.size)
+
+
+def _records(count, seed=0):
+    """Generate a list of random records (some with missing attributes)."""
+    rand = random.Random(seed)
+    records = []
+    for _ in range(count):
+        title = ' '.join(rand.choice(WORDS) for _ in range(rand.randint(2, 5)))
+        records.append(Record(title if rand.random() > 0.05 else None,
+                              rand.choice(['book', 'film', 'song', 'game']),
+                              rand.randint(1, 1000)
+                              if rand.random() > 0.05 else None))
+    return records
+
+
+class TestPlanner(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the Planner class."""
+
+    items = _records(500)
+    planner = Planner(items)
+
+    def test_stats(self):
+        """Verify statistics are collected for each attribute."""
+        stats = self.planner.stats
+        self.assertListEqual(['title', 'kind', 'size'], list(stats))
+        self.assertEqual(4, stats['kind'].cardinality)
+        self.assertEqual(500, stats['size'].count)
+        self.assertLess(0, stats['size'].nones)
+        self.assertLess(0.0, stats['title'].cost)
+        self.assertIn("'kind': 500 values, 4 distinct",
+                      repr(stats['kind']))
+
+    def test_stats_other_values(self):
+        """Verify values that cannot be indexed or counted are described."""
+        texts = [Text(("a", "b")), Text(("a",)), None]
+        stats = AttributeStats('title', 1, texts)
+        self.assertIsNone(stats.type)
+        self.assertFalse(stats.indexable)
+        stats = AttributeStats('tags', 1, [["a"], None])
+        self.assertEqual({None: 1}, stats.frequencies)
+
+    def test_same_results(self):
+        """Verify searches find the same items as the tools functions."""
+        rand = random.Random(1)
+        bases = _records(20, seed=1) + rand.sample(self.items, 20)
+        for base in bases:
+            self.assertListEqual(list(tools.find_similar(base, self.items)),
+                                 list(self.planner.find_similar(base)))
+            self.assertIs(tools.match_similar(base, self.items),
+                          self.planner.match_similar(base))
+
+    def test_plan_index(self):
+        """Verify a selective attribute drives the search."""
+        base = Record("the cat and the hat", "book", 42)
+        plan = self.planner.plan(base)
+        self.assertIsNotNone(plan.attribute)
+        weight = Record.attributes[plan.attribute]
+        self.assertAlmostEqual(1.0 - 0.1 * 6 / weight, plan.threshold)
+        self.assertGreater(len(self.items), plan.estimated_candidates)
+        self.assertIsNone(plan.actual_cost)
+        self.assertIn("estimated", str(plan))
+        self.assertNotIn("actual", str(plan))
+
+        list(self.planner.find_similar(base, plan))
+        self.assertLessEqual(plan.actual_candidates,
+                             plan.estimated_candidates)
+        self.assertIsNotNone(plan.actual_cost)
+        self.assertIn("actual", str(plan))
+
+    def test_best_match(self):
+        """Verify the most similar item is matched."""
+        items = [Record("the cat and the hat", "book", 42),
+                 Record("the cat and the hats", "book", 42)]
+        planner = Planner(items)
+        self.assertEqual("<Planner of 2 items>", repr(planner))
+        self.assertIs(items[0], planner.match_similar(items[0]))
+        plan = planner.plan(items[0])
+        self.assertEqual("<Plan {}>".format(plan), repr(plan))
+
+    def test_plan_scan(self):
+        """Verify a scan is chosen when no attribute can be selective."""
+        base = Record("the cat and the hat", "book", 42)
+        plan = self.planner.plan(base, threshold=0.1)
+        self.assertIsNone(plan.attribute)
+        self.assertIn("scan", str(plan))
+
+    def test_missing_attributes(self):
+        """Verify items missing the driving attribute are candidates."""
+        base = Record("the cat and the hat", "book", 42)
+        plan = self.planner.plan(base)
+        positions = set(self.planner.candidates(base, plan))
+        self.assertIsNotNone(plan.attribute)
+        for position, item in enumerate(self.items):
+            if getattr(item, plan.attribute) is None:
+                self.assertIn(position, positions)
+
+    def test_other_items(self):
+        """Verify items not compared by attributes are scanned."""
+        items = [Group([Number(1), Number(2)]), Group([Number(2)])]
+        planner = Planner(items)
+        self.assertEqual({}, planner.stats)
+        base = Group([Number(2), Number(1)])
+        self.assertIsNone(planner.plan(base).attribute)
+        self.assertIs(items[0], planner.match_similar(base))
+        self.assertIsNone(Planner([]).match_similar(base))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.query module."""
+
+import logging
+import unittest
+from unittest.mock import patch
+
+from comparable.simple import Number, Text
+from comparable.index import Index
+from comparable.query import Query
+from comparable import tools
+
+from comparable.test import TestCase, settings
+
+
+class TestQuery(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the Query class."""
+
+    items = [Number(42), Number(42.001), Number(43), Number(42.002)]
+
+    def test_equal(self):
+        """Verify a query can match tools.find_equal."""
+        base = Number(42)
+        self.assertListEqual(list(tools.find_equal(base, self.items)),
+                             tools.query(base, self.items).equal().all())
+
+    def test_similar(self):
+        """Verify a query can match tools.find_similar."""
+        base = Number(42)
+        self.assertListEqual(list(tools.find_similar(base, self.items)),
+                             list(tools.query(base, self.items).similar()))
+
+    def test_similar_threshold(self):
+        """Verify a query can use a custom threshold."""
+        base = Number(42)
+        query = tools.query(base, self.items).similar(0.97)
+        self.assertEqual(4, len(query.all()))
+
+    def test_duplicates(self):
+        """Verify a query can match tools.duplicates."""
+        base = Number(42)
+        query = tools.query(base, self.items).exclude_equal().similar()
+        self.assertListEqual(list(tools.duplicates(base, self.items)),
+                             query.all())
+
+    def test_sort(self):
+        """Verify a query can match tools.sort."""
+        base = Number(42.001)
+        self.assertListEqual(tools.sort(base, self.items),
+                             tools.query(base, self.items).sort().all())
+
+    def test_top(self):
+        """Verify a query can match tools.top_k."""
+        base = Number(42.001)
+        self.assertListEqual(tools.top_k(base, self.items, 2),
+                             tools.query(base, self.items).top(2).all())
+
+    def test_first(self):
+        """Verify a query can match tools.match_similar."""
+        base = Number(42.002)
+        query = tools.query(base, self.items).similar().top(1)
+        self.assertEqual(tools.match_similar(base, self.items), query.first())
+        self.assertIsNone(tools.query(Number(41), self.items).similar()
+                          .first())
+
+    def test_chain_is_immutable(self):
+        """Verify operations create new queries."""
+        query = tools.query(Number(42), self.items)
+        similar = query.similar()
+        self.assertEqual(4, len(query.all()))
+        self.assertEqual(3, len(similar.all()))
+        self.assertIn("Query of Number(42)", repr(similar))
+
+    def test_scored_once(self):
+        """Verify each item is compared at most once."""
+        base = Text("Hello, world!")
+        items = [Text("hello world"), Text("Hello, world!"), Text("Hello")]
+        with patch.object(Text, 'compare', wraps=base.compare) as compare:
+            with patch.object(Text, 'similarity',
+                              wraps=base.similarity) as similarity:
+                query = Query(base, items).exclude_equal().similar().top(5)
+                self.assertListEqual([Text("hello world")], query.all())
+        self.assertEqual(2, compare.call_count)  # "Hello" is bounded out
+        self.assertEqual(1, similarity.call_count)  # only unequal texts
+
+    def test_scored(self):
+        """Verify a query can provide the similarity of results."""
+        results = list(Query(Number(42), self.items).sort().scored())
+        self.assertEqual(1.0, results[0][1])
+
+    def test_index(self):
+        """Verify a query searches an index instead of each item."""
+        base = Number(42)
+        index = Index(self.items)
+        with patch.object(Number, 'similarity') as similarity:
+            query = tools.query(base, index).exclude_equal().similar()
+            self.assertListEqual([Number(42.001), Number(42.002)],
+                                 query.all())
+        self.assertFalse(similarity.called)
+
+    def test_index_equal(self):
+        """Verify an index is searched for equal items."""
+        index = Index(self.items)
+        self.assertListEqual([Number(42)],
+                             tools.query(Number(42), index).equal().all())
+        self.assertEqual(4, len(tools.query(Number(42), index).all()))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main(verbosity=0)
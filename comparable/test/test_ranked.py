@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.ranked module."""
+
+import random
+import unittest
+from unittest.mock import patch
+
+from comparable.simple import Number, Text
+from comparable.ranked import RankedView
+from comparable import ranked
+from comparable import tools
+
+from comparable.test import TestCase
+
+
+def _numbers(count, seed=0):
+    """Generate random numbers with repeated values."""
+    rand = random.Random(seed)
+    return [Number(rand.randint(1, 50)) for _ in range(count)]
+
+
+class TestRankedView(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the RankedView class."""
+
+    def assertRanked(self, base, items, view):  # pylint: disable=C0103
+        """Verify a view is ranked like tools.sort."""
+        expected = tools.sort(base, items)
+        self.assertEqual(len(expected), len(view))
+        self.assertListEqual([id(item) for item in expected],
+                             [id(item) for item in view])
+
+    def test_sort(self):
+        """Verify a view is ranked like tools.sort."""
+        base = Number(25)
+        items = _numbers(100)
+        self.assertRanked(base, items, tools.ranked(base, items))
+
+    def test_changes(self):
+        """Verify a view stays ranked as items are added and removed."""
+        base = Number(25)
+        items = _numbers(300)
+        rand = random.Random(1)
+        with patch.object(ranked, 'LOAD', 4):
+            view = RankedView(base, items[:100])
+            expected = items[:100]
+            for item in items[100:]:
+                view.add(item)
+                expected.append(item)
+                removed = expected.pop(rand.randrange(len(expected)))
+                view.remove(removed)
+                self.assertRanked(base, expected, view)
+            for item in list(expected):
+                view.remove(item)
+        self.assertEqual(0, len(view))
+        self.assertListEqual([], view.top(3))
+
+    def test_compared_once(self):
+        """Verify each item is compared to the base only once."""
+        base = Number(25)
+        items = _numbers(20)
+        with patch.object(Number, 'similarity',
+                          side_effect=Number.similarity, autospec=True) \
+                as similarity:
+            view = RankedView(base, items)
+            view.top(5)
+            view.similar(0.5)
+            view.remove(items[0])
+            self.assertEqual(20, similarity.call_count)
+
+    def test_top(self):
+        """Verify a view can get the top items like tools.top_k."""
+        base = Number(25)
+        items = _numbers(100)
+        view = RankedView(base, items)
+        self.assertListEqual(tools.top_k(base, items, 10), view.top(10))
+        self.assertListEqual(view[:10], view.top(10))
+        self.assertEqual(view[0], view.top(1)[0])
+        self.assertEqual(view[-1], list(view)[-1])
+
+    def test_similar(self):
+        """Verify a view can slice the items reaching a threshold."""
+        base = Number(25)
+        items = _numbers(100)
+        with patch.object(ranked, 'LOAD', 4):
+            view = RankedView(base, items)
+        for threshold in (None, 0.0, 0.5, 0.9, 1.0, 1.1):
+            expected = [item for item in tools.sort(base, items)
+                        if threshold is None and base.similarity(item) or
+                        threshold is not None and
+                        float(base.similarity(item)) >= threshold]
+            self.assertListEqual(expected, view.similar(threshold))
+
+    def test_similarity(self):
+        """Verify the similarity of ranked items is available."""
+        base = Text("abcdef")
+        item = Text("abcdeg")
+        view = RankedView(base, [item])
+        self.assertEqual(base.similarity(item), view.similarity(item))
+        self.assertListEqual([(item, float(base.similarity(item)))],
+                             list(view.scored()))
+
+    def test_identity(self):
+        """Verify items are removed by identity."""
+        base = Number(25)
+        item1, item2 = Number(20), Number(20)
+        view = RankedView(base, [item1, item2, item1])
+        self.assertIn(item2, view)
+        self.assertNotIn(Number(20), view)
+        view.remove(item1)
+        self.assertListEqual([id(item2), id(item1)],
+                             [id(item) for item in view])
+        view.remove(item1)
+        self.assertRaises(ValueError, view.remove, item1)
+        self.assertRaises(ValueError, view.similarity, item1)
+        view.discard(item1)
+        self.assertEqual(1, len(view))
+
+    def test_chunks(self):
+        """Verify ranks and slices span chunks."""
+        base = Number(25)
+        items = _numbers(50)
+        with patch.object(ranked, 'LOAD', 4):
+            view = RankedView(base, [])
+            for item in items:
+                view.add(item)
+        expected = list(view)
+        for index in range(-len(expected), len(expected)):
+            self.assertIs(expected[index], view[index])
+        self.assertListEqual(expected[13:37], view[13:37])
+        self.assertListEqual(expected[30:], view[30:])
+        self.assertListEqual(expected[5:45:3], view[5:45:3])
+        view.discard(expected[20])
+        self.assertNotIn(expected[20], view)
+        self.assertEqual(49, len(view))
+
+    def test_index_errors(self):
+        """Verify ranks out of range raise IndexError."""
+        view = RankedView(Number(1), [Number(1)])
+        self.assertRaises(IndexError, view.__getitem__, 1)
+        self.assertRaises(IndexError, view.__getitem__, -2)
+        self.assertListEqual([], view[1:])
+        self.assertListEqual([Number(1)], view[::-1])
+
+    def test_repr(self):
+        """Verify a view's representation."""
+        view = RankedView(Number(1), [Number(2)])
+        self.assertEqual("<RankedView of 1 items ranked by Number(1)>",
+                         repr(view))
+
+
+if __name__ == '__main__':
+    unittest.main()
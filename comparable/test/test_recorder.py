@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.recorder module."""
+
+import logging
+import unittest
+
+from comparable.simple import Number, Text
+from comparable.compound import Group
+from comparable.recorder import Recorder
+from comparable import recorder
+
+from comparable.test import TestCase, settings
+
+
+class TestRecorder(TestCase):  # pylint: disable=R0904
+
+    """Unit tests for the Recorder class."""
+
+    def test_ring(self):
+        """Verify only the most recent events are kept."""
+        rec = Recorder(size=3)
+        for value in range(5):
+            rec.record(Number(value), Number(0), '%', None, None,
+                       value / 10, 0)
+        self.assertEqual(3, len(rec))
+        self.assertEqual(5, rec.count)
+        self.assertListEqual([0.2, 0.3, 0.4],
+                             [event[3] for event in rec.events()])
+        self.assertEqual("<Recorder of 3 events>", repr(rec))
+
+    def test_clear(self):
+        """Verify events can be discarded."""
+        rec = Recorder(size=3)
+        rec.record(Number(1), Number(0), '==', None, None, True, 0)
+        rec.clear()
+        self.assertEqual(0, len(rec))
+        self.assertEqual("", rec.dump())
+
+
+class TestModule(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the module functions."""
+
+    def setUp(self):
+        recorder.enable(size=100)
+        recorder.clear()
+
+    def tearDown(self):
+        recorder.disable()
+        recorder.clear()
+
+    def test_dump(self):
+        """Verify comparisons are dumped as indented text."""
+        a = Group([Text("abc")])
+        b = Group([Text("abd")])
+        _ = a == b
+        text = recorder.dump()
+        self.assertEqual('\n'.join([
+            "Group == Group : ...",
+            "| Group.item1: Text == Text : ...",
+            "| | Text == Text : ...",
+            "| | Text == Text : False",
+            "| Group.item1: Text == Text : False",
+            "Group == Group : False",
+        ]), text)
+
+    def test_events(self):
+        """Verify comparisons are stored as structured events."""
+        _ = Number(1) % Number(2)
+        self.assertListEqual([('Number', None, '%', None, 0),
+                              ('Number', None, '%', 0.5, 0)],
+                             recorder.RECORDER.events())
+        self.assertIn("Number % Number : 50.0% similar", recorder.dump())
+        recorder.clear()
+        _ = Number(1) == Number(1)
+        self.assertListEqual([('Number', None, '==', None, 0),
+                              ('Number', None, '==', True, 0)],
+                             recorder.RECORDER.events())
+
+    def test_notes(self):
+        """Verify notes about attributes are dumped."""
+        _ = Group([Text("abc")]) % Group([Text("abc"), Text("def")])
+        self.assertIn("attributes not Comparable", recorder.dump())
+
+    def test_disabled(self):
+        """Verify nothing is recorded while disabled."""
+        recorder.disable()
+        _ = Number(1) % Number(2)
+        self.assertEqual("", recorder.dump())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main(verbosity=0)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.registry module and lazy package imports."""
+
+import sys
+import subprocess
+import unittest
+from unittest.mock import patch
+
+import comparable
+from comparable.simple import Number
+from comparable import registry
+
+from comparable.test import TestCase
+
+
+class TestRegistry(TestCase):  # pylint: disable=R0904
+
+    """Unit tests for the registry module."""
+
+    def test_resolve(self):
+        """Verify registered types are imported on use."""
+        self.assertIs(Number, registry.resolve('Number'))
+        self.assertEqual('TextVector', registry.resolve('TextVector').__name__)
+        self.assertIn('Group', registry.types())
+
+    def test_resolve_unknown(self):
+        """Verify unknown types raise ValueError."""
+        self.assertRaises(ValueError, registry.resolve, 'Unknown')
+
+    def test_register(self):
+        """Verify types can be registered as classes or import paths."""
+        with patch.dict(registry.TYPES), \
+                patch.dict(registry._types):  # pylint: disable=W0212
+            registry.register('Amount', Number)
+            self.assertIs(Number, registry.resolve('Amount'))
+            registry.register('Amount', 'comparable.simple:Text')
+            self.assertEqual('Text', registry.resolve('Amount').__name__)
+        self.assertNotIn('Amount', registry.types())
+
+    def test_backend(self):
+        """Verify backends are imported on use."""
+        self.assertEqual('comparable.index',
+                         registry.backend('index').__name__)
+        self.assertRaises(ValueError, registry.backend, 'unknown')
+
+    def test_backend_missing(self):
+        """Verify a backend that is not installed resolves to None."""
+        with patch.dict(registry.BACKENDS, {'missing': '_comparable_none'}), \
+                patch.dict(registry._backends):  # pylint: disable=W0212
+            self.assertIsNone(registry.backend('missing'))
+            self.assertIsNone(registry.backend('missing'))
+
+    def test_backend_broken(self):
+        """Verify errors importing the package's own backends are raised."""
+        with patch.dict(registry.BACKENDS, {'broken': 'comparable._none'}), \
+                patch.dict(registry._backends):  # pylint: disable=W0212
+            self.assertRaises(ImportError, registry.backend, 'broken')
+            self.assertNotIn('broken', registry._backends)  # pylint: disable=W0212
+
+
+class TestPackage(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for lazy imports of the package."""
+
+    def test_lazy_cli(self):
+        """Verify the command line imports worker modules on use."""
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            "import sys, comparable.cli; "
+            "print(sorted(name for name in ('concurrent.futures', "
+            "'comparable.planner', 'comparable.index') "
+            "if name in sys.modules))"])
+        self.assertEqual(b"[]", output.strip())
+
+    def test_lazy(self):
+        """Verify importing the package does not import its modules."""
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            "import sys, comparable; "
+            "print(sorted(name for name in sys.modules "
+            "if name.startswith('comparable.')))"])
+        self.assertEqual(b"[]", output.strip())
+
+    def test_attributes(self):
+        """Verify public names are imported on first use."""
+        self.assertEqual('CompoundComparable',
+                         comparable.CompoundComparable.__name__)
+        self.assertIs(registry, comparable.registry)
+        self.assertTrue(callable(comparable.stats))
+        self.assertIn('tools', dir(comparable))
+        self.assertRaises(AttributeError, getattr, comparable, 'unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.server module."""
+
+import os
+import socket
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from comparable.simple import Number, Text
+from comparable.server import save_shards, LocalClient, Server, Client
+from comparable.server import _Queries
+from comparable.server import benchmark, main
+from comparable import server as server_module
+from comparable import tools
+
+from comparable.test import TestCase, settings
+
+TEXTS = ["abc", "abd", "xyz", "hello world", "hello, world!", "abc",
+         "the cat", "the hat", "a cat"]
+
+
+def _position(items, item):
+    """Get the position of an item (or None)."""
+    for position, other in enumerate(items):
+        if other is item:
+            return position
+    return None
+
+
+class _ShardsTestCase(TestCase):  # pylint: disable=R0904
+
+    """Base class for tests with shard index files."""
+
+    items = [Text(text) for text in TEXTS]
+
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.paths = save_shards(self.items, self.temp.name, 3)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+
+class TestLocalClient(_ShardsTestCase):  # pylint: disable=R0904
+
+    """Integration tests for the LocalClient class."""
+
+    def test_shards(self):
+        """Verify items are split into shards."""
+        self.assertEqual(3, len(self.paths))
+        with LocalClient(self.paths) as client:
+            self.assertListEqual([0, 3, 6], client.offsets)
+
+    def test_match(self):
+        """Verify matches are the same as tools.match_similar."""
+        bases = ["abc", "hello  world", "cat", "the bat"]
+        with LocalClient(self.paths) as client:
+            results = client.match(bases, threshold=0.6)
+        for value, result in zip(bases, results):
+            base = Text(value)
+            base.threshold = 0.6
+            expected = _position(self.items,
+                                 tools.match_similar(base, self.items))
+            self.assertEqual(expected, result and result[0])
+            if result:
+                self.assertAlmostEqual(base % self.items[result[0]],
+                                       result[1])
+
+    def test_top_k(self):
+        """Verify the most similar items are ranked across shards."""
+        with LocalClient(self.paths) as client:
+            results = client.top_k(["the cat"], 3)
+        self.assertListEqual([6, 7, 8],
+                             [position for position, _ in results[0]])
+
+    def test_equal(self):
+        """Verify equal items are found in every shard."""
+        with LocalClient(self.paths) as client:
+            self.assertListEqual([[0, 5], []], client.equal(["abc", "ab"]))
+
+    def test_invalid(self):
+        """Verify invalid requests are rejected."""
+        with LocalClient(self.paths) as client:
+            self.assertRaises(ValueError, client.query, {'op': 'unknown'})
+            self.assertRaises(ValueError, client.query,
+                              {'op': 'equal', 'values': "abc"})
+            self.assertRaises(ValueError, client.top_k, ["abc"], None)
+            self.assertRaises(ValueError, client.match, [5])
+            self.assertRaises(ValueError, client.match, [True])
+
+    def test_abstract(self):
+        """Verify clients must define how queries are run."""
+        self.assertRaises(TypeError, _Queries)
+
+    def test_numbers(self):
+        """Verify shards of numbers can be queried."""
+        items = [Number(number) for number in (1, 42, 42.001, 43, 42)]
+        paths = save_shards(items, self.temp.name, 2)
+        with LocalClient(paths) as client:
+            self.assertListEqual([[1, 4]], client.equal([42]))
+            self.assertListEqual([[1, 1.0]], client.match([42]))
+            self.assertRaises(ValueError, client.match, ["42"])
+
+    def test_worker(self):
+        """Verify worker processes query their shard."""
+        server_module._open(self.paths[0])  # pylint: disable=W0212
+        try:
+            self.assertListEqual([[0]], server_module._query(  # pylint: disable=W0212
+                {'op': 'equal', 'values': ["abc"]}))
+        finally:
+            server_module._INDEX.close()  # pylint: disable=W0212
+            server_module._INDEX = None  # pylint: disable=W0212
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "Unix sockets required")
+class TestServer(_ShardsTestCase):  # pylint: disable=R0904
+
+    """Integration tests for the Server and Client classes."""
+
+    def test_queries(self):
+        """Verify the server answers the same as the local client."""
+        address = os.path.join(self.temp.name, 'server.sock')
+        with LocalClient(self.paths) as local:
+            with Server(self.paths, address) as server:
+                server.start()
+                with Client(address) as client:
+                    for name, args in (('match', (TEXTS, 0.5)),
+                                       ('top_k', (TEXTS, 2)),
+                                       ('equal', (TEXTS,))):
+                        self.assertListEqual(
+                            getattr(local, name)(*args),
+                            getattr(client, name)(*args))
+                    self.assertRaises(ValueError, client.query, {})
+        self.assertFalse(os.path.exists(address))
+
+    def test_errors(self):
+        """Verify failed requests are answered with an error."""
+        address = os.path.join(self.temp.name, 'server.sock')
+        with Server(self.paths, address) as server:
+            server.start()
+            with Client(address) as client:
+                self.assertRaises(ValueError, client.match, [5])
+                self.assertRaises(ValueError, client.query,
+                                  {'op': 'match', 'values': ["abc"],
+                                   'threshold': "high"})
+                self.assertListEqual([[0, 5]], client.equal(["abc"]))
+
+    def test_clients(self):
+        """Verify benchmark clients send their batches."""
+        address = os.path.join(self.temp.name, 'server.sock')
+        with Server(self.paths, address) as server:
+            server.start()
+            with patch.object(Client, 'match') as mock:
+                server_module._client(address, 2, 3, 0)  # pylint: disable=W0212
+        self.assertEqual(2, mock.call_count)
+
+    def test_close(self):
+        """Verify a server can be closed without serving."""
+        address = os.path.join(self.temp.name, 'server.sock')
+        server = Server(self.paths, address)
+        self.assertEqual("<Server of 3 shards on {}>".format(address),
+                         repr(server))
+        os.remove(address)
+        server.close()
+        self.assertFalse(os.path.exists(address))
+
+    def test_benchmark(self):
+        """Verify the throughput benchmark can be run."""
+        results = benchmark(size=50, shards=2, clients=2, batches=1,
+                            batch=5, log=lambda _: None)
+        self.assertListEqual(['local', 'server'], sorted(results))
+
+    def test_main_requires_paths(self):
+        """Verify the command line requires shards and a socket."""
+        self.assertRaises(SystemExit, main, [])
+
+    def test_main(self):
+        """Verify the command line serves shards until interrupted."""
+        address = os.path.join(self.temp.name, 'server.sock')
+        with patch.object(Server, 'serve_forever') as mock:
+            self.assertEqual(0, main(self.paths + ['--socket', address]))
+        self.assertEqual(1, mock.call_count)
+        self.assertFalse(os.path.exists(address))
+
+    def test_main_benchmark(self):
+        """Verify the command line can run the benchmark."""
+        with patch.object(server_module, 'benchmark') as mock:
+            self.assertEqual(0, main(['--benchmark', '--size', '10']))
+        mock.assert_called_once_with(10)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main()
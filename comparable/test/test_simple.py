@@ -2,9 +2,15 @@
 
 """Tests for the comparable.simple module."""
 
+import os
+import sys
+import random
 import logging
+import subprocess
 import unittest
+from difflib import SequenceMatcher
 
+from comparable.simple import Sketch, Shingles
 from comparable.simple import Number, Text, TextEnum, TextTitle
 
 from comparable.test import TestCase, settings
@@ -51,6 +57,10 @@ class TestNumber(TestCase):  # pylint: disable=R0904
         self.assertTrue(Number(42))
         self.assertFalse(Number(0))
 
+    def test_key(self):
+        """Verify equal numbers have the same key."""
+        self.assertEqual(Number(42).key(), Number(42.0).key())
+
     def test_threshold(self):
         """Verify the Number threshold is correct."""
         self.assertTrue(Number(100) %
@@ -100,6 +110,227 @@ class TestText(TestCase):  # pylint: disable=R0904
         self.assertFalse(Text("Hello, world!") %
                          Text("hello worlds"))
 
+    def test_key(self):
+        """Verify equal texts have the same key."""
+        self.assertEqual(Text("abc").key(), TextTitle("abc").key())
+        self.assertNotEqual(Text("abc").key(), Text("ABC").key())
+
+    def test_bound(self):
+        """Verify a text bound can reject dissimilar texts."""
+        self.assertTrue(Text("Hello, world!").bound(Text("hello world")))
+        self.assertFalse(Text("Hello, world!").bound(Text("Hello")))
+        self.assertEqual(0.0, Text("abc").bound(Text("xyz")))
+
+    def test_bound_other(self):
+        """Verify a text bound is 1.0 when the other object has no sketch."""
+        self.assertEqual(1.0, Text("abc").bound(Number(42)))
+
+    def test_title(self):
+        """Verify a text is compared to a title's value, not its sketch."""
+        base, other = Text("The"), TextTitle("the x")
+        self.assertEqual(0.5, base % other)
+        self.assertEqual(1.0, base.bound(other))
+
+    def test_not_str(self):
+        """Verify texts of other sequences are compared without sketches."""
+        a, b = Text(['a', 'b']), Text(['a', 'c'])
+        self.assertIsNone(a.sketch)
+        self.assertComparison(a, b, False, False, 0.5)
+        self.assertEqual(1.0, a.bound(b))
+
+
+class TestCompare(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for combined comparisons of simple types."""
+
+    def assertCompare(self, a, b):  # pylint: disable=C0103
+        """Fail if a combined comparison differs from separate ones."""
+        equality, similarity = a.compare(b)
+        self.assertEqual(a.equality(b), equality)
+        self.assertEqual(float(a.similarity(b)), float(similarity))
+        self.assertEqual(a.threshold, similarity.threshold)
+
+    def test_numbers(self):
+        """Verify numbers can be compared for both."""
+        for a, b in ((42, 42), (0, 0), (0, 42), (42, 42.5)):
+            self.assertCompare(Number(a), Number(b))
+
+    def test_texts(self):
+        """Verify texts can be compared for both."""
+        for cls in (Text, TextEnum, TextTitle):
+            for a, b in (("abc", "abc"), ("", ""), ("The Cat", "cat"),
+                         ("abc", "ABC"), ("a" * 300, "a" * 300)):
+                self.assertCompare(cls(a), cls(b))
+
+
+class TestSketch(TestCase):  # pylint: disable=R0904
+
+    """Unit tests for the Sketch class."""  # pylint: disable=C0103
+
+    def test_features(self):
+        """Verify a sketch records the length and character buckets."""
+        sketch = Sketch("abca")
+        self.assertEqual(4, sketch.length)
+        self.assertEqual(4, sum(sketch.histogram))
+        self.assertEqual(3, bin(sketch.bitmap).count('1'))
+        self.assertIsNone(sketch.folded)
+
+    def test_folded(self):
+        """Verify a folded sketch ignores case."""
+        self.assertEqual(Sketch("ABC", fold=True).folded,
+                         Sketch("abc", fold=True).folded)
+
+    def test_folded_stable(self):
+        """Verify folded hashes are the same in every process."""
+        script = ("from comparable.simple import Sketch; "
+                  "print(Sketch('ABC', fold=True).folded)")
+        folded = set()
+        for seed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            folded.add(int(subprocess.check_output(
+                [sys.executable, '-c', script], env=env)))
+        self.assertEqual({Sketch("abc", fold=True).folded}, folded)
+
+    def test_disjoint(self):
+        """Verify texts without common characters are disjoint."""
+        self.assertTrue(Sketch("abc").disjoint(Sketch("xyz")))
+        self.assertTrue(Sketch("").disjoint(Sketch("xyz")))
+        self.assertFalse(Sketch("").disjoint(Sketch("")))
+        self.assertFalse(Sketch("abc").disjoint(Sketch("cde")))
+
+    def test_bound(self):
+        """Verify a sketch bound is never less than the actual ratio."""
+        texts = ["", "a", "abc", "abcabc", "Hello, world!", "hello world",
+                 "The Cat and the Hat", "cat an' the hat", "xyz"]
+        for text1 in texts:
+            for text2 in texts:
+                a, b = Text(text1), Text(text2)
+                self.assertGreaterEqual(a.sketch.bound(b.sketch) + 1e-9,
+                                        float(a % b))
+
+    def test_bound_length(self):
+        """Verify a length mismatch is enough to bound the ratio."""
+        bound = Sketch("a").bound(Sketch("abcdefghij"), threshold=0.5)
+        self.assertAlmostEqual(2 / 11, bound)
+
+
+class _LongText(Text):
+
+    """Text compared by shingle sketches above a short length."""
+
+    long_length = 1000
+
+
+def _document(rand, words):
+    """Generate a random document of words."""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocabulary = [''.join(rand.choice(letters)
+                          for _ in range(rand.randint(2, 9)))
+                  for _ in range(1000)]
+    return [rand.choice(vocabulary) for _ in range(words)], vocabulary
+
+
+class TestShingles(TestCase):  # pylint: disable=R0904
+
+    """Tests for texts compared by shingle sketches."""
+
+    ERROR = 0.12  # allowed difference from the exact ratio
+
+    def assertEstimate(self, text1, text2):  # pylint: disable=C0103
+        """Verify an estimate is close to the exact ratio."""
+        a, b = _LongText(text1), _LongText(text2)
+        self.assertTrue(a.long)
+        similarity = a % b
+        self.assertFalse(similarity.exact)
+        exact = SequenceMatcher(a=text1, b=text2, autojunk=False).ratio()
+        self.assertAlmostEqual(exact, float(similarity), delta=self.ERROR)
+        self.assertLessEqual(float(similarity), float(a.bound(b)))
+
+    def test_sketch(self):
+        """Verify a sketch keeps the smallest hashes of shingles."""
+        self.assertEqual(2, len(Shingles("abcde").hashes))
+        text = ' '.join(_document(random.Random(0), 200)[0])
+        self.assertEqual(Shingles.K, len(Shingles(text).hashes))
+        self.assertEqual(1.0, Shingles("abcde").ratio(Shingles("abcde")))
+        self.assertEqual(0.0, Shingles("abcde").ratio(Shingles("vwxyz")))
+
+    def test_replaced_words(self):
+        """Verify estimates for texts with replaced words."""
+        rand = random.Random(1)
+        for fraction in (0.0, 0.05, 0.2, 0.4):
+            words, vocabulary = _document(rand, 300)
+            edited = [rand.choice(vocabulary) if rand.random() < fraction
+                      else word for word in words]
+            self.assertEstimate(' '.join(words), ' '.join(edited))
+
+    def test_removed_blocks(self):
+        """Verify estimates for texts with a removed block of text."""
+        rand = random.Random(2)
+        for fraction in (0.1, 0.3, 0.5):
+            words, _ = _document(rand, 300)
+            count = int(len(words) * fraction)
+            start = rand.randint(0, len(words) - count)
+            edited = words[:start] + words[start + count:]
+            self.assertEstimate(' '.join(words), ' '.join(edited))
+
+    def test_unrelated(self):
+        """Verify estimates for unrelated texts."""
+        rand = random.Random(3)
+        for _ in range(3):
+            self.assertEstimate(' '.join(_document(rand, 300)[0]),
+                                ' '.join(_document(rand, 300)[0]))
+
+    def test_short(self):
+        """Verify texts are only estimated above the long length."""
+        a, b = Text("abc" * 100), Text("abd" * 100)
+        self.assertFalse(a.long)
+        self.assertIsNone(a.shingles)
+        self.assertTrue((a % b).exact)
+
+    def test_long_and_short(self):
+        """Verify a short text is estimated against a long text."""
+        text = "hello world " * 100
+        similarity = _LongText(text) % _LongText(text[:600])
+        self.assertFalse(similarity.exact)
+        self.assertAlmostEqual(2 / 3, float(similarity))  # length bound
+
+    def test_symmetric(self):
+        """Verify both texts use the lower limit for estimates."""
+        text = "hello world " * 100
+        a, b = _LongText(text), Text(text[:-100] + "goodbye")
+        self.assertFalse(b.long)
+        self.assertFalse((a % b).exact)
+        self.assertEqual(a % b, b % a)
+
+    def test_repetitive(self):
+        """Verify repetitive texts are underestimated (see Shingles)."""
+        a, b = Text("x" * 5000 + "y"), TextEnum("x" * 5000)
+        self.assertTrue(a.long)
+        self.assertAlmostEqual(2 / 3, float(a % b))  # exact: 10000 / 10001
+
+    def test_empty(self):
+        """Verify texts shorter than a shingle have a sketch."""
+        self.assertEqual(1, len(Shingles("").hashes))
+        self.assertEqual(1.0, Shingles("").ratio(Shingles("")))
+        self.assertEqual(0.0, Shingles("").ratio(Shingles("abc")))
+
+    def test_titles(self):
+        """Verify long titles are estimated from their stripped text."""
+        text = "the cat and the hat " * 250
+        a, b = TextTitle(text), TextTitle(text.upper() + "!")
+        self.assertTrue(a.long)
+        self.assertEqual(a.shingles.hashes,
+                         TextTitle(text.upper()).shingles.hashes)
+        similarity = a % b
+        self.assertFalse(similarity.exact)
+        self.assertLess(0.9, float(similarity))
+
+    def test_equal(self):
+        """Verify equal long texts are equal and exactly similar."""
+        text = "abcdefghijklmnopqrstuvwxyz0123456789 " * 30
+        self.assertComparison(_LongText(text), _LongText(text),
+                              True, True, 1.0)
+
 
 class TestEnum(TestCase):  # pylint: disable=R0904
 
@@ -130,6 +361,16 @@ class TestEnum(TestCase):  # pylint: disable=R0904
         self.assertFalse(TextEnum("Hello, world!") %
                          TextEnum("Hello, world"))
 
+    def test_bound(self):
+        """Verify a text enum bound compares lowercase hashes."""
+        self.assertEqual(1.0, TextEnum("ABC").bound(TextEnum("abc")))
+        self.assertEqual(0.0, TextEnum("ABC").bound(TextEnum("abd")))
+
+    def test_similarity_text(self):
+        """Verify a text enum can be compared to a generic text."""
+        self.assertEqual(1.0, TextEnum("ABC") % Text("abc"))
+        self.assertTrue(TextEnum("ABC").bound(Text("abc")))
+
 
 class TestTextTitle(TestCase):  # pylint: disable=R0904
 
@@ -160,6 +401,10 @@ class TestTextTitle(TestCase):  # pylint: disable=R0904
         self.assertFalse(TextTitle("The Cat and the Hat") %
                          TextTitle("cat and hat"))
 
+    def test_bound(self):
+        """Verify a text title bound uses the stripped text."""
+        self.assertEqual(1.0, TextTitle("The Cat").bound(TextTitle("cat")))
+
 
 if __name__ == '__main__':
     logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
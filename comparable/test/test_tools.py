@@ -4,8 +4,10 @@
 
 import logging
 import unittest
+from unittest.mock import patch
 
-from comparable.simple import Number
+from comparable.base import Deadline
+from comparable.simple import Number, Text
 from comparable import tools
 
 from comparable.test import TestCase, settings
@@ -60,6 +62,15 @@ class TestSimilar(TestCase):  # pylint: disable=R0904
         gen = tools.find_similar(base, self.items)
         self.assertListEqual([], list(gen))
 
+    def test_find_similar_bound(self):
+        """Verify items rejected by a bound are not fully compared."""
+        base = Text("Hello, world!")
+        items = [Text("hello world"), Text("Hello")]
+        with patch.object(Text, 'similarity', wraps=base.similarity) as mock:
+            gen = tools.find_similar(base, items)
+            self.assertListEqual([Text("hello world")], list(gen))
+        self.assertEqual(1, mock.call_count)
+
     def test_match_similar(self):
         """Verify an similar item can be matched."""
         base = Number(42)
@@ -73,6 +84,54 @@ class TestSimilar(TestCase):  # pylint: disable=R0904
         self.assertEqual(None, item)
 
 
+class TestDeadline(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for searches with a deadline."""
+
+    items = [Number(42), Number(42.001), Number(43)]
+
+    def test_not_expired(self):
+        """Verify searches are exact when the deadline is not reached."""
+        deadline = Deadline(60)
+        base = Number(42.001)
+        self.assertEqual(Number(42.001),
+                         tools.match_similar(base, self.items, deadline))
+        self.assertEqual([Number(42.001)],
+                         list(tools.find_equal(base, self.items, deadline)))
+        self.assertEqual([Number(42.001), Number(42)],
+                         tools.top_k(base, self.items, 2, deadline))
+        self.assertTrue(deadline.exact)
+
+    def test_expired(self):
+        """Verify searches stop when the deadline expires."""
+        deadline = Deadline(0)
+        base = Number(42)
+        self.assertIsNone(tools.match_similar(base, self.items, deadline))
+        self.assertFalse(deadline.exact)
+        self.assertIsNone(tools.match_equal(base, self.items, 0))
+        self.assertEqual([], list(tools.find_similar(base, self.items, 0)))
+        self.assertEqual([], list(tools.duplicates(base, self.items, 0)))
+        self.assertEqual([], tools.top_k(base, self.items, 2, 0))
+
+    def test_best_so_far(self):
+        """Verify the best item found before the deadline is returned."""
+        deadline = Deadline(60)
+        items = iter(self.items)
+
+        def stream():  # pylint: disable=C0111
+            yield next(items)
+            yield next(items)
+            deadline.end = 0  # expire after two items
+            yield next(items)
+
+        base = Number(43)
+        self.assertEqual(Number(42.001),
+                         tools.match_similar(Number(42.002), stream(),
+                                             deadline))
+        self.assertFalse(deadline.exact)
+        self.assertIsNone(tools.match_similar(base, [], deadline))
+
+
 class TestDuplicates(TestCase):  # pylint: disable=R0904
 
     """Integration tests for duplicate functions."""
@@ -85,6 +144,137 @@ class TestDuplicates(TestCase):  # pylint: disable=R0904
         gen = tools.duplicates(base, self.items)
         self.assertListEqual([Number(42.001)], list(gen))
 
+    def test_duplicates_bound(self):
+        """Verify items rejected by their bound are not compared."""
+        base = Text("hello world")
+        with patch.object(Text, 'compare', autospec=True,
+                          side_effect=Text.compare) as compare:
+            self.assertListEqual([Text("hello world!")], list(
+                tools.duplicates(base, [Text("xyz"), Text("hello world!")])))
+        self.assertEqual(1, compare.call_count)
+
+
+class Rounded(Number):  # pylint: disable=W0223
+
+    """Number keyed by its rounded value and equal within 0.5."""
+
+    def equality(self, other):
+        return abs(self.value - other.value) <= 0.5
+
+    def key(self):
+        return round(self.value)
+
+
+class TestStreamDedupe(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for streaming deduplication."""
+
+    def test_stream_dedupe(self):
+        """Verify items in a stream are tagged as new or duplicates."""
+        stream = [Number(42), Number(43), Number(42), Number(42.001)]
+        results = list(tools.stream_dedupe(stream))
+        self.assertListEqual([tools.NEW, tools.NEW, tools.DUPLICATE,
+                              tools.NEAR_DUPLICATE],
+                             [status for _, status, _ in results])
+        self.assertIsNone(results[0][2])
+        self.assertIs(stream[0], results[2][2])
+        self.assertIs(stream[0], results[3][2])
+
+    def test_stream_dedupe_window(self):
+        """Verify items outside the window are forgotten."""
+        stream = [Number(1), Number(2), Number(3), Number(1)]
+        results = list(tools.stream_dedupe(stream, window=2))
+        self.assertEqual(tools.NEW, results[3][1])
+
+    def test_stream_dedupe_refresh(self):
+        """Verify matched items are kept in the window."""
+        stream = [Number(1), Number(2), Number(1), Number(3), Number(1)]
+        results = list(tools.stream_dedupe(stream, window=2))
+        self.assertEqual(tools.DUPLICATE, results[4][1])
+
+    def test_stream_dedupe_key(self):
+        """Verify equal items are found by key without scanning."""
+        stream = [Number(1), Number(2), Number(3), Number(1)]
+        with patch.object(Number, 'bound', side_effect=Number.bound,
+                          autospec=True) as bound:
+            results = list(tools.stream_dedupe(stream))
+        self.assertEqual(tools.DUPLICATE, results[3][1])
+        self.assertIs(stream[0], results[3][2])
+        self.assertEqual(3, bound.call_count)  # only new items are scanned
+
+    def test_stream_dedupe_keyless(self):
+        """Verify items without keys are scanned for equal items."""
+        stream = [Number(1), Number(2), Number(1)]
+        with patch.object(Number, 'key', return_value=None):
+            results = list(tools.stream_dedupe(stream))
+        self.assertListEqual([tools.NEW, tools.NEW, tools.DUPLICATE],
+                             [status for _, status, _ in results])
+
+    def test_stream_dedupe_same_key(self):
+        """Verify the most recent of several equal items is reported."""
+        stream = [Rounded(0.6), Rounded(1.4), Rounded(1.0), Rounded(5)]
+        results = list(tools.stream_dedupe(stream, window=2))
+        self.assertListEqual([tools.NEW, tools.NEW, tools.DUPLICATE,
+                              tools.NEW],
+                             [status for _, status, _ in results])
+        self.assertIs(stream[1], results[2][2])
+
+    def test_stream_dedupe_unhashable(self):
+        """Verify items with unhashable keys are scanned for equal items."""
+        stream = [Number(1), Number(2), Number(3), Number(1)]
+        with patch.object(Number, 'key', return_value=[]):
+            results = list(tools.stream_dedupe(stream, window=2))
+        self.assertListEqual([tools.NEW, tools.NEW, tools.NEW, tools.NEW],
+                             [status for _, status, _ in results])
+
+    def test_stream_dedupe_bound(self):
+        """Verify items rejected by their bound are not scored."""
+        stream = [Text("abc"), Text("xyz")]
+        for key in (Text.key, lambda _: None):
+            with patch.object(Text, 'key', key), \
+                    patch.object(Text, 'similarity') as similarity:
+                results = list(tools.stream_dedupe(stream))
+            self.assertListEqual([tools.NEW, tools.NEW],
+                                 [status for _, status, _ in results])
+            self.assertEqual(0, similarity.call_count)
+
+    def test_stream_dedupe_unbounded(self):
+        """Verify an unbounded stream can be consumed lazily."""
+        def stream():
+            number = 0
+            while True:
+                number += 1
+                yield Number(number % 5)
+
+        gen = tools.stream_dedupe(stream(), window=3)
+        statuses = [next(gen)[1] for _ in range(10)]
+        self.assertEqual(10, len(statuses))
+
+
+class TestCluster(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the cluster function."""
+
+    def test_cluster(self):
+        """Verify similar items are grouped in order of their first item."""
+        items = [Number(42), Number(1), Number(42.001), Number(42)]
+        groups = tools.cluster(items)
+        self.assertListEqual([[items[0], items[2], items[3]], [items[1]]],
+                             groups)
+
+    def test_cluster_chain(self):
+        """Verify items are grouped through a chain of similar items."""
+        items = [Text("abcd"), Text("wxyz"), Text("abcx"), Text("abxx")]
+        for item in items:
+            item.threshold = 0.7
+        groups = tools.cluster(items)
+        self.assertListEqual([[items[0], items[2], items[3]], [items[1]]],
+                             groups)
+
+    def test_cluster_empty(self):
+        """Verify no items have no groups."""
+        self.assertListEqual([], tools.cluster([]))
+
 
 class TestSort(TestCase):  # pylint: disable=R0904
 
@@ -98,6 +288,12 @@ class TestSort(TestCase):  # pylint: disable=R0904
         items = tools.sort(base, self.items)
         self.assertListEqual([Number(42.001), Number(42), Number(43)], items)
 
+    def test_top_k(self):
+        """Verify the most similar items can be selected."""
+        base = Number(42.001)
+        items = tools.top_k(base, self.items, 2)
+        self.assertListEqual([Number(42.001), Number(42)], items)
+
 
 if __name__ == '__main__':
     logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.track module."""
+
+import copy
+import pickle
+import logging
+import unittest
+from unittest.mock import patch
+
+from comparable.base import CompoundComparable
+from comparable.simple import Number, Text, TextEnum
+from comparable.compound import Group
+from comparable.track import TrackedPair
+
+from comparable.test import TestCase, settings
+
+
+class Record(CompoundComparable):  # pylint: disable=W0223
+
+    """Compound comparable with attributes of several types."""
+
+    attributes = {'name': 2, 'kind': 1, 'size': 1}
+    threshold = 0.5
+
+    def __init__(self, name, kind, size):
+        self.name = Text(name)
+        self.kind = TextEnum(kind)
+        self.size = Number(size) if size is not None else None
+
+    def __repr__(self):
+        return self._repr(str(self.name), str(self.kind), self.size)
+
+
+class TestTrackedPair(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the TrackedPair class."""
+
+    def setUp(self):
+        self.obj1 = Record("abc", "book", 42)
+        self.obj2 = Record("abd", "book", 42)
+        self.pair = TrackedPair(self.obj1, self.obj2)
+
+    def assertTracked(self):  # pylint: disable=C0103
+        """Verify the tracked results match a full comparison."""
+        self.assertEqual(self.obj1 == self.obj2, self.pair.equality())
+        self.assertEqual(self.obj1 % self.obj2, self.pair.similarity())
+        self.assertEqual(self.obj1.compare(self.obj2), self.pair.compare())
+
+    def test_initial(self):
+        """Verify a tracked pair matches a full comparison."""
+        self.assertTracked()
+        self.assertEqual(3, self.pair.rescored)
+
+    def test_assignment(self):
+        """Verify only assigned attributes are re-scored."""
+        self.pair.similarity()
+        self.obj2.name = Text("abc")
+        with patch.object(Number, 'compare') as mock:
+            self.assertTrue(self.pair.equality())
+        self.assertEqual(0, mock.call_count)
+        self.assertEqual(4, self.pair.rescored)
+        self.assertTracked()
+
+    def test_repeated_assignment(self):
+        """Verify repeated assignments are re-scored once."""
+        self.pair.similarity()
+        for value in range(10):
+            self.obj1.size = Number(value)
+        self.assertTracked()
+        self.assertEqual(4, self.pair.rescored)
+
+    def test_none_attributes(self):
+        """Verify attributes that become None follow the similarity rules."""
+        self.obj1.size = self.obj2.size = None
+        self.assertTracked()
+        self.obj1.size = self.obj2.size = 42
+        self.assertTracked()
+        for obj in (self.obj1, self.obj2):
+            obj.name = obj.kind = obj.size = None
+        self.assertTracked()
+
+    def test_untracked_attribute(self):
+        """Verify other attributes do not invalidate any scores."""
+        self.pair.similarity()
+        self.obj1.note = "ignored"
+        self.pair.similarity()
+        self.assertEqual(3, self.pair.rescored)
+
+    def test_close(self):
+        """Verify closed pairs are no longer notified."""
+        self.pair.similarity()
+        self.pair.close()
+        self.pair.close()
+        self.obj1.size = Number(1)
+        self.assertEqual(0.833, self.pair.similarity())
+
+    def test_repr(self):
+        """Verify both objects are represented."""
+        self.assertEqual("<TrackedPair of Record('abc', 'book', Number(42)) "
+                         "and Record('abd', 'book', Number(42))>",
+                         repr(self.pair))
+
+    def test_copies(self):
+        """Verify copies of tracked objects are not tracked."""
+        self.assertIsNone(copy.copy(self.obj1)._trackers)  # pylint: disable=W0212
+        self.assertIsNone(pickle.loads(pickle.dumps(self.obj1))._trackers)  # pylint: disable=W0212
+
+    def test_copies_slots(self):
+        """Verify copies keep the values of slots."""
+        class Slotted(Record):  # pylint: disable=W0223,C0111
+            __slots__ = ('note',)
+
+        obj = Slotted("abc", "x", 1)
+        obj.note = "extra"
+        TrackedPair(obj, self.obj2)
+        for clone in (copy.copy(obj), copy.deepcopy(obj)):
+            self.assertEqual("extra", clone.note)
+            self.assertEqual(obj.name, clone.name)
+            self.assertIsNone(clone._trackers)  # pylint: disable=W0212
+        unset = copy.copy(Slotted("abd", "x", 1))
+        self.assertFalse(hasattr(unset, 'note'))
+
+    def test_not_attributes(self):
+        """Verify objects not compared by attributes cannot be tracked."""
+        self.assertRaises(TypeError, TrackedPair, Group([]), Group([]))
+        self.assertRaises(TypeError, TrackedPair, Number(1), Number(1))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main()
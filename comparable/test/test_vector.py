@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+
+"""Tests for the comparable.vector module."""
+
+import pickle
+import logging
+import unittest
+from unittest.mock import patch
+
+from comparable.vector import Vocabulary, HashedVocabulary, TextVector, Matrix
+from comparable.vector import BINARY, TFIDF
+from comparable.corpus import PreparedCorpus
+from comparable import registry
+from comparable import tools
+
+from comparable.test import TestCase, settings
+
+TEXTS = ["the cat in the hat", "hello world", "world hello", "a cat",
+         "green eggs and ham", "the hat", "", "!!!", "cat hat the in"]
+
+
+class TestVocabulary(TestCase):  # pylint: disable=R0904
+
+    """Unit tests for the Vocabulary class."""
+
+    def test_add(self):
+        """Verify documents are counted and tokens get dimensions."""
+        vocabulary = Vocabulary()
+        dimensions, counts = vocabulary.add("The cat, the hat.")
+        self.assertListEqual([0, 1, 2], list(dimensions))
+        self.assertListEqual([2, 1, 1], list(counts))
+        vocabulary.add("cat")
+        self.assertEqual(3, len(vocabulary))
+        self.assertEqual(2, vocabulary.documents)
+        self.assertListEqual([1, 2, 1], list(vocabulary.frequencies))
+        self.assertEqual("<Vocabulary of 3 tokens in 2 documents (binary)>",
+                         repr(vocabulary))
+
+    def test_freeze(self):
+        """Verify a frozen vocabulary does not count documents."""
+        vocabulary = Vocabulary(TFIDF)
+        dimensions, counts = vocabulary.add("cat hat")
+        weights = vocabulary.weights(dimensions, counts)
+        vocabulary.freeze()
+        vocabulary.add("cat dog")
+        self.assertEqual(1, vocabulary.documents)
+        self.assertListEqual([1, 1, 0], list(vocabulary.frequencies))
+        self.assertListEqual(weights, vocabulary.weights(dimensions, counts))
+
+    def test_weights(self):
+        """Verify rare tokens are weighted higher with TF-IDF."""
+        vocabulary = Vocabulary(TFIDF)
+        vocabulary.add("cat hat")
+        dimensions, counts = vocabulary.add("cat dog")
+        common, rare = vocabulary.weights(dimensions, counts)
+        self.assertLess(common, rare)
+        self.assertAlmostEqual(1.0, common ** 2 + rare ** 2)
+
+    def test_unknown_weighting(self):
+        """Verify an unknown weighting is rejected."""
+        self.assertRaises(ValueError, Vocabulary, 'unknown')
+
+    def test_hashed(self):
+        """Verify a hashed vocabulary stores nothing."""
+        vocabulary = HashedVocabulary()
+        dimensions, counts = vocabulary.add("The cat, the hat.")
+        self.assertListEqual(sorted(dimensions), list(dimensions))
+        self.assertListEqual([1, 1, 2], sorted(counts))
+        self.assertListEqual(list(dimensions),
+                             list(HashedVocabulary().add("hat cat the")[0]))
+        self.assertEqual(0, len(vocabulary))
+        self.assertEqual(0, vocabulary.documents)
+        self.assertEqual("<HashedVocabulary (binary)>", repr(vocabulary))
+
+
+class TestTextVector(TestCase):  # pylint: disable=R0904
+
+    """Integration tests for the TextVector class."""
+
+    def test_identical(self):
+        """Verify identical texts are equal and similar."""
+        self.assertComparison(TextVector("abc def"), TextVector("abc def"),
+                              True, True, 1.0)
+
+    def test_reordered(self):
+        """Verify the order and case of words is ignored."""
+        self.assertComparison(TextVector("hello world"),
+                              TextVector("World, hello!"), False, True, 1.0)
+        self.assertNotEqual(TextVector("hello world").key(),
+                            TextVector("World, hello!").key())
+
+    def test_partial(self):
+        """Verify the cosine of binary vectors."""
+        self.assertComparison(TextVector("a b c d e"), TextVector("a b c d"),
+                              False, True, 0.894)
+        self.assertComparison(TextVector("a b"), TextVector("c d"),
+                              False, False, 0.0)
+
+    def test_empty(self):
+        """Verify texts without tokens are only similar when equal."""
+        self.assertComparison(TextVector("!!"), TextVector("!!"),
+                              True, True, 1.0)
+        self.assertComparison(TextVector("!!"), TextVector("??"),
+                              False, False, 0.0)
+        self.assertComparison(TextVector("!!"), TextVector("abc"),
+                              False, False, 0.0)
+
+    def test_tfidf(self):
+        """Verify rare words count more with TF-IDF weighting."""
+        vocabulary = Vocabulary(TFIDF)
+        items = [TextVector(text, vocabulary) for text in
+                 ("the cat", "the hat", "the bat", "the mat", "a cat")]
+        self.assertLess(float(items[0] % items[1]),
+                        float(items[0] % items[4]))
+
+    def test_bound(self):
+        """Verify the bound is no less than the similarity."""
+        items = [TextVector(text) for text in TEXTS]
+        for item1 in items:
+            for item2 in items:
+                self.assertGreaterEqual(float(item1.bound(item2)) + 1e-9,
+                                        float(item1 % item2))
+
+    def test_default_vocabulary(self):
+        """Verify vectors without a vocabulary can always be compared."""
+        item = TextVector("the cat")
+        self.assertIsInstance(item.vocabulary, HashedVocabulary)
+        self.assertNotIn('vocabulary', vars(item))
+        other = TextVector("cat the", HashedVocabulary())
+        self.assertComparison(item, other, False, True, 1.0)
+        self.assertEqual(0, len(TextVector.vocabulary))
+
+    def test_different_vocabularies(self):
+        """Verify vectors of different vocabularies cannot be compared."""
+        item1 = TextVector("abc", Vocabulary())
+        item2 = TextVector("abc", Vocabulary())
+        self.assertRaises(ValueError, item1.similarity, item2)
+
+    def test_pickle(self):
+        """Verify copies can be compared to the original vectors."""
+        vocabulary = Vocabulary(TFIDF)
+        item = TextVector("the cat", vocabulary)
+        copy = pickle.loads(pickle.dumps(item))
+        self.assertComparison(item, copy, True, True, 1.0)
+
+    def test_tools(self):
+        """Verify vectors can be used with tools."""
+        items = [TextVector(text) for text in TEXTS]
+        base = TextVector("the hat in the cat")
+        self.assertIs(items[0], tools.match_similar(base, items))
+        self.assertListEqual([items[0], items[8]],
+                             list(tools.find_similar(base, items)))
+
+
+class _MatrixTests(object):  # pylint: disable=R0904
+
+    """Integration tests for the Matrix class."""
+
+    def setUp(self):  # pylint: disable=C0103
+        self.vocabulary = Vocabulary(self.weighting)  # pylint: disable=E1101
+        self.items = [TextVector(text, self.vocabulary) for text in TEXTS]
+
+    def test_scores(self):
+        """Verify bulk scores are the pairwise similarities."""
+        matrix = Matrix(self.items)
+        for text in TEXTS + ["hat cat", "unknown words"]:
+            base = TextVector(text, self.vocabulary)
+            for item, score in zip(self.items, matrix.scores(base)):
+                if base.dimensions:
+                    self.assertAlmostEqual(float(base % item), score)  # pylint: disable=E1101
+
+    def test_similar(self):
+        """Verify positions of similar items are found."""
+        matrix = Matrix(self.items)
+        base = TextVector("cat hat", self.vocabulary)
+        expected = [position for position, item in enumerate(self.items)
+                    if float(base % item) >= 0.5]
+        self.assertListEqual(expected, [position for position, _
+                                        in matrix.similar(base, 0.5)])  # pylint: disable=E1101
+        self.assertListEqual([7], [position for position, _ in
+                                   matrix.similar(TextVector("!!!", self.vocabulary),
+                                                 1.0)])  # pylint: disable=E1101
+
+    def test_match(self):
+        """Verify the best match is the same as a scan."""
+        corpus = PreparedCorpus(self.items)
+        for text in TEXTS + ["hat the", "hello", "world hello"]:
+            base = TextVector(text, self.vocabulary)
+            base.threshold = 0.5
+            expected = tools.match_similar(base, self.items)
+            item, similarity = corpus.match(base)
+            self.assertIs(expected, item)  # pylint: disable=E1101
+            if item is not None:
+                self.assertAlmostEqual(float(base % item), float(similarity))  # pylint: disable=E1101
+
+    def test_frozen(self):
+        """Verify scoring bases does not change the stored weights."""
+        matrix = Matrix(self.items)
+        self.assertTrue(self.vocabulary.frozen)
+        documents = self.vocabulary.documents
+        base = TextVector("the cat", self.vocabulary)
+        scores = list(matrix.scores(base))
+        TextVector("the hat", self.vocabulary)
+        self.assertEqual(documents, self.vocabulary.documents)
+        self.assertListEqual(scores, list(matrix.scores(base)))  # pylint: disable=E1101
+
+    def test_match_empty(self):
+        """Verify an empty matrix has no matches."""
+        self.assertEqual((None, None), Matrix([]).match(TextVector("abc")))  # pylint: disable=E1101
+        matrix = Matrix(self.items, self.vocabulary)
+        self.assertEqual((None, None),  # pylint: disable=E1101
+                         matrix.match(TextVector("???", self.vocabulary)))
+        self.assertEqual((None, None),  # pylint: disable=E1101
+                         matrix.match(TextVector("unknown", self.vocabulary)))
+
+    def test_similar_threshold(self):
+        """Verify the base threshold is used by default."""
+        matrix = Matrix(self.items)
+        base = TextVector("the hat in the cat", self.vocabulary)
+        self.assertListEqual([0, 8], [position for position, _  # pylint: disable=E1101
+                                      in matrix.similar(base)])
+
+    def test_top(self):
+        """Verify the most similar items are ranked like a scan."""
+        matrix = Matrix(self.items)
+        for text in ["the cat", "hello world", "hat"]:
+            base = TextVector(text, self.vocabulary)
+            scored = [(position, float(base % item))
+                      for position, item in enumerate(self.items)
+                      if position != 0]
+            expected = sorted((result for result in scored if result[1] > 0),
+                              key=lambda result: (-result[1], result[0]))[:3]
+            found = matrix.top(base, 3, exclude=0)
+            self.assertListEqual([position for position, _ in expected],  # pylint: disable=E1101
+                                 [position for position, _ in found])
+        self.assertListEqual([(7, 1.0)], matrix.top(  # pylint: disable=E1101
+            TextVector("!!!", self.vocabulary), 3))
+
+    def test_repr(self):
+        """Verify the number of vectors is shown."""
+        self.assertEqual("<Matrix of 9 vectors>",  # pylint: disable=E1101
+                         repr(Matrix(self.items)))
+
+
+class TestMatrix(_MatrixTests, TestCase):  # pylint: disable=R0904
+
+    """Tests for the Matrix class with binary weighting."""
+
+    weighting = BINARY
+
+
+class TestMatrixTfidf(_MatrixTests, TestCase):  # pylint: disable=R0904
+
+    """Tests for the Matrix class with TF-IDF weighting."""
+
+    weighting = TFIDF
+
+
+class TestMatrixPython(_MatrixTests, TestCase):  # pylint: disable=R0904
+
+    """Tests for the Matrix class without NumPy."""
+
+    weighting = TFIDF
+
+    def run(self, result=None):
+        with patch.dict(registry._backends,  # pylint: disable=W0212
+                        {'numpy': None}):
+            return super().run(result)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format=settings.DEFAULT_LOGGING_FORMAT,
+                        level=settings.DEFAULT_LOGGING_LEVEL)
+    unittest.main()
@@ -1,68 +1,296 @@
 """Functions to utilize lists of Comparable objects."""
 
+import heapq
+from array import array
+from collections import OrderedDict
 
-def find_equal(base, items):
+from comparable.base import Deadline
+from comparable.query import Query
+from comparable.ranked import RankedView
+from comparable import registry
+
+NEW = 'new'
+DUPLICATE = 'duplicate'  # equal to a recently seen item
+NEAR_DUPLICATE = 'near-duplicate'  # similar to a recently seen item
+
+
+def _until(items, deadline):
+    """Get an iterator of items that stops when the deadline expires.
+
+    @param items: iterable of items
+    @param deadline: L{Deadline}, number of seconds, or None
+    @return: iterable of items
+
+    """
+    deadline = Deadline.create(deadline)
+    if deadline is None:
+        return items
+    return _generate_until(items, deadline)
+
+
+def _generate_until(items, deadline):
+    """Yield items until the deadline expires (the results are inexact)."""
+    for item in items:
+        if deadline.expired():
+            deadline.exact = False
+            return
+        yield item
+
+
+def find_equal(base, items, deadline=None):
     """Get an iterator of items equal to the base.
 
     @param base: base item to find equality
     @param items: list of items for comparison
+    @param deadline: L{Deadline} or seconds to stop searching (default: none)
     @return: generator of equal items
 
     """
-    return (item for item in items if base.equality(item))
+    return (item for item in _until(items, deadline) if base.equality(item))
 
 
-def match_equal(base, items):
+def match_equal(base, items, deadline=None):
     """Get the first item that is equivalent to the base.
 
     @param base: base item to find equality
     @param items: list of items for comparison
+    @param deadline: L{Deadline} or seconds to stop searching (default: none)
     @return: first equivalent item or None
 
     """
-    for item in find_equal(base, items):
+    for item in find_equal(base, items, deadline=deadline):
         return item
 
     return None
 
 
-def find_similar(base, items):
+def find_similar(base, items, deadline=None):
     """Get an iterator of items similar to the base.
 
     @param base: base item to locate best match
     @param items: list of items for comparison
+    @param deadline: L{Deadline} or seconds to stop searching (default: none)
     @return: generator of similar items
 
     """
-    return (item for item in items if base.similarity(item))
+    return (item for item in _until(items, deadline)
+            if base.bound(item) and base.similarity(item))
 
 
-def match_similar(base, items):
+def match_similar(base, items, deadline=None):
     """Get the most similar matching item from a list of items.
 
+    Given a deadline, the most similar item found before it expires is
+    returned and the deadline's 'exact' flag is cleared if items remained.
+
     @param base: base item to locate best match
     @param items: list of items for comparison
+    @param deadline: L{Deadline} or seconds to stop searching (default: none)
     @return: most similar matching item or None
 
     """
-    finds = list(find_similar(base, items))
-    if finds:
-        return max(finds, key=base.similarity)  # TODO: make O(n)
+    return _match(base, items, deadline)[0]
 
-    return None
 
+def _match(base, items, deadline=None):
+    """Get the most similar matching item and its similarity.
+
+    @return: (item, L{Similarity}) or (None, None)
+
+    """
+    best, best_sim = None, None
+    for item in _until(items, deadline):
+        if not base.bound(item):
+            continue
+        sim = base.similarity(item)
+        if sim and (best is None or sim > best_sim):
+            best, best_sim = item, sim
+
+    return best, best_sim
+
+
+def match_many(bases, items, processes=None):
+    """Get the most similar matching item for each of many bases.
+
+    The items are prepared once (see L{corpus.PreparedCorpus}) and the
+    bases are matched in parallel worker processes.
+
+    @param bases: list of base items to locate best matches
+    @param items: list of items (or L{corpus.PreparedCorpus}) for comparison
+    @param processes: number of worker processes (default: CPU count)
+    @return: list of (item, similarity) or (None, None) for each base
 
-def duplicates(base, items):
+    """
+    corpus = registry.backend('corpus')
+    return corpus.match_many(bases, items, processes=processes)
+
+
+def knn_graph(items, k, processes=None):
+    """Get the k most similar other items of every item.
+
+    Items of a single simple type are prepared once (see
+    L{corpus.PreparedCorpus}) to search only the nearest candidates, and
+    other items are scanned with 'bound' rejecting items that cannot beat
+    the k-th neighbor so far. Items are searched in parallel worker
+    processes.
+
+    @param items: list of items
+    @param k: maximum number of neighbors of each item
+    @param processes: number of worker processes (default: CPU count)
+    @return: L{corpus.Graph} of neighbor positions and float similarities
+
+    """
+    corpus = registry.backend('corpus')
+    return corpus.knn_graph(items, k, processes=processes)
+
+
+def duplicates(base, items, deadline=None):
     """Get an iterator of items similar but not equal to the base.
 
     @param base: base item to perform comparison against
     @param items: list of items to compare to the base
+    @param deadline: L{Deadline} or seconds to stop searching (default: none)
     @return: generator of items sorted by similarity to the base
 
     """
-    for item in items:
-        if item.similarity(base) and not item.equality(base):
-            yield item
+    for item in _until(items, deadline):
+        if item.bound(base):
+            equality, similarity = item.compare(base)
+            if similarity and not equality:
+                yield item
+
+
+def stream_dedupe(stream, window=1000):
+    """Get an iterator of items tagged by comparison to recent items.
+
+    Only the last 'window' distinct items are remembered, so memory use is
+    constant for any length of stream. Items matching a remembered item are
+    refreshed so that frequently repeated items are not evicted.
+
+    Equal items of the same type are found by their 'key' in constant
+    time, so only other items are scanned (using 'bound' to skip
+    comparisons) for near-duplicates.
+
+    @param stream: iterable of items (possibly unbounded)
+    @param window: maximum number of recently seen items to remember
+    @return: generator of (item, NEW|DUPLICATE|NEAR_DUPLICATE, prior item)
+
+    """
+    recent = OrderedDict()  # position: item, least recently matched first
+    keys = {}  # (type, key): positions of remembered items
+
+    for position, item in enumerate(stream):
+        status, prior, match = NEW, None, None
+        index = _index(item)
+
+        # Find an equal item of the same type by its key
+        if index is not None:
+            found = [seen for seen in keys.get(index, ())
+                     if item.equality(recent[seen])]
+            if found:
+                if len(found) > 1:  # the most recent one is reported
+                    found = [seen for seen in reversed(list(recent))
+                             if seen in found]
+                status, prior, match = DUPLICATE, recent[found[0]], found[0]
+
+        # Search the most recent items first for an equal or similar item
+        if status == NEW:
+            for seen_position, seen in reversed(list(recent.items())):
+                keyed = index is not None and type(seen) is type(item)  # pylint: disable=C0123
+                if status == NEW and item.bound(seen):
+                    if keyed:  # not equal (or found by key)
+                        equality = False
+                        similarity = item.similarity(seen)
+                    else:
+                        equality, similarity = item.compare(seen)
+                elif keyed:
+                    continue
+                else:
+                    equality, similarity = item.equality(seen), False
+                if equality:
+                    status, prior, match = DUPLICATE, seen, seen_position
+                    break
+                if similarity and status == NEW:
+                    status, prior, match = NEAR_DUPLICATE, seen, seen_position
+
+        if match is not None:
+            recent.move_to_end(match)
+        if status != DUPLICATE:
+            recent[position] = item
+            if index is not None:
+                keys.setdefault(index, []).append(position)
+            if len(recent) > window:
+                evicted, old = recent.popitem(last=False)
+                _forget(keys, _index(old), evicted)
+
+        yield item, status, prior
+
+
+def _index(item):
+    """Get the (type, key) of an item to find equal items, or None."""
+    key = item.key()
+    if key is None:
+        return None
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return type(item), key
+
+
+def _forget(keys, index, position):
+    """Remove a position from the positions of a (type, key)."""
+    if index is None:
+        return
+    positions = keys[index]
+    positions.remove(position)
+    if not positions:
+        del keys[index]
+
+
+def cluster(items):
+    """Get groups of items linked by similarity.
+
+    Items are in the same group when a chain of similar items connects
+    them (single linkage), so every pair of items is compared once.
+
+    @param items: list of items to group
+    @return: list of groups (lists of items) ordered by their first item
+
+    """
+    items = list(items)
+    pairs = ((position, other) for position, item in enumerate(items)
+             for other in range(position)
+             if item.bound(items[other]) and item.similarity(items[other]))
+    groups = OrderedDict()
+    for position, label in enumerate(_labels(len(items), pairs)):
+        groups.setdefault(label, []).append(items[position])
+    return list(groups.values())
+
+
+def _labels(count, pairs):
+    """Label linked positions with the first position of their group.
+
+    @param count: number of positions
+    @param pairs: iterable of linked (position, position)
+    @return: array of labels for each position
+
+    """
+    parents = array('l', range(count))
+
+    def root(position):
+        """Find the first position of a group (compressing the path)."""
+        while parents[position] != position:
+            parents[position] = parents[parents[position]]
+            position = parents[position]
+        return position
+
+    for position1, position2 in pairs:
+        root1, root2 = root(position1), root(position2)
+        if root1 != root2:
+            parents[max(root1, root2)] = min(root1, root2)
+
+    return array('l', (root(position) for position in range(count)))
 
 
 def sort(base, items):
@@ -74,3 +302,42 @@ def sort(base, items):
 
     """
     return sorted(items, key=base.similarity, reverse=True)
+
+
+def ranked(base, items):
+    """Get a view of items kept ranked as items are added and removed.
+
+    @param base: base item to perform comparison against
+    @param items: iterable of initial items to rank
+    @return: L{RankedView} object
+
+    """
+    return RankedView(base, items)
+
+
+def top_k(base, items, k, deadline=None):
+    """Get a list of the items most similar to the base.
+
+    @param base: base item to perform comparison against
+    @param items: list of items to compare to the base
+    @param k: maximum number of items to return
+    @param deadline: L{Deadline} or seconds to stop searching (default: none)
+    @return: list of up to k items sorted by similarity to the base
+
+    """
+    return heapq.nlargest(k, _until(items, deadline),
+                          key=lambda item: float(base.similarity(item)))
+
+
+def query(base, items):
+    """Get a lazy query of items compared to the base.
+
+    Operations can be chained and are applied in a single pass when the
+    query is iterated, e.g. C{query(base, items).exclude_equal().top(10)}.
+
+    @param base: base item to perform comparison against
+    @param items: list of items (or L{Index}) to compare to the base
+    @return: L{Query} object
+
+    """
+    return Query(base, items)
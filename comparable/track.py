@@ -0,0 +1,133 @@
+"""Pairs of compound comparables re-scored incrementally as they change.
+
+A tracked pair keeps the score of each attribute. Assigning an attribute
+of either object only invalidates that attribute, which is re-scored the
+next time the pair is compared and applied to the running weighted total,
+so updating the result after one edit costs one attribute comparison.
+
+Only assignments are detected: attributes changed in place (e.g. an
+attribute of an attribute) must be reassigned or passed to
+L{TrackedPair.invalidate}.
+
+"""
+
+from weakref import WeakSet
+
+from comparable.base import Comparable, CompoundComparable, Comparison
+
+
+class TrackedPair(object):
+
+    """Two compound comparables with per-attribute partial scores."""
+
+    def __init__(self, obj1, obj2):
+        """Score every attribute and start tracking changes to both objects.
+
+        @param obj1: first object to compare (its attributes and weights
+                     are used)
+        @param obj2: second object to compare
+
+        """
+        cls = obj1.__class__
+        if not isinstance(obj1, CompoundComparable) or \
+                cls.equality is not CompoundComparable.equality or \
+                cls.similarity is not CompoundComparable.similarity:
+            raise TypeError("{} is not compared by attributes".format(
+                cls.__name__))
+
+        self.obj1 = obj1
+        self.obj2 = obj2
+        self.weights = dict(obj1.attributes)
+        self.scores = {}  # name: (equality, similarity, weight)
+        self.total_sim = 0.0
+        self.total_weight = 0.0
+        self.unequal = 0  # number of unequal attributes
+        self.dirty = set(self.weights)  # names of attributes to re-score
+        self.rescored = 0  # number of attributes scored (for inspection)
+
+        for obj in (obj1, obj2):
+            if obj._trackers is None:  # pylint: disable=W0212
+                obj._trackers = WeakSet()  # pylint: disable=W0212
+            obj._trackers.add(self)  # pylint: disable=W0212
+
+    def __repr__(self):
+        return "<{} of {!r} and {!r}>".format(self.__class__.__name__,
+                                              self.obj1, self.obj2)
+
+    def invalidate(self, name):
+        """Mark an attribute to be re-scored (called on assignment)."""
+        if name in self.weights:
+            self.dirty.add(name)
+
+    def close(self):
+        """Stop tracking changes to both objects."""
+        for obj in (self.obj1, self.obj2):
+            obj._trackers.discard(self)  # pylint: disable=W0212
+
+    def equality(self):
+        """Get the equality of the objects (see L{Comparable.equality})."""
+        self._update()
+        return self.unequal == 0
+
+    def similarity(self):
+        """Get the similarity of the objects (see L{Comparable.similarity})."""
+        self._update()
+        sim = self.obj1.Similarity(self.total_sim)
+        if self.total_weight:
+            sim *= (1.0 / self.total_weight)
+        return sim
+
+    def compare(self):
+        """Get the equality and similarity of the objects.
+
+        @return: L{Comparison} result of comparison
+
+        """
+        return Comparison(self.equality(), self.similarity())
+
+    def _update(self):
+        """Re-score invalidated attributes and update the totals."""
+        while self.dirty:
+            name = self.dirty.pop()
+            eql, sim, weight = self.scores.get(name, (True, 0.0, 0.0))
+            self.unequal -= not eql
+            self.total_sim -= sim
+            self.total_weight -= weight
+
+            eql, sim, weight = self.scores[name] = self._score(name)
+            self.unequal += not eql
+            self.total_sim += sim
+            self.total_weight += weight
+            self.rescored += 1
+
+    def _score(self, name):
+        """Score one attribute following the rules of L{Comparable}.
+
+        @return: (equality, weighted similarity, weight)
+
+        """
+        obj1, obj2 = self.obj1, self.obj2
+        weight = self.weights[name]
+        cname = obj1.__class__.__name__
+        attr1 = getattr(obj1, name, None)
+        attr2 = getattr(obj2, name, None)
+        eql = hasattr(obj1, name) and hasattr(obj2, name)
+        obj1.log(attr1, attr2, '<=>', cname=cname, aname=name)
+
+        # Similarity is ignored if None on both objects
+        if attr1 is None and attr2 is None:
+            obj1.log(attr1, attr2, '<=>', cname=cname, aname=name,
+                     result="attributes are both None")
+            return eql, 0.0, 0.0
+
+        # Similarity is 0 if either attribute is non-Comparable
+        if not all((isinstance(attr1, Comparable),
+                    isinstance(attr2, Comparable))):
+            obj1.log(attr1, attr2, '<=>', cname=cname, aname=name,
+                     result="attributes not Comparable")
+            return eql and attr1 == attr2, 0.0, weight
+
+        attr_eql, attr_sim = attr1.compare(attr2)
+        obj1.log(attr1, attr2, '<=>', cname=cname, aname=name,
+                 result=attr_sim)
+        return eql and attr_eql, float(attr_sim) * weight, weight
@@ -0,0 +1,402 @@
+"""Texts compared as sparse vectors of tokens.
+
+Each text is tokenized once into a sparse vector over a shared
+L{Vocabulary}, and similarity is the cosine of two vectors, so the order
+of words does not matter. Texts created without a vocabulary use a
+L{HashedVocabulary}, which stores nothing:
+
+    >>> print(TextVector("hello world") % TextVector("World, hello!"))
+    100.0% similar
+
+A L{Matrix} of many vectors is stored by dimension (token), so scoring a
+base against all of them is a single sparse matrix-vector product that
+only visits the vectors sharing a token with the base. NumPy is used for
+the product when it is installed (see L{registry.backend}).
+
+"""
+
+import re
+import math
+import heapq
+import uuid
+from array import array
+from functools import lru_cache
+from collections import Counter
+
+from comparable.simple import _Simple, _hash
+from comparable import registry
+
+BINARY = 'binary'  # every token present has the same weight
+TFIDF = 'tfidf'  # tokens are weighted by count and rarity
+
+TOKEN = re.compile(r'\w+')
+
+
+class Vocabulary(object):
+
+    """Mapping of tokens to the dimensions of vectors.
+
+    Every text vectorized with a vocabulary is counted as one of its
+    documents, which determines the inverse document frequency of tokens
+    when using TF-IDF weighting. Weights are those of the vocabulary at
+    the time of comparison, so a vocabulary should be frozen once the
+    reference texts are added to keep the weights of bases from changing
+    them. A L{Matrix} freezes the vocabulary of its texts.
+
+    """
+
+    def __init__(self, weighting=BINARY):
+        """Create an empty vocabulary.
+
+        @param weighting: BINARY or TFIDF
+        @raise ValueError: if the weighting is unknown
+
+        """
+        if weighting not in (BINARY, TFIDF):
+            raise ValueError("unknown weighting: {!r}".format(weighting))
+        self.weighting = weighting
+        self.uid = uuid.uuid4().hex  # identifies copies in other processes
+        self.dimensions = {}  # token: dimension
+        self.frequencies = array('l')  # documents containing each token
+        self.documents = 0
+        self.frozen = False  # True to stop counting documents
+
+    def __repr__(self):
+        return "<{} of {} tokens in {} documents ({})>".format(
+            self.__class__.__name__, len(self), self.documents,
+            self.weighting)
+
+    def __len__(self):
+        return len(self.dimensions)
+
+    @staticmethod
+    def tokenize(text):
+        """Split a text into lowercase word tokens."""
+        return TOKEN.findall(text.lower())
+
+    def freeze(self):
+        """Stop counting new texts as documents."""
+        self.frozen = True
+
+    def add(self, text):
+        """Add a document and get its vector of token counts.
+
+        @param text: text of the document
+        @return: (array of sorted dimensions, array of token counts)
+
+        """
+        count = not self.frozen
+        self.documents += count
+        counts = {}
+        for token, number in Counter(self.tokenize(text)).items():
+            dimension = self.dimensions.get(token)
+            if dimension is None:
+                dimension = self.dimensions[token] = len(self.dimensions)
+                self.frequencies.append(0)
+            self.frequencies[dimension] += count
+            counts[dimension] = number
+        dimensions = sorted(counts)
+        return (array('l', dimensions),
+                array('l', (counts[dimension] for dimension in dimensions)))
+
+    def weights(self, dimensions, counts):
+        """Get the unit-length weights of a vector.
+
+        @param dimensions: sorted dimensions of the vector
+        @param counts: token counts of the vector
+        @return: list of weights for each dimension
+
+        """
+        if self.weighting == BINARY:
+            weights = [1.0] * len(dimensions)
+        else:
+            documents = self.documents
+            frequencies = self.frequencies
+            weights = [count * (math.log((1.0 + documents) /
+                                         (1.0 + frequencies[dimension])) + 1)
+                       for dimension, count in zip(dimensions, counts)]
+        norm = math.sqrt(sum(weight * weight for weight in weights))
+        return [weight / norm for weight in weights] if norm else weights
+
+
+class HashedVocabulary(Vocabulary):
+
+    """Vocabulary that maps tokens to dimensions by hashing.
+
+    Nothing is stored, so it does not grow with the texts vectorized, and
+    all hashed vocabularies (e.g. copies in other processes) can be
+    compared. Documents are not counted, so only BINARY weighting is
+    supported.
+
+    """
+
+    UID = 'hashed'
+
+    def __init__(self):
+        super().__init__(BINARY)
+        self.uid = self.UID
+        self.frozen = True
+
+    def __repr__(self):
+        return "<{} ({})>".format(self.__class__.__name__, self.weighting)
+
+    def add(self, text):
+        """Get the vector of token counts of a text (see L{Vocabulary.add}).
+
+        @param text: text of the document
+        @return: (array of sorted dimensions, array of token counts)
+
+        """
+        counts = Counter(_dimension(token) for token in self.tokenize(text))
+        dimensions = sorted(counts)
+        return (array('q', dimensions),
+                array('l', (counts[dimension] for dimension in dimensions)))
+
+
+@lru_cache(maxsize=65536)
+def _dimension(token):
+    """Get the (non-negative 63-bit) dimension of a hashed token."""
+    return _hash(token) >> 1
+
+
+class TextVector(_Simple):
+
+    """Comparable text tokenized into a sparse vector (cosine similarity)."""
+
+    threshold = 0.8  # 4 of 5 words in common (binary weighting)
+
+    vocabulary = HashedVocabulary()  # default (stateless) vocabulary
+
+    def __init__(self, value, vocabulary=None):
+        super().__init__(value)
+        if vocabulary is not None:
+            self.vocabulary = vocabulary
+        self.dimensions, self.counts = self.vocabulary.add(value)
+        self._weights = None  # cached for a number of documents
+        self._documents = None
+
+    def equality(self, other):
+        """Get equality using string comparison."""
+        return str(self) == str(other)
+
+    def key(self):
+        """Get the string value used for equality."""
+        return str(self)
+
+    def weights(self):
+        """Get the unit-length weights of the vector's dimensions.
+
+        @return: list of weights for each of 'dimensions'
+
+        """
+        vocabulary = self.vocabulary
+        if self._weights is None or vocabulary.weighting == TFIDF and \
+                self._documents != vocabulary.documents:
+            self._weights = vocabulary.weights(self.dimensions, self.counts)
+            self._documents = vocabulary.documents
+        return self._weights
+
+    def similarity(self, other):
+        """Get similarity as the cosine of the two vectors.
+
+        @raise ValueError: if the vectors use different vocabularies
+
+        """
+        _check(self.vocabulary, other.vocabulary)
+        if not self.dimensions or not other.dimensions:
+            ratio = 1.0 if not self.dimensions and not other.dimensions \
+                and self.equality(other) else 0.0
+        else:
+            weights = dict(zip(other.dimensions, other.weights()))
+            ratio = sum(weight * weights.get(dimension, 0.0)
+                        for dimension, weight
+                        in zip(self.dimensions, self.weights()))
+        similarity = self.Similarity(min(ratio, 1.0))
+        return similarity
+
+    def bound(self, other):
+        """Get an upper bound on similarity from the numbers of tokens."""
+        dimensions = getattr(other, 'dimensions', None)
+        if dimensions is None or self.vocabulary.weighting != BINARY or \
+                not self.dimensions or not dimensions:
+            return super().bound(other)
+        # Binary cosine is limited by the smaller set of tokens
+        count1, count2 = len(self.dimensions), len(dimensions)
+        ratio = math.sqrt(min(count1, count2) / max(count1, count2))
+        similarity = self.Similarity(ratio)
+        return similarity
+
+
+def _check(vocabulary1, vocabulary2):
+    """Verify two vectors can be compared.
+
+    @raise ValueError: if the vectors use different vocabularies
+
+    """
+    if vocabulary1 is not vocabulary2 and vocabulary1.uid != vocabulary2.uid:
+        raise ValueError("vectors use different vocabularies")
+
+
+class Matrix(object):
+
+    """Vectors of many texts stored by dimension for bulk scoring.
+
+    The vocabulary of the texts is frozen, so vectorizing bases to score
+    does not change the weights of the stored vectors.
+
+    """
+
+    def __init__(self, items, vocabulary=None):
+        """Store the vectors of a list of texts and freeze their vocabulary.
+
+        @param items: list of L{TextVector}
+        @param vocabulary: vocabulary of the texts (default: of the first)
+        @raise ValueError: if the texts use different vocabularies
+
+        """
+        self.items = list(items)
+        if vocabulary is None:
+            vocabulary = self.items[0].vocabulary if self.items \
+                else TextVector.vocabulary
+        self.vocabulary = vocabulary
+        for item in self.items:
+            _check(vocabulary, item.vocabulary)
+        vocabulary.freeze()
+        self._build()
+
+    def __repr__(self):
+        return "<{} of {} vectors>".format(self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return len(self.items)
+
+    def _build(self):
+        """Transpose the vectors into lists of (row, weight) per dimension."""
+        numpy = registry.backend('numpy')
+        postings = {}  # dimension: (rows, weights)
+        for row, item in enumerate(self.items):
+            for dimension, weight in zip(item.dimensions, item.weights()):
+                rows, weights = postings.setdefault(dimension, ([], []))
+                rows.append(row)
+                weights.append(weight)
+
+        self.spans = {}  # dimension: (start, stop) of rows and weights
+        rows, weights = array('l'), array('d')
+        for dimension, (posted_rows, posted_weights) in postings.items():
+            self.spans[dimension] = len(rows), len(rows) + len(posted_rows)
+            rows.extend(posted_rows)
+            weights.extend(posted_weights)
+        if numpy is None:
+            self.rows, self.weights = rows, weights
+        else:  # pragma: no cover (requires NumPy)
+            self.rows = numpy.frombuffer(rows, dtype=rows.typecode)
+            self.weights = numpy.frombuffer(weights, dtype=numpy.float64)
+
+    def scores(self, base):
+        """Get the cosine similarity of a base to every vector.
+
+        @param base: L{TextVector} to score against
+        @return: sequence of float similarities for each item
+        @raise ValueError: if the base uses a different vocabulary
+
+        """
+        numpy = registry.backend('numpy')
+        _check(self.vocabulary, base.vocabulary)
+        spans = [(self.spans[dimension], weight) for dimension, weight
+                 in zip(base.dimensions, base.weights())
+                 if dimension in self.spans]
+        if numpy is not None:  # pragma: no cover (requires NumPy)
+            if not spans:
+                return numpy.zeros(len(self.items))
+            rows = numpy.concatenate([self.rows[start:stop]
+                                      for (start, stop), _ in spans])
+            weights = numpy.concatenate([self.weights[start:stop] * weight
+                                         for (start, stop), weight in spans])
+            return numpy.bincount(rows, weights=weights,
+                                  minlength=len(self.items))
+
+        scores = array('d', bytes(8 * len(self.items)))
+        rows, weights = self.rows, self.weights
+        for (start, stop), weight in spans:
+            for index in range(start, stop):
+                scores[rows[index]] += weights[index] * weight
+        return scores
+
+    def similar(self, base, threshold=None):
+        """Get the positions of items similar to the base.
+
+        @param base: L{TextVector} to score against
+        @param threshold: similarity ratio required (default: base threshold)
+        @return: list of (position, L{Similarity}) sorted by position
+
+        """
+        if threshold is None:
+            threshold = base.threshold
+        if not base.dimensions:
+            found = ((position, base.similarity(item))
+                     for position, item in enumerate(self.items))
+        else:
+            found = ((position, base.Similarity(min(float(score), 1.0)))
+                     for position, score in enumerate(self.scores(base)))
+        return [(position, similarity) for position, similarity in found
+                if float(similarity) >= threshold]
+
+    def match(self, base):
+        """Get the position of the most similar matching item.
+
+        @param base: L{TextVector} to score against
+        @return: (position, L{Similarity}) or (None, None)
+
+        """
+        numpy = registry.backend('numpy')
+        if not self.items:
+            return None, None
+        if not base.dimensions:
+            for position, item in enumerate(self.items):
+                similarity = base.similarity(item)
+                if similarity:
+                    return position, similarity  # only equal texts match
+            return None, None
+
+        # The first of the highest scores is the best match
+        scores = self.scores(base)
+        if numpy is None:
+            position = max(range(len(scores)), key=scores.__getitem__)
+        else:  # pragma: no cover (requires NumPy)
+            position = int(numpy.argmax(scores))
+        similarity = base.Similarity(min(float(scores[position]), 1.0))
+        if similarity:
+            return position, similarity
+        return None, None
+
+    def top(self, base, k, exclude=None):
+        """Get the positions of the most similar items.
+
+        @param base: L{TextVector} to score against
+        @param k: maximum number of items
+        @param exclude: position of an item to skip
+        @return: list of (position, float similarity > 0) in descending
+                 similarity, then ascending position
+
+        """
+        numpy = registry.backend('numpy')
+        if not base.dimensions:
+            found = ((position, float(base.similarity(item)))
+                     for position, item in enumerate(self.items))
+            return [result for result in found
+                    if result[1] > 0 and result[0] != exclude][:k]
+
+        scores = self.scores(base)
+        if numpy is None:
+            positions = [position for position, score in enumerate(scores)
+                         if score > 0 and position != exclude]
+            positions = heapq.nsmallest(k, positions, key=lambda position:
+                                        -scores[position])  # stable
+        else:  # pragma: no cover (requires NumPy)
+            positions = numpy.flatnonzero(scores > 0)
+            positions = positions[positions != (-1 if exclude is None
+                                                else exclude)]
+            order = numpy.lexsort((positions, -scores[positions]))
+            positions = positions[order[:k]].tolist()
+        return [(position, min(float(scores[position]), 1.0))
+                for position in positions]
@@ -25,7 +25,7 @@ setuptools.setup(
 
     packages=setuptools.find_packages(),
 
-    entry_points={'console_scripts': []},
+    entry_points={'console_scripts': ['comparable = comparable.cli:main']},
 
     long_description=(README + '\n' + CHANGES),
     license='LGPL',
@@ -41,4 +41,5 @@ setuptools.setup(
     ],
 
     install_requires=open('requirements.txt').readlines(),
+    extras_require={'numpy': ['numpy']},
 )